@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+# Cold-start profile of every HTTP handler. Each run starts a fresh interpreter with -X importtime,
+# cold-imports one handler, constructs its AWS clients and invokes it against local stubs.
+#
+#   python benchmarks/cold_start.py --runs 5 --output cold_start.json
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+child_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cold_start_child.py')
+sys.path.insert(0, repo_root)
+
+# The child writes the marker right before it imports the handler
+from benchmarks.cold_start_child import IMPORT_MARKER
+
+HANDLER_MODULES = ['src.upload_image', 'src.view_image', 'src.delete_image', 'src.list_images']
+
+# Number of slowest imports (by cumulative time) kept per handler
+TOP_IMPORTS = 15
+
+
+def parse_importtime(stderr):
+    # Turn the -X importtime trace that follows IMPORT_MARKER into (module, self_us, cumulative_us, depth) rows
+    rows = []
+    recording = False
+    for line in stderr.splitlines():
+        if line == IMPORT_MARKER:
+            recording = True
+            continue
+        if not recording or not line.startswith('import time:'):
+            continue
+
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header row
+
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return rows
+
+
+def import_breakdown(rows):
+    # Self time grouped by top-level package (boto3, botocore, src, PIL, ...) in milliseconds
+    breakdown = {}
+    for module, self_us, _, _ in rows:
+        package = module.split('.')[0]
+        breakdown[package] = breakdown.get(package, 0) + self_us / 1000
+    return dict(sorted(breakdown.items(), key=lambda entry: entry[1], reverse=True))
+
+
+def slowest_imports(rows, limit=TOP_IMPORTS):
+    ranked = sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
+    return [
+        {'module': module, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000, 'depth': depth}
+        for module, self_us, cumulative_us, depth in ranked
+    ]
+
+
+def run_once(module_name):
+    # Dummy credentials and a region let the clients be constructed without touching AWS
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': repo_root,
+        'PYTHONDONTWRITEBYTECODE': '1',
+        'AWS_DEFAULT_REGION': env.get('AWS_DEFAULT_REGION', 'us-east-1'),
+        'AWS_ACCESS_KEY_ID': 'cold-start',
+        'AWS_SECRET_ACCESS_KEY': 'cold-start',
+    })
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', child_script, module_name],
+        cwd=repo_root, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module_name} failed:\n{completed.stderr[-2000:]}")
+
+    # A handler that fails on the stubs times its error path, which is no cold-start number
+    result = json.loads(completed.stdout)
+    if not 200 <= (result.get('status_code') or 0) < 300:
+        raise RuntimeError(f"{module_name} returned status {result.get('status_code')}:\n{completed.stderr[-2000:]}")
+    result['importtime'] = parse_importtime(completed.stderr)
+    return result
+
+
+def median(values):
+    return statistics.median(values) if values else None
+
+
+def summarize(module_name, runs):
+    # Report medians across runs; the importtime breakdown comes from the run closest to the median import
+    import_times = [run['import_ms'] for run in runs]
+    representative = min(runs, key=lambda run: abs(run['import_ms'] - median(import_times)))
+    rows = representative['importtime']
+
+    return {
+        'runs': len(runs),
+        'import_ms': median(import_times),
+        'import_ms_min': min(import_times),
+        'import_ms_max': max(import_times),
+        'importtime_total_ms': sum(row[1] for row in rows) / 1000,
+        'import_breakdown_ms': import_breakdown(rows),
+        'slowest_imports': slowest_imports(rows),
+        'client_construction_ms': {
+            service_name: median([run['client_construction_ms'][service_name] for run in runs])
+            for service_name in runs[0]['client_construction_ms']
+        },
+        'first_invocation_ms': median([run['first_invocation_ms'] for run in runs]),
+        'warm_invocation_ms': median([run['warm_invocation_ms'] for run in runs]),
+        'status_code': runs[-1]['status_code'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import and first-invocation time per handler")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per handler")
+    parser.add_argument('--handlers', nargs='+', default=HANDLER_MODULES, help="handler modules to profile")
+    parser.add_argument('--output', help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'handlers': {},
+    }
+    for module_name in args.handlers:
+        runs = [run_once(module_name) for _ in range(args.runs)]
+        report['handlers'][module_name] = summarize(module_name, runs)
+
+        summary = report['handlers'][module_name]
+        print(
+            f"{module_name}: import {summary['import_ms']:.1f} ms, "
+            f"clients {sum(summary['client_construction_ms'].values()):.1f} ms, "
+            f"first call {summary['first_invocation_ms']:.1f} ms, "
+            f"warm call {summary['warm_invocation_ms']:.2f} ms",
+            file=sys.stderr
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# Runs inside a fresh interpreter started by cold_start.py with -X importtime.
+# Only sys, time and importlib are imported before the handler, so everything the
+# importtime trace records after IMPORT_MARKER belongs to the handler's own cold import.
+import sys
+import time
+import importlib
+
+IMPORT_MARKER = "cold_start: importing handler"
+
+# A 1x1 PNG, small enough that the upload path never switches to multipart
+SAMPLE_IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+
+SAMPLE_ITEM = {
+    'ImageID': {'S': 'cold-start'},
+    'S3Key': {'S': 'images/cold-start.png'},
+    'Metadata': {'M': {'user_id': {'S': 'bench'}, 'tags': {'L': [{'S': 'cold-start'}]}}},
+    'UserID': {'S': 'bench'},
+    'ContentType': {'S': 'image/png'},
+    'Bytes': {'N': '68'},
+}
+
+# Handler module -> (handler function name, sample API Gateway event)
+HANDLERS = {
+    'src.upload_image': ('upload_image', {
+        'body': '{"image": "%s", "metadata": {"user_id": "bench", "tags": ["cold-start"]}}' % SAMPLE_IMAGE
+    }),
+    'src.view_image': ('view_image', {'pathParameters': {'image_id': 'cold-start'}, 'headers': {}}),
+    'src.delete_image': ('delete_image', {'pathParameters': {'image_id': 'cold-start'}}),
+    'src.list_images': ('list_images', {'queryStringParameters': {'user_id': 'bench', 'limit': '10'}}),
+}
+
+
+class StubBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class StubS3:
+    # Answers the S3 calls the handlers make with canned responses and no network
+    def put_object(self, **kwargs):
+        return {'ETag': '"stub"'}
+
+    def get_object(self, **kwargs):
+        return {'Body': StubBody(b'')}
+
+    def head_object(self, **kwargs):
+        return {'ContentLength': 68, 'ContentType': 'image/png'}
+
+    def delete_object(self, **kwargs):
+        return {}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://stub.local/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+class StubDynamoDB:
+    # Answers the DynamoDB calls the handlers make; every read finds the same sample item
+    def get_item(self, **kwargs):
+        return {'Item': dict(SAMPLE_ITEM)}
+
+    def put_item(self, **kwargs):
+        return {}
+
+    def delete_item(self, **kwargs):
+        return {'Attributes': dict(SAMPLE_ITEM)} if kwargs.get('ReturnValues') == 'ALL_OLD' else {}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        # Only the listing version shards are read in batches; none has been bumped yet
+        return {'Responses': {table_name: [] for table_name in RequestItems}, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, **kwargs):
+        return {'UnprocessedItems': {}}
+
+    def update_item(self, **kwargs):
+        return {'Attributes': {'RefCount': {'N': '1'}, 'S3Key': {'S': 'blobs/stub/0'}}}
+
+    def query(self, **kwargs):
+        return {'Items': [dict(SAMPLE_ITEM)], 'Count': 1, 'ScannedCount': 1}
+
+    def scan(self, **kwargs):
+        return self.query(**kwargs)
+
+
+def elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def main(module_name):
+    handler_name, event = HANDLERS[module_name]
+
+    # Cold import of the handler module
+    sys.stderr.write(IMPORT_MARKER + "\n")
+    sys.stderr.flush()
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_ms = elapsed_ms(started)
+
+    # Construct the real clients the handler would create on its first call (no network involved)
+    from src import aws_clients
+    client_construction_ms = {}
+    for service_name in ('s3', 'dynamodb'):
+        started = time.perf_counter()
+        aws_clients.get_client(service_name)
+        client_construction_ms[service_name] = elapsed_ms(started)
+
+    # Swap in the local stubs and invoke the handler twice: the first call still pays for lazy
+    # initialization inside the handler path, the second is a warm call for comparison
+    aws_clients.set_client('s3', StubS3())
+    aws_clients.set_client('dynamodb', StubDynamoDB())
+    handler = getattr(module, handler_name)
+
+    started = time.perf_counter()
+    response = handler(dict(event), None)
+    first_invocation_ms = elapsed_ms(started)
+
+    started = time.perf_counter()
+    handler(dict(event), None)
+    warm_invocation_ms = elapsed_ms(started)
+
+    import json
+    sys.stdout.write(json.dumps({
+        'import_ms': import_ms,
+        'client_construction_ms': client_construction_ms,
+        'first_invocation_ms': first_invocation_ms,
+        'warm_invocation_ms': warm_invocation_ms,
+        'status_code': response.get('statusCode'),
+    }))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
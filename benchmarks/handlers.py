@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import random
+import base64
+import argparse
+import platform
+import resource
+from datetime import datetime, timezone
+
+# In-process benchmark of upload_image, list_images, view_image and delete_image against the
+# in-memory S3 and DynamoDB stand-ins in benchmarks/local_aws.py. Reports throughput, latency
+# percentiles and peak RSS per endpoint, and compares the run against a saved baseline.
+#
+#   python benchmarks/handlers.py --table-size 100000 --save-baseline baseline.json
+#   python benchmarks/handlers.py --table-size 100000 --baseline baseline.json
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from benchmarks.local_aws import LocalS3, LocalDynamoDB
+from src import aws_clients
+from src.cache import image_cache
+from src.metadata import build_image_item
+from src.tag_index import tag_index_table_name, posting_key, item_tags
+from src.upload_image import upload_image, dynamo_table_name
+from src.list_images import list_images
+from src.view_image import view_image
+from src.delete_image import delete_image
+
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 * 1024, 'B': 1}
+
+# Metrics compared against the baseline, and whether a higher value is better
+COMPARED_METRICS = {'throughput_per_s': True, 'p95_ms': False}
+
+# Every seeded image carries two of these tags
+SEED_TAGS = ['cat', 'dog', 'sea', 'city', 'food']
+
+# PNG signature, so uploads are sniffed as images like real ones
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    for unit, multiplier in SIZE_UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * multiplier)
+    return int(value)
+
+
+def size_label(size):
+    for unit in ('MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def seed_table(dynamodb, table_size, users, rng):
+    # Write the items straight into the stand-in table; S3 objects are not needed to view or delete them
+    table = dynamodb.tables[dynamo_table_name]
+    tag_table = dynamodb.tables[tag_index_table_name]
+    image_ids = []
+    for index in range(table_size):
+        image_id = f"seed-{index:07d}"
+        metadata = {'user_id': f"user-{rng.randrange(users)}", 'tags': rng.sample(SEED_TAGS, 2), 'title': f"Image {index}"}
+        item = build_image_item(image_id, f"images/{image_id}.png", metadata, content_type='image/png', size_bytes=rng.randrange(10000, 5000000))
+        table.put(item)
+        for tag in item_tags(item):
+            tag_table.put(posting_key(tag, image_id))
+        image_ids.append(image_id)
+    return image_ids
+
+
+def run_endpoint(name, handler, events, ok_status=(200, 304)):
+    # Time every call; event construction happens beforehand so only the handler is measured
+    latencies = []
+    errors = 0
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    for event in events:
+        call_started = time.perf_counter()
+        response = handler(event, None)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+        if response.get('statusCode') not in ok_status:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_per_s': len(latencies) / elapsed if elapsed else None,
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_growth_mb': peak_rss_mb() - rss_before,
+    }
+    print(
+        f"{name}: {result['throughput_per_s']:.1f} req/s, p50 {result['p50_ms']:.2f} ms, "
+        f"p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, peak RSS {result['peak_rss_mb']:.0f} MB"
+        + (f", {errors} errors" if errors else ''),
+        file=sys.stderr
+    )
+    return result
+
+
+def upload_events(size, count, rng):
+    # A generator, so only one multi-megabyte body exists at a time
+    for _ in range(count):
+        image = PNG_SIGNATURE + rng.randbytes(size - len(PNG_SIGNATURE))
+        yield {'body': json.dumps({
+            'image': base64.b64encode(image).decode('ascii'),
+            'metadata': {'user_id': f"user-{rng.randrange(10)}", 'tags': ['benchmark']}
+        })}
+
+
+def run_benchmarks(args):
+    rng = random.Random(args.seed)
+    s3 = LocalS3(keep_bodies=False)
+    dynamodb = LocalDynamoDB()
+    aws_clients.set_client('s3', s3)
+    aws_clients.set_client('dynamodb', dynamodb)
+    image_cache.clear()
+
+    seed_started = time.perf_counter()
+    image_ids = seed_table(dynamodb, args.table_size, args.users, rng)
+    print(f"Seeded {len(image_ids)} items in {time.perf_counter() - seed_started:.1f} s", file=sys.stderr)
+
+    endpoints = {}
+    for size in args.image_sizes:
+        endpoints[f"upload_image[{size_label(size)}]"] = run_endpoint(
+            f"upload_image[{size_label(size)}]", upload_image, upload_events(size, args.upload_iterations, rng)
+        )
+
+    endpoints['list_images[user]'] = run_endpoint('list_images[user]', list_images, [
+        {'queryStringParameters': {'user_id': f"user-{rng.randrange(args.users)}", 'limit': '100'}}
+        for _ in range(args.iterations)
+    ])
+    endpoints['list_images[newest]'] = run_endpoint('list_images[newest]', list_images, [
+        {'queryStringParameters': {'user_id': f"user-{rng.randrange(args.users)}", 'order': 'newest', 'limit': '20'}}
+        for _ in range(args.iterations)
+    ])
+    endpoints['list_images[page]'] = run_endpoint('list_images[page]', list_images, [
+        {'queryStringParameters': {'limit': '100'}, 'headers': {'Accept-Encoding': 'gzip'}}
+        for _ in range(args.iterations)
+    ])
+    endpoints['list_images[tags]'] = run_endpoint('list_images[tags]', list_images, [
+        {'queryStringParameters': {'tag': ','.join(rng.sample(SEED_TAGS, 2)), 'match': rng.choice(['all', 'any']), 'limit': '100'}}
+        for _ in range(args.iterations)
+    ])
+    endpoints['view_image'] = run_endpoint('view_image', view_image, [
+        {'pathParameters': {'image_id': rng.choice(image_ids)}, 'headers': {'Accept': 'image/webp,*/*'}}
+        for _ in range(args.iterations)
+    ])
+    endpoints['delete_image'] = run_endpoint('delete_image', delete_image, [
+        {'pathParameters': {'image_id': image_id}}
+        for image_id in rng.sample(image_ids, min(args.iterations, len(image_ids)))
+    ])
+
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'table_size': args.table_size,
+            'users': args.users,
+            'image_sizes': [size_label(size) for size in args.image_sizes],
+            'iterations': args.iterations,
+            'upload_iterations': args.upload_iterations,
+            'seed': args.seed,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    # Every metric that is worse than the baseline by more than the tolerance is a regression
+    if baseline.get('config') != report['config']:
+        raise ValueError(f"Baseline was recorded with {baseline.get('config')}, this run uses {report['config']}")
+
+    regressions = []
+    for name, result in report['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append({'endpoint': name, 'metric': metric, 'baseline': old, 'current': new, 'change': change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the handlers against in-memory AWS stand-ins")
+    parser.add_argument('--table-size', type=int, default=10000, help="items seeded into ImagesMetadata (10k-1M)")
+    parser.add_argument('--users', type=int, default=1000, help="distinct user_ids across the seeded items")
+    parser.add_argument('--image-sizes', type=lambda value: [parse_size(size) for size in value.split(',')],
+                        default=[parse_size(size) for size in ('10KB', '1MB', '10MB')], help="upload sizes, e.g. 10KB,1MB,10MB")
+    parser.add_argument('--iterations', type=int, default=500, help="requests per list/view/delete endpoint")
+    parser.add_argument('--upload-iterations', type=int, default=20, help="uploads per image size")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write the JSON report to this path")
+    parser.add_argument('--save-baseline', help="write the JSON report as the new baseline")
+    parser.add_argument('--baseline', help="fail when this run regresses against the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+    output = json.dumps(report, indent=2)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as report_file:
+                report_file.write(output + '\n')
+    if not args.output and not args.save_baseline:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_to_baseline(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['endpoint']} {regression['metric']}: "
+                f"{regression['baseline']:.2f} -> {regression['current']:.2f} ({regression['change']:+.0%})",
+                file=sys.stderr
+            )
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
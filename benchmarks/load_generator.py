@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+import random
+import base64
+import argparse
+import threading
+import http.client
+from collections import Counter
+from urllib.parse import urlsplit, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrent load generator for the HTTP API. Replays a weighted mix of upload, list, view and
+# delete requests against a running gateway (benchmarks/local_gateway.py or a deployed stage) and
+# reports per-operation latency percentiles, latency histograms and error rates.
+#
+#   python benchmarks/load_generator.py --start-gateway --requests 2000 --concurrency 16
+#   python benchmarks/load_generator.py --url https://abc.execute-api.us-east-1.amazonaws.com/dev \
+#       --mix upload=1,list=4,view=4,delete=1
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+from benchmarks.handlers import parse_size, percentile, PNG_SIGNATURE
+
+OPERATIONS = ('upload', 'list', 'view', 'delete')
+DEFAULT_MIX = 'upload=1,list=4,view=4,delete=1'
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def parse_mix(value):
+    # 'upload=1,list=4' -> {'upload': 1.0, 'list': 4.0}
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one operation with a positive weight")
+    return mix
+
+
+def histogram(latencies):
+    # Counts per bucket, keyed by the bucket's upper bound; slower requests land in '+Inf'
+    counts = {f"<={bound}ms": 0 for bound in HISTOGRAM_BUCKETS_MS}
+    counts['+Inf'] = 0
+    for latency in latencies:
+        bound = next((bound for bound in HISTOGRAM_BUCKETS_MS if latency <= bound), None)
+        counts[f"<={bound}ms" if bound is not None else '+Inf'] += 1
+    return counts
+
+
+class ImagePool:
+    # Image IDs created during the run, shared by the workers; deletes take IDs out of the pool
+    def __init__(self, rng):
+        self.rng = rng
+        self.image_ids = []
+        self._lock = threading.Lock()
+
+    def add(self, image_id):
+        with self._lock:
+            self.image_ids.append(image_id)
+
+    def pick(self):
+        with self._lock:
+            return self.rng.choice(self.image_ids) if self.image_ids else None
+
+    def take(self):
+        with self._lock:
+            if not self.image_ids:
+                return None
+            index = self.rng.randrange(len(self.image_ids))
+            self.image_ids[index], self.image_ids[-1] = self.image_ids[-1], self.image_ids[index]
+            return self.image_ids.pop()
+
+
+class LoadGenerator:
+    def __init__(self, base_url, image_size=10 * 1024, users=100, timeout=30, seed=1):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.image_size = image_size
+        self.users = users
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.pool = ImagePool(random.Random(seed + 1))
+        self._rng_lock = threading.Lock()
+
+    def _random(self, function, *args):
+        with self._rng_lock:
+            return function(*args)
+
+    def request(self, method, path, body=None, headers=None):
+        # One connection per request, so every sample includes the same connection setup
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(self.netloc, timeout=self.timeout)
+        try:
+            connection.request(method, self.base_path + path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def upload_body(self):
+        image = PNG_SIGNATURE + self._random(self.rng.randbytes, max(0, self.image_size - len(PNG_SIGNATURE)))
+        user_id = f"user-{self._random(self.rng.randrange, self.users)}"
+        return json.dumps({
+            'image': base64.b64encode(image).decode('ascii'),
+            'metadata': {'user_id': user_id, 'tags': ['load-test']}
+        })
+
+    def upload(self):
+        status, body = self.request('POST', '/upload', self.upload_body(), {'Content-Type': 'application/json'})
+        if status == 200:
+            self.pool.add(json.loads(body)['imageId'])
+        return status
+
+    def list(self):
+        params = {'limit': '50'}
+        if self._random(self.rng.random) < 0.5:
+            params['user_id'] = f"user-{self._random(self.rng.randrange, self.users)}"
+        status, _ = self.request('GET', '/images?' + urlencode(params), headers={'Accept-Encoding': 'gzip'})
+        return status
+
+    def view(self):
+        image_id = self.pool.pick()
+        if image_id is None:
+            return None
+        status, _ = self.request('GET', f"/images/{image_id}")
+        return status
+
+    def delete(self):
+        image_id = self.pool.take()
+        if image_id is None:
+            return None
+        status, _ = self.request('DELETE', f"/images/{image_id}")
+        return status
+
+    def run_one(self, operation):
+        # Views and deletes need an existing image; with none left the request becomes an upload
+        started = time.perf_counter()
+        try:
+            status = getattr(self, operation)()
+            if status is None:
+                operation = 'upload'
+                started = time.perf_counter()
+                status = self.upload()
+            error = None
+        except Exception as request_error:
+            status, error = None, type(request_error).__name__
+        return operation, status, (time.perf_counter() - started) * 1000, error
+
+    def run(self, operations, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(self.run_one, operations))
+
+
+def summarize(results, elapsed):
+    # Per-operation latency and error statistics; anything but a 2xx or 304 counts as an error
+    report = {'requests': len(results), 'elapsed_s': elapsed,
+              'throughput_per_s': len(results) / elapsed if elapsed else None, 'operations': {}}
+    for operation in OPERATIONS:
+        samples = [result for result in results if result[0] == operation]
+        if not samples:
+            continue
+        latencies = sorted(result[2] for result in samples)
+        errors = sum(1 for _, status, _, _ in samples if status is None or not (200 <= status < 300 or status == 304))
+        report['operations'][operation] = {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': errors / len(samples),
+            'statuses': dict(Counter(str(status or error) for _, status, _, error in samples)),
+            'mean_ms': sum(latencies) / len(latencies),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': latencies[-1],
+            'histogram': histogram(latencies),
+        }
+    total_errors = sum(stats['errors'] for stats in report['operations'].values())
+    report['error_rate'] = total_errors / len(results) if results else 0.0
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsed_s']:.1f} s, {report['throughput_per_s']:.1f} req/s, "
+          f"{report['error_rate']:.2%} errors", file=sys.stderr)
+    for operation, stats in report['operations'].items():
+        print(f"\n{operation}: {stats['requests']} requests, {stats['error_rate']:.2%} errors {stats['statuses']}, "
+              f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms", file=sys.stderr)
+        widest = max(stats['histogram'].values()) or 1
+        for bucket, count in stats['histogram'].items():
+            if count:
+                print(f"  {bucket:>9} {count:>7} {'#' * max(1, round(40 * count / widest))}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a mix of upload/list/view/delete traffic against the HTTP API")
+    parser.add_argument('--url', default='http://127.0.0.1:3000', help="base URL of the API")
+    parser.add_argument('--start-gateway', action='store_true',
+                        help="serve the API in-process with the local gateway and in-memory AWS stand-ins")
+    parser.add_argument('--gateway-workers', type=int, default=32, help="thread pool size of the started gateway")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"operation weights, default {DEFAULT_MIX}")
+    parser.add_argument('--warmup-uploads', type=int, default=20, help="uploads before the measured run, so views and deletes have images")
+    parser.add_argument('--image-size', type=parse_size, default=parse_size('10KB'))
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if args.start_gateway:
+        from benchmarks.local_gateway import make_server
+        server = make_server(port=0, workers=args.gateway_workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        generator = LoadGenerator(base_url, args.image_size, args.users, args.timeout, args.seed)
+        for _ in range(args.warmup_uploads):
+            generator.upload()
+
+        names = list(args.mix)
+        operations = generator.rng.choices(names, weights=[args.mix[name] for name in names], k=args.requests)
+        started = time.perf_counter()
+        results = generator.run(operations, args.concurrency)
+        report = summarize(results, time.perf_counter() - started)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    report['config'] = {
+        'url': 'local gateway' if args.start_gateway else args.url, 'requests': args.requests,
+        'concurrency': args.concurrency, 'mix': args.mix, 'image_size': args.image_size, 'seed': args.seed,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(json.dumps(report, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,548 @@
+import re
+import copy
+import uuid
+import hashlib
+import threading
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# In-memory stand-ins for the S3 and DynamoDB client calls the handlers make. They keep real
+# semantics where the handlers depend on them (conditional writes, ADD counters, index queries,
+# Limit/ExclusiveStartKey paging, projections) but skip everything else (capacity, 1 MB pages, auth).
+# Install them with src.aws_clients.set_client('s3', LocalS3()) and set_client('dynamodb', LocalDynamoDB()).
+
+# Table name -> (hash key, range key) and index name -> (hash key, range key), as in serverless.yml
+table_schemas = {
+    'ImagesMetadata': {
+        'key': ('ImageID', None),
+        'indexes': {'UserCreatedAtIndex': ('UserID', 'CreatedAt')},
+    },
+    'ImageBlobs': {'key': ('ContentHash', None), 'indexes': {}},
+    'ImageVersions': {'key': ('Scope', None), 'indexes': {}},
+    'ImageTags': {'key': ('Tag', 'ImageID'), 'indexes': {}},
+    'UploadIdempotency': {'key': ('IdempotencyKey', None), 'indexes': {}},
+}
+
+
+def client_error(code, operation, message=''):
+    return ClientError({'Error': {'Code': code, 'Message': message or code}}, operation)
+
+
+class LocalS3:
+    # keep_bodies=False only records object sizes, so large upload benchmarks do not measure the stand-in
+    def __init__(self, keep_bodies=True):
+        self.keep_bodies = keep_bodies
+        self.objects = {}
+        self.uploads = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType='binary/octet-stream', Metadata=None, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.encode('utf-8') if isinstance(Body, str) else Body.read()
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self.objects[(Bucket, Key)] = {
+                'Body': data if self.keep_bodies else b'', 'Size': len(data),
+                'ContentType': ContentType, 'Metadata': dict(Metadata or {}), 'ETag': etag
+            }
+        return {'ETag': etag}
+
+    def _object(self, Bucket, Key, operation):
+        with self._lock:
+            stored = self.objects.get((Bucket, Key))
+        if stored is None:
+            raise client_error('404' if operation == 'HeadObject' else 'NoSuchKey', operation)
+        return stored
+
+    def head_object(self, Bucket, Key, **kwargs):
+        stored = self._object(Bucket, Key, 'HeadObject')
+        return {'ContentLength': stored['Size'], 'ContentType': stored['ContentType'], 'Metadata': stored['Metadata'], 'ETag': stored['ETag']}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        stored = self._object(Bucket, Key, 'GetObject')
+        response = self.head_object(Bucket, Key)
+        response['Body'] = LocalStreamingBody(stored['Body'])
+        return response
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        deleted = []
+        for entry in Delete['Objects']:
+            self.delete_object(Bucket, entry['Key'])
+            deleted.append({'Key': entry['Key']})
+        return {} if Delete.get('Quiet') else {'Deleted': deleted}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType='binary/octet-stream', **kwargs):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {'Bucket': Bucket, 'Key': Key, 'ContentType': ContentType, 'Parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        with self._lock:
+            self.uploads[UploadId]['Parts'][PartNumber] = Body
+        return {'ETag': etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        with self._lock:
+            upload = self.uploads.pop(UploadId)
+        data = b''.join(upload['Parts'][part['PartNumber']] for part in MultipartUpload['Parts'])
+        return self.put_object(Bucket, Key, data, upload['ContentType'])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?X-Amz-Expires={ExpiresIn}&X-Amz-Signature={uuid.uuid4().hex}"
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        return {'url': f"https://{Bucket}.s3.local/", 'fields': dict(Fields or {}, key=Key)}
+
+
+class LocalStreamingBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, amount=None):
+        chunk, self.data = (self.data, b'') if amount is None else (self.data[:amount], self.data[amount:])
+        return chunk
+
+
+def split_top_level(text, separator=','):
+    # Split on separators that are not inside parentheses
+    parts, depth, current = [], 0, ''
+    for char in text:
+        depth += (char == '(') - (char == ')')
+        if char == separator and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def number(attribute):
+    return Decimal(attribute['N'])
+
+
+def format_number(value):
+    text = format(value.normalize(), 'f')
+    return text[:-2] if text.endswith('.0') else text
+
+
+class Expressions:
+    # Evaluates the expression subset the handlers use against one item
+    def __init__(self, names=None, values=None):
+        self.names = names or {}
+        self.values = values or {}
+
+    def path(self, text):
+        return [self.names.get(part.strip(), part.strip()) for part in text.strip().split('.')]
+
+    def resolve(self, item, text):
+        text = text.strip()
+        if text.startswith(':'):
+            return self.values[text]
+        value = {'M': item}
+        for segment in self.path(text):
+            if value is None or 'M' not in value:
+                return None
+            value = value['M'].get(segment)
+        return value
+
+    def compare(self, left, operator, right):
+        if left is None or right is None:
+            return operator == '<>' and left != right
+        if 'N' in left and 'N' in right:
+            left, right = number(left), number(right)
+        elif 'S' in left and 'S' in right:
+            left, right = left['S'], right['S']
+        elif operator in ('=', '<>'):
+            return (left == right) == (operator == '=')
+        else:
+            return False
+        return {
+            '=': left == right, '<>': left != right, '<': left < right,
+            '<=': left <= right, '>': left > right, '>=': left >= right
+        }[operator]
+
+    def condition(self, item, expression):
+        # OR binds looser than AND; NOT and parentheses are supported for whole clauses
+        if not expression:
+            return True
+        expression = expression.strip()
+        or_parts = self._split_keyword(expression, 'OR')
+        if len(or_parts) > 1:
+            return any(self.condition(item, part) for part in or_parts)
+        and_parts = self._split_keyword(expression, 'AND')
+        if len(and_parts) > 1:
+            return all(self.condition(item, part) for part in and_parts)
+        if expression.startswith('NOT '):
+            return not self.condition(item, expression[4:])
+        if expression.startswith('(') and expression.endswith(')'):
+            return self.condition(item, expression[1:-1])
+
+        function = re.match(r'^(\w+)\((.*)\)$', expression)
+        if function:
+            name, args = function.group(1), split_top_level(function.group(2))
+            value = self.resolve(item, args[0])
+            if name == 'attribute_exists':
+                return value is not None
+            if name == 'attribute_not_exists':
+                return value is None
+            if name == 'attribute_type':
+                return value is not None and list(value)[0] == self.values[args[1]]['S']
+            if name == 'begins_with':
+                return value is not None and 'S' in value and value['S'].startswith(self.values[args[1]]['S'])
+            if name == 'contains':
+                operand = self.values[args[1]]
+                if value is None:
+                    return False
+                if 'SS' in value:
+                    return operand.get('S') in value['SS']
+                if 'L' in value:
+                    return operand in value['L']
+                return 'S' in value and operand.get('S', '') in value['S']
+            raise NotImplementedError(f'Unsupported function: {name}')
+
+        between = re.match(r'^(.+?)\s+BETWEEN\s+(:\w+)\s+AND\s+(:\w+)$', expression)
+        if between:
+            value = self.resolve(item, between.group(1))
+            return self.compare(value, '>=', self.values[between.group(2)]) and self.compare(value, '<=', self.values[between.group(3)])
+
+        comparison = re.match(r'^(.+?)\s*(<>|<=|>=|=|<|>)\s*(.+)$', expression)
+        if comparison:
+            return self.compare(self.resolve(item, comparison.group(1)), comparison.group(2), self.resolve(item, comparison.group(3)))
+        raise NotImplementedError(f'Unsupported condition: {expression}')
+
+    def _split_keyword(self, expression, keyword):
+        # Split on a keyword outside parentheses, leaving BETWEEN ... AND ... intact
+        parts, depth, text, between = [], 0, '', False
+        for token in re.split(r'(\s+|\(|\))', expression):
+            depth += (token == '(') - (token == ')')
+            if token == 'BETWEEN' and depth == 0:
+                between = True
+            if token == keyword and depth == 0:
+                if keyword == 'AND' and between:
+                    between = False
+                else:
+                    parts.append(text)
+                    text = ''
+                    continue
+            text += token
+        parts.append(text)
+        return [part.strip() for part in parts if part.strip()]
+
+    def set_path(self, item, text, value):
+        path = self.path(text)
+        target = item
+        for segment in path[:-1]:
+            target = target[segment]['M']
+        target[path[-1]] = value
+
+    def remove_path(self, item, text):
+        path = self.path(text)
+        target = item
+        for segment in path[:-1]:
+            target = target.get(segment, {}).get('M', {})
+        target.pop(path[-1], None)
+
+    def operand(self, item, text):
+        text = text.strip()
+        function = re.match(r'^(\w+)\((.*)\)$', text)
+        if function and function.group(1) == 'if_not_exists':
+            path, default = split_top_level(function.group(2))
+            current = self.resolve(item, path)
+            return current if current is not None else self.operand(item, default)
+        if function and function.group(1) == 'list_append':
+            first, second = (self.operand(item, arg) for arg in split_top_level(function.group(2)))
+            return {'L': (first or {'L': []})['L'] + (second or {'L': []})['L']}
+        arithmetic = re.match(r'^(\S+)\s+([+-])\s+(\S+)$', text)
+        if arithmetic:
+            left, right = self.operand(item, arithmetic.group(1)), self.operand(item, arithmetic.group(3))
+            result = number(left) + number(right) if arithmetic.group(2) == '+' else number(left) - number(right)
+            return {'N': format_number(result)}
+        return copy.deepcopy(self.resolve(item, text))
+
+    def update(self, item, expression):
+        sections = re.split(r'\b(SET|ADD|REMOVE|DELETE)\b', expression)
+        for action, body in zip(sections[1::2], sections[2::2]):
+            for clause in split_top_level(body):
+                if action == 'SET':
+                    target, value = clause.split('=', 1)
+                    self.set_path(item, target, self.operand(item, value))
+                elif action == 'REMOVE':
+                    self.remove_path(item, clause)
+                else:
+                    target, operand = clause.rsplit(None, 1)
+                    current = self.resolve(item, target)
+                    operand = self.values[operand]
+                    if 'N' in operand:
+                        total = (number(current) if current else Decimal(0)) + number(operand)
+                        self.set_path(item, target, {'N': format_number(total)})
+                    else:
+                        set_type = list(operand)[0]
+                        members = set(current[set_type]) if current else set()
+                        members = members | set(operand[set_type]) if action == 'ADD' else members - set(operand[set_type])
+                        if members:
+                            self.set_path(item, target, {set_type: sorted(members)})
+                        else:
+                            self.remove_path(item, target)
+
+    def project(self, item, expression):
+        if not expression:
+            return copy.deepcopy(item)
+        projected = {}
+        for text in split_top_level(expression):
+            path = self.path(text)
+            value = {'M': item}
+            for segment in path:
+                value = value.get('M', {}).get(segment) if value else None
+            if value is None:
+                continue
+            target = projected
+            for segment in path[:-1]:
+                target = target.setdefault(segment, {'M': {}})['M']
+            target[path[-1]] = copy.deepcopy(value)
+        return projected
+
+
+class LocalTable:
+    def __init__(self, name, schema):
+        self.name = name
+        self.hash_key, self.range_key = schema['key']
+        self.indexes = dict(schema.get('indexes', {}))
+        self.items = {}
+        # Scan order with tombstones, so ExclusiveStartKey positions stay valid across deletes
+        self.order = []
+        self.positions = {}
+        # (index name, or None for a table with a range key) -> hash value -> {primary key: None},
+        # kept in sync with every write
+        self.partitions = {index_name: {} for index_name in self.indexes}
+        if self.range_key:
+            self.partitions[None] = {}
+        # (index name, hash value) -> partition keys in range key order, rebuilt after the partition changes
+        self._sorted = {}
+
+    def primary_key(self, attributes):
+        key = (self._key_value(attributes[self.hash_key]),)
+        if self.range_key:
+            key += (self._key_value(attributes[self.range_key]),)
+        return key
+
+    def key_attributes(self, item):
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    @staticmethod
+    def _key_value(attribute):
+        return ('N', number(attribute)) if 'N' in attribute else (list(attribute)[0], list(attribute.values())[0])
+
+    def _index_hash(self, item, index_name):
+        hash_name = self.hash_key if index_name is None else self.indexes[index_name][0]
+        range_name = self.range_key if index_name is None else self.indexes[index_name][1]
+        if hash_name not in item or (range_name and range_name not in item):
+            return None
+        return self._key_value(item[hash_name])
+
+    def put(self, item):
+        # Replacing an item keeps its scan position, like DynamoDB's hash-ordered scans
+        key = self.primary_key(item)
+        old = self.items.get(key)
+        if old is not None:
+            self._unindex(key, old)
+        else:
+            if key in self.positions and self.order[self.positions[key]] is None:
+                self.order[self.positions[key]] = key
+            else:
+                self.positions[key] = len(self.order)
+                self.order.append(key)
+        self.items[key] = item
+        for index_name in self.partitions:
+            hash_value = self._index_hash(item, index_name)
+            if hash_value is not None:
+                self.partitions[index_name].setdefault(hash_value, {})[key] = None
+                self._sorted.pop((index_name, hash_value), None)
+
+    def sorted_partition(self, index_name, hash_value):
+        # Keys of one partition in ascending range key order
+        cache_key = (index_name, hash_value)
+        if cache_key not in self._sorted:
+            range_name = self.range_key if index_name is None else self.indexes[index_name][1]
+            keys = list(self.partitions[index_name].get(hash_value, {}))
+            if range_name:
+                keys.sort(key=lambda key: self._key_value(self.items[key][range_name]))
+            self._sorted[cache_key] = keys
+        return self._sorted[cache_key]
+
+    def delete(self, key):
+        # Deleted keys leave a tombstone, so a scan resuming after them continues where it was
+        item = self.items.pop(key, None)
+        if item is None:
+            return None
+        self.order[self.positions[key]] = None
+        self._unindex(key, item)
+        return item
+
+    def _unindex(self, key, item):
+        for index_name in self.partitions:
+            hash_value = self._index_hash(item, index_name)
+            if hash_value is not None:
+                partition = self.partitions[index_name].get(hash_value, {})
+                partition.pop(key, None)
+                self._sorted.pop((index_name, hash_value), None)
+                if not partition:
+                    self.partitions[index_name].pop(hash_value, None)
+
+
+class LocalDynamoDB:
+    def __init__(self, schemas=None):
+        self.tables = {name: LocalTable(name, schema) for name, schema in (schemas or table_schemas).items()}
+        self._lock = threading.RLock()
+
+    def table(self, name, operation):
+        if name not in self.tables:
+            raise client_error('ResourceNotFoundException', operation, f'Table {name} does not exist')
+        return self.tables[name]
+
+    def _check(self, table, key, condition, names, values, operation):
+        if condition and not Expressions(names, values).condition(table.items.get(key, {}), condition):
+            raise client_error('ConditionalCheckFailedException', operation, 'The conditional request failed')
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **kwargs):
+        with self._lock:
+            table = self.table(TableName, 'PutItem')
+            key = table.primary_key(Item)
+            self._check(table, key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, 'PutItem')
+            table.put(copy.deepcopy(Item))
+        return {}
+
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        with self._lock:
+            table = self.table(TableName, 'GetItem')
+            item = table.items.get(table.primary_key(Key))
+            if item is None:
+                return {}
+            return {'Item': Expressions(ExpressionAttributeNames).project(item, ProjectionExpression)}
+
+    def delete_item(self, TableName, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None, **kwargs):
+        with self._lock:
+            table = self.table(TableName, 'DeleteItem')
+            key = table.primary_key(Key)
+            self._check(table, key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, 'DeleteItem')
+            item = table.delete(key)
+        return {'Attributes': item} if ReturnValues == 'ALL_OLD' and item else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None, **kwargs):
+        with self._lock:
+            table = self.table(TableName, 'UpdateItem')
+            key = table.primary_key(Key)
+            self._check(table, key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, 'UpdateItem')
+            old = table.items.get(key)
+            item = copy.deepcopy(old) if old else copy.deepcopy(Key)
+            Expressions(ExpressionAttributeNames, ExpressionAttributeValues).update(item, UpdateExpression)
+            table.put(item)
+        if ReturnValues == 'ALL_NEW':
+            return {'Attributes': copy.deepcopy(item)}
+        if ReturnValues == 'ALL_OLD' and old:
+            return {'Attributes': old}
+        return {}
+
+    def _page(self, table, keys, kwargs):
+        # Evaluate up to Limit candidate keys after the start key, then filter and project them
+        expressions = Expressions(kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues'))
+        limit = kwargs.get('Limit')
+        items, evaluated, last_key = [], 0, None
+        for key in keys:
+            item = table.items.get(key)
+            if item is None:
+                continue
+            evaluated += 1
+            if expressions.condition(item, kwargs.get('FilterExpression')):
+                items.append(expressions.project(item, kwargs.get('ProjectionExpression')))
+            if limit and evaluated >= limit:
+                last_key = item
+                break
+
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': evaluated}
+        if last_key is not None:
+            start = table.key_attributes(last_key)
+            index_name = kwargs.get('IndexName')
+            if index_name:
+                for name in table.indexes[index_name]:
+                    if name:
+                        start[name] = last_key[name]
+            response['LastEvaluatedKey'] = copy.deepcopy(start)
+        return response
+
+    def scan(self, TableName, Segment=0, TotalSegments=1, ExclusiveStartKey=None, IndexName=None, **kwargs):
+        with self._lock:
+            table = self.table(TableName, 'Scan')
+            start = table.positions.get(table.primary_key(ExclusiveStartKey), -1) + 1 if ExclusiveStartKey else 0
+            keys = (
+                key for position, key in enumerate(table.order[start:], start)
+                if key is not None and position % TotalSegments == Segment
+                and (IndexName is None or table._index_hash(table.items[key], IndexName) is not None)
+            )
+            return self._page(table, keys, dict(kwargs, IndexName=IndexName))
+
+    def query(self, TableName, KeyConditionExpression, IndexName=None, ExclusiveStartKey=None,
+              ScanIndexForward=True, **kwargs):
+        with self._lock:
+            table = self.table(TableName, 'Query')
+            hash_name, range_name = (table.hash_key, table.range_key) if IndexName is None else table.indexes[IndexName]
+            expressions = Expressions(kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues'))
+
+            # The first clause must be the hash key equality; the rest restricts the range key
+            clauses = expressions._split_keyword(KeyConditionExpression, 'AND')
+            hash_clause = next(c for c in clauses if expressions.path(re.split(r'\s*=\s*', c)[0])[0] == hash_name)
+            hash_value = expressions.values[re.split(r'\s*=\s*', hash_clause)[1].strip()]
+            range_condition = ' AND '.join(c for c in clauses if c is not hash_clause)
+
+            if IndexName is None and not range_name:
+                key = (table._key_value(hash_value),)
+                candidates = [key] if key in table.items else []
+            else:
+                candidates = table.sorted_partition(IndexName, table._key_value(hash_value))
+            if not ScanIndexForward:
+                candidates = candidates[::-1]
+            if ExclusiveStartKey:
+                start_key = table.primary_key(ExclusiveStartKey)
+                candidates = candidates[candidates.index(start_key) + 1:] if start_key in candidates else []
+            # The range condition is checked lazily, so a Limit stops the walk early
+            if range_condition:
+                candidates = (key for key in candidates if expressions.condition(table.items[key], range_condition))
+            return self._page(table, candidates, dict(kwargs, IndexName=IndexName))
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            responses[table_name] = []
+            for key in request['Keys']:
+                item = self.get_item(
+                    table_name, key, request.get('ProjectionExpression'), request.get('ExpressionAttributeNames')
+                ).get('Item')
+                if item:
+                    responses[table_name].append(item)
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        for table_name, requests in RequestItems.items():
+            for request in requests:
+                if 'PutRequest' in request:
+                    self.put_item(table_name, request['PutRequest']['Item'])
+                else:
+                    self.delete_item(table_name, request['DeleteRequest']['Key'])
+        return {'UnprocessedItems': {}}
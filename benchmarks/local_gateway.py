@@ -0,0 +1,291 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import base64
+import logging
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# PyYAML is only needed to read the routes from serverless.yml
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Local stand-in for API Gateway: serves the http routes of serverless.yml from a thread pool,
+# building REST API (payload format 1.0) events for the handler functions.
+#
+#   python benchmarks/local_gateway.py --port 3000 --workers 16
+#   curl http://127.0.0.1:3000/images?limit=10
+#
+# With --backend local (the default) the handlers use the in-memory S3 and DynamoDB stand-ins from
+# benchmarks/local_aws.py; with --backend aws they use real clients, configured the usual boto3 way.
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+default_config_path = os.path.join(repo_root, 'serverless.yml')
+
+# Handler functions by their serverless.yml handler path
+_handlers = {}
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def route_pattern(path):
+    # {name} matches one path segment and {name+} the rest of the path, as in API Gateway
+    pattern = ''
+    for segment in path.strip('/').split('/'):
+        match = re.fullmatch(r'\{([A-Za-z0-9_]+)(\+?)\}', segment)
+        if match:
+            pattern += f"/(?P<{match.group(1)}>{'.+' if match.group(2) else '[^/]+'})"
+        elif segment:
+            pattern += '/' + re.escape(segment)
+    return re.compile(f"^{pattern or '/'}$")
+
+
+def load_config(config_path=default_config_path):
+    if yaml is None:
+        raise RuntimeError("Reading serverless.yml needs PyYAML: pip install pyyaml")
+    with open(config_path) as config_file:
+        return yaml.safe_load(config_file)
+
+
+def load_routes(config):
+    # One route per http event; events can also use the 'GET images' shorthand
+    routes = []
+    for function_name, function in (config.get('functions') or {}).items():
+        for event in function.get('events') or []:
+            http = event.get('http') if isinstance(event, dict) else None
+            if not http:
+                continue
+            if isinstance(http, str):
+                method, path = http.split(None, 1)
+            else:
+                method, path = http['method'], http['path']
+            resource = '/' + path.strip('/')
+            routes.append({
+                'function': function_name,
+                'handler': function['handler'],
+                'method': method.upper(),
+                'resource': resource,
+                'pattern': route_pattern(resource),
+            })
+
+    # Literal paths win over parameters, so POST images/view never matches images/{image_id}
+    routes.sort(key=lambda route: route['resource'].count('{'))
+    return routes
+
+
+def match_route(routes, method, path):
+    # Returns (route, path parameters), or (None, methods allowed on the path)
+    allowed = []
+    for route in routes:
+        match = route['pattern'].match(path)
+        if not match:
+            continue
+        if route['method'] in (method, 'ANY'):
+            return route, match.groupdict()
+        allowed.append(route['method'])
+    return None, allowed
+
+
+def resolve_handler(handler_path):
+    # 'src.upload_image.upload_image' -> the function, imported on first use
+    if handler_path not in _handlers:
+        module_name, function_name = handler_path.rsplit('.', 1)
+        _handlers[handler_path] = getattr(importlib.import_module(module_name), function_name)
+    return _handlers[handler_path]
+
+
+def build_event(route, method, path, query, headers, body, path_parameters, stage='dev', source_ip='127.0.0.1'):
+    # REST API proxy integration event; bodies that are not UTF-8 are passed base64-encoded
+    multi_query = parse_qs(query, keep_blank_values=True)
+    is_base64 = False
+    if body:
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            body = base64.b64encode(body).decode('ascii')
+            is_base64 = True
+
+    return {
+        'resource': route['resource'],
+        'path': path,
+        'httpMethod': method,
+        'headers': dict(headers) or None,
+        'multiValueHeaders': {name: [value] for name, value in headers.items()} or None,
+        'queryStringParameters': {name: values[-1] for name, values in multi_query.items()} or None,
+        'multiValueQueryStringParameters': multi_query or None,
+        'pathParameters': path_parameters or None,
+        'stageVariables': None,
+        'requestContext': {
+            'requestId': str(uuid.uuid4()),
+            'stage': stage,
+            'httpMethod': method,
+            'resourcePath': route['resource'],
+            'path': f"/{stage}{path}",
+            'requestTimeEpoch': int(time.time() * 1000),
+            'identity': {'sourceIp': source_ip},
+        },
+        'body': body or None,
+        'isBase64Encoded': is_base64,
+    }
+
+
+class LambdaContext:
+    # The attributes of the Lambda context object that code commonly reads
+    def __init__(self, function_name, timeout_seconds=30):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.memory_limit_in_mb = 1024
+        self.aws_request_id = str(uuid.uuid4())
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def invoke(routes, method, raw_path, headers, body, stage='dev', source_ip='127.0.0.1'):
+    # Route a request and run its handler; returns (status, headers, body bytes)
+    parts = urlsplit(raw_path)
+    path = parts.path
+    if path.startswith(f"/{stage}/"):
+        path = path[len(stage) + 1:]
+
+    route, path_parameters = match_route(routes, method, path)
+    if route is None:
+        status = 405 if path_parameters else 404
+        return status, {'Content-Type': 'application/json'}, json.dumps({'message': 'Method Not Allowed' if status == 405 else 'Not Found'}).encode('utf-8')
+
+    event = build_event(route, method, path, parts.query, headers, body, path_parameters, stage, source_ip)
+    try:
+        response = resolve_handler(route['handler'])(event, LambdaContext(route['function']))
+    except Exception:
+        # API Gateway answers a failed invocation with a 502
+        logger.exception("Handler %s raised", route['handler'])
+        return 502, {'Content-Type': 'application/json'}, json.dumps({'message': 'Internal server error'}).encode('utf-8')
+
+    response_headers = {'Content-Type': 'application/json'}
+    response_headers.update(response.get('headers') or {})
+    response_body = response.get('body') or ''
+    if response.get('isBase64Encoded'):
+        response_body = base64.b64decode(response_body)
+    elif isinstance(response_body, str):
+        response_body = response_body.encode('utf-8')
+    return int(response.get('statusCode', 200)), response_headers, response_body
+
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    # Routes and stage are set on the subclass created by make_server
+    routes = []
+    stage = 'dev'
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, response_body = invoke(
+            self.routes, self.command, self.path, dict(self.headers.items()), body, self.stage, self.client_address[0]
+        )
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.send_header('Content-Length', str(len(response_body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(response_body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class PooledHTTPServer(HTTPServer):
+    # Serves each connection on a bounded thread pool instead of a thread per request. The listen
+    # backlog is raised from 5 so bursts of connections are queued instead of retried a second later.
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers=16):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gateway')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def install_local_backend():
+    # Point every handler at fresh in-memory stand-ins
+    from benchmarks.local_aws import LocalS3, LocalDynamoDB
+    from src import aws_clients
+
+    aws_clients.set_client('s3', LocalS3(keep_bodies=False))
+    aws_clients.set_client('dynamodb', LocalDynamoDB())
+
+
+def make_server(host='127.0.0.1', port=3000, workers=16, config_path=default_config_path, backend='local', stage='dev'):
+    config = load_config(config_path)
+
+    # Handlers read their settings at import time, so apply the provider environment first
+    for name, value in ((config.get('provider') or {}).get('environment') or {}).items():
+        os.environ.setdefault(name, str(value))
+    if backend == 'local':
+        install_local_backend()
+
+    routes = load_routes(config)
+    for route in routes:
+        resolve_handler(route['handler'])
+
+    handler_class = type('RoutedGatewayRequestHandler', (GatewayRequestHandler,), {'routes': routes, 'stage': stage})
+    return PooledHTTPServer((host, port), handler_class, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the serverless.yml http routes locally")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=16, help="size of the request thread pool")
+    parser.add_argument('--config', default=default_config_path, help="serverless.yml to read routes from")
+    parser.add_argument('--backend', choices=('local', 'aws'), default='local',
+                        help="in-memory S3/DynamoDB stand-ins, or real clients")
+    parser.add_argument('--stage', default='dev', help="paths may be prefixed with /<stage>")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    server = make_server(args.host, args.port, args.workers, args.config, args.backend, args.stage)
+    for route in server.RequestHandlerClass.routes:
+        logger.info("%-6s %-24s -> %s", route['method'], route['resource'], route['handler'])
+    logger.info("Serving on http://%s:%d with %d workers (%s backend)", args.host, server.server_port, args.workers, args.backend)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import logging
+import threading
+import boto3
+from botocore.config import Config
+from src.metrics import metrics_enabled, register_client_metrics
+
+# Connection pool size per client; it must cover the largest thread pool that shares a client
+# (parallel scans and batch uploads run up to 32 workers)
+max_pool_connections = int(os.environ.get('CLIENT_MAX_POOL_CONNECTIONS', '32'))
+
+# Fail fast on a stuck connection instead of waiting out the botocore defaults of 60 seconds
+connect_timeout = float(os.environ.get('CLIENT_CONNECT_TIMEOUT', '2'))
+read_timeout = float(os.environ.get('CLIENT_READ_TIMEOUT', '10'))
+
+# Adaptive retries add client-side rate limiting on top of the standard backoff when throttled
+retry_mode = os.environ.get('CLIENT_RETRY_MODE', 'adaptive')
+max_attempts = int(os.environ.get('CLIENT_MAX_ATTEMPTS', '5'))
+
+client_config = Config(
+    max_pool_connections=max_pool_connections,
+    tcp_keepalive=True,
+    connect_timeout=connect_timeout,
+    read_timeout=read_timeout,
+    retries={'mode': retry_mode, 'max_attempts': max_attempts},
+)
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+# Clients live at module level, so one container reuses them (and their open connections)
+# across warm invocations
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name):
+    # Create the client on first use only; handlers never pay for clients they do not touch
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+
+    # boto3's default session is not thread-safe, so creation is serialized
+    with _lock:
+        client = _clients.get(service_name)
+        if client is None:
+            logger.debug("Creating %s client", service_name)
+            client = boto3.client(service_name, config=client_config)
+            if metrics_enabled:
+                register_client_metrics(client)
+            _clients[service_name] = client
+    return client
+
+
+def set_client(service_name, client):
+    # Inject a stand-in (a mock or a local emulator client) for every module sharing the service
+    with _lock:
+        _clients[service_name] = client
+
+
+def reset_clients():
+    # Drop cached clients so the next use creates them again
+    with _lock:
+        _clients.clear()
+
+
+class LazyClient:
+    # Module-level placeholder that resolves the shared client on first attribute access.
+    # Handlers keep their `s3_client.put_object(...)` calls and tests can still patch `module.s3_client`.
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def __getattr__(self, name):
+        return getattr(get_client(self.service_name), name)
+
+    def __repr__(self):
+        return f"LazyClient({self.service_name!r})"
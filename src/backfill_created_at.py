@@ -0,0 +1,61 @@
+import sys
+import json
+import logging
+from botocore.exceptions import ClientError
+from src.timestamps import format_timestamp
+from src.parallel_scan import parallel_scan_items, parse_total_segments
+from src.aws_clients import LazyClient
+from src.log_config import log_level
+
+# Initialize S3 and DynamoDB clients
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
+s3_bucket_name = "mc-image-insta-uploaders"
+dynamo_table_name = "ImagesMetadata"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def backfill_created_at(total_segments=None):
+    # Give every item written before CreatedAt existed the LastModified time of its S3 object, so it
+    # appears in the UserCreatedAtIndex. Items whose object is gone are left out of the index.
+    updated = 0
+    skipped = 0
+    failed = 0
+
+    for item in parallel_scan_items(
+        dynamodb_client.scan,
+        total_segments,
+        TableName=dynamo_table_name,
+        FilterExpression="attribute_not_exists(CreatedAt)",
+        ProjectionExpression="ImageID, S3Key"
+    ):
+        image_id = item['ImageID']['S']
+        try:
+            head = s3_client.head_object(Bucket=s3_bucket_name, Key=item['S3Key']['S'])
+            # The condition leaves items alone that got a CreatedAt since the scan read them
+            dynamodb_client.update_item(
+                TableName=dynamo_table_name,
+                Key={'ImageID': {'S': image_id}},
+                UpdateExpression="SET CreatedAt = :created_at",
+                ConditionExpression="attribute_not_exists(CreatedAt)",
+                ExpressionAttributeValues={':created_at': {'S': format_timestamp(head['LastModified'])}}
+            )
+            logger.debug("Backfilled CreatedAt for image_id: %s", image_id)
+            updated += 1
+        except ClientError as client_error:
+            code = client_error.response.get('Error', {}).get('Code')
+            if code in ('ConditionalCheckFailedException', '404', 'NoSuchKey'):
+                logger.debug("Skipping image_id %s: %s", image_id, code)
+                skipped += 1
+                continue
+            logger.error("Error backfilling CreatedAt for image_id %s: %s", image_id, str(client_error))
+            failed += 1
+
+    logger.info("CreatedAt backfill complete: %d updated, %d skipped, %d failed", updated, skipped, failed)
+    return {'updated': updated, 'skipped': skipped, 'failed': failed}
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    print(json.dumps(backfill_created_at(parse_total_segments(sys.argv[1] if len(sys.argv) > 1 else None))))
@@ -0,0 +1,64 @@
+import json
+import logging
+from src.pagination import iter_items
+from src.metadata import extract_user_id, extract_tags, parse_metadata
+from src.aws_clients import LazyClient
+from src.log_config import log_level
+
+# Initialize DynamoDB client
+dynamodb_client = LazyClient('dynamodb')
+dynamo_table_name = "ImagesMetadata"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def backfill_index_attributes():
+    # Copy user_id and tags out of the legacy JSON Metadata string into the first-class
+    # UserID and Tags attributes, so items written before the index existed become queryable
+    updated = 0
+    skipped = 0
+
+    for item in iter_items(
+        dynamodb_client.scan,
+        TableName=dynamo_table_name,
+        FilterExpression="attribute_not_exists(UserID) AND attribute_not_exists(Tags)",
+        ProjectionExpression="ImageID, Metadata"
+    ):
+        image_id = item['ImageID']['S']
+        metadata = parse_metadata(item.get('Metadata'))
+        if not isinstance(metadata, dict):
+            logger.warning("Skipping image_id %s: metadata is not a JSON object", image_id)
+            skipped += 1
+            continue
+
+        user_id = extract_user_id(metadata)
+        tags = extract_tags(metadata)
+        if not user_id and not tags:
+            skipped += 1
+            continue
+
+        set_clauses = []
+        expression_values = {}
+        if user_id:
+            set_clauses.append("UserID = :user_id")
+            expression_values[':user_id'] = {'S': user_id}
+        if tags:
+            set_clauses.append("Tags = :tags")
+            expression_values[':tags'] = {'SS': tags}
+
+        dynamodb_client.update_item(
+            TableName=dynamo_table_name,
+            Key={'ImageID': {'S': image_id}},
+            UpdateExpression="SET " + ", ".join(set_clauses),
+            ExpressionAttributeValues=expression_values
+        )
+        logger.debug("Backfilled index attributes for image_id: %s", image_id)
+        updated += 1
+
+    logger.info("Backfill complete: %d items updated, %d skipped", updated, skipped)
+    return {'updated': updated, 'skipped': skipped}
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    print(json.dumps(backfill_index_attributes()))
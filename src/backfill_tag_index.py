@@ -0,0 +1,58 @@
+import sys
+import json
+import logging
+from src.tag_index import index_tags, item_tags
+from src.parallel_scan import parallel_scan_items, parse_total_segments
+from src.aws_clients import LazyClient
+from src.log_config import log_level
+
+# Initialize DynamoDB client
+dynamodb_client = LazyClient('dynamodb')
+dynamo_table_name = "ImagesMetadata"
+
+# Images whose postings are written together; BatchWriteItem splits them into 25-item calls
+flush_size = 200
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def backfill_tag_index(total_segments=None):
+    # Write the tag postings of every image that has a Tags attribute, so images stored before the
+    # tag index existed become findable through it. Postings are plain puts, so re-running the job
+    # (or running it while uploads continue) is safe. Legacy items get their Tags attribute from
+    # backfill_index_attributes first.
+    indexed = 0
+    postings = 0
+    failed = 0
+    pending = {}
+
+    def flush():
+        nonlocal indexed, postings, failed
+        failed_ids = index_tags(dynamodb_client, pending)
+        for image_id in failed_ids:
+            logger.error("Could not write the tag postings of image_id %s", image_id)
+        indexed += len(pending) - len(failed_ids)
+        postings += sum(len(tags) for image_id, tags in pending.items() if image_id not in failed_ids)
+        failed += len(failed_ids)
+        pending.clear()
+
+    for item in parallel_scan_items(
+        dynamodb_client.scan,
+        total_segments,
+        TableName=dynamo_table_name,
+        FilterExpression="attribute_exists(Tags)",
+        ProjectionExpression="ImageID, Tags"
+    ):
+        pending[item['ImageID']['S']] = item_tags(item)
+        if len(pending) >= flush_size:
+            flush()
+    if pending:
+        flush()
+
+    logger.info("Tag index backfill complete: %d images, %d postings, %d failed", indexed, postings, failed)
+    return {'indexed': indexed, 'postings': postings, 'failed': failed}
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    print(json.dumps(backfill_tag_index(parse_total_segments(sys.argv[1] if len(sys.argv) > 1 else None))))
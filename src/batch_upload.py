@@ -0,0 +1,163 @@
+import os
+import json
+import base64
+import logging
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from src.metadata import build_image_item, extract_user_id, extract_tags
+from src.tag_index import index_tags, unindex_tags
+from src.versions import bump_versions
+from src.batching import batch_write
+from src.transcode import sniff_format
+from src.blob_store import deduplicate_uploads, acquire_blob, release_blob
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
+
+# Initialize S3 and DynamoDB clients
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
+s3_bucket_name = "mc-image-insta-uploaders"
+dynamo_table_name = "ImagesMetadata"
+
+# Maximum number of images per request and number of concurrent S3 uploads
+max_batch_size = 100
+upload_concurrency = int(os.environ.get('BATCH_UPLOAD_CONCURRENCY', '10'))
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def prepare_entry(index, entry):
+    # Validate and decode one image of the batch; returns (result, upload) where upload is None on error
+    if not isinstance(entry, dict) or not entry.get('image'):
+        return {'index': index, 'status': 'failed', 'error': 'No image data found'}, None
+    if not entry.get('metadata'):
+        return {'index': index, 'status': 'failed', 'error': 'No metadata found'}, None
+
+    try:
+        image_bytes = base64.b64decode(entry['image'])
+    except Exception as decode_error:
+        logger.error("Error decoding base64 image data for entry %d: %s", index, str(decode_error))
+        return {'index': index, 'status': 'failed', 'error': 'Invalid base64 image data'}, None
+
+    image_id = str(uuid4())
+    result = {'index': index, 'imageId': image_id, 'status': 'pending'}
+    # Detect the real image format from the magic bytes
+    image_format = sniff_format(image_bytes)
+    upload = {
+        'image_id': image_id,
+        's3_key': f"images/{image_id}.{image_format['extension']}",
+        'content_type': image_format['content_type'],
+        'bytes': image_bytes,
+        'metadata': entry['metadata']
+    }
+    return result, upload
+
+def put_image(upload):
+    # With deduplication identical bytes share one content-addressed object
+    if deduplicate_uploads:
+        upload['digest'], upload['s3_key'] = acquire_blob(s3_client, dynamodb_client, s3_bucket_name, upload['bytes'], upload['content_type'])
+    else:
+        s3_client.put_object(Bucket=s3_bucket_name, Key=upload['s3_key'], Body=upload['bytes'], ContentType=upload['content_type'])
+    logger.debug("Image uploaded to S3 with key: %s", upload['s3_key'])
+
+def cleanup_image(upload):
+    # Clean up the S3 upload when its metadata could not be stored; a shared blob only loses this reference
+    try:
+        if upload.get('digest'):
+            release_blob(s3_client, dynamodb_client, s3_bucket_name, upload['digest'])
+        else:
+            s3_client.delete_object(Bucket=s3_bucket_name, Key=upload['s3_key'])
+        logger.debug("Image deleted from S3 due to DynamoDB failure: %s", upload['s3_key'])
+    except Exception as delete_error:
+        logger.error("Error deleting image from S3 after DynamoDB failure: %s", str(delete_error))
+
+def batch_upload(event, context):
+    try:
+        # Log the received event for debugging purposes
+        log_event(logger, event)
+
+        # Parse the body of the request
+        body = json.loads(event['body'])
+        entries = body.get('images')
+
+        if not entries or not isinstance(entries, list):
+            logger.error("No images found in request body")
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'No images found in the request'})
+            }
+
+        if len(entries) > max_batch_size:
+            logger.error("Batch of %d images exceeds the limit of %d", len(entries), max_batch_size)
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'At most {max_batch_size} images can be uploaded per request'})
+            }
+
+        # Validate and decode every entry up front; invalid entries fail without touching AWS
+        results = []
+        uploads = {}
+        for index, entry in enumerate(entries):
+            result, upload = prepare_entry(index, entry)
+            results.append(result)
+            if upload:
+                uploads[index] = upload
+
+        # Upload the images to S3 concurrently
+        uploaded = []
+        with ThreadPoolExecutor(max_workers=max(1, min(upload_concurrency, len(uploads)))) as executor:
+            futures = {index: executor.submit(put_image, upload) for index, upload in uploads.items()}
+            for index, future in futures.items():
+                try:
+                    future.result()
+                    uploaded.append(index)
+                except Exception as s3_error:
+                    logger.error("Error uploading image to S3: %s", str(s3_error))
+                    results[index].update({'status': 'failed', 'error': f'Error uploading image to S3: {str(s3_error)}'})
+
+        # Write the tag postings first, so every stored image is findable by tag; an image whose
+        # postings could not be written is not stored
+        tags_by_image = {uploads[index]['image_id']: extract_tags(uploads[index]['metadata']) for index in uploaded}
+        unindexed_ids = index_tags(dynamodb_client, tags_by_image)
+
+        # Store the metadata of every uploaded image with BatchWriteItem
+        write_requests = [
+            {'PutRequest': {'Item': build_image_item(
+                uploads[index]['image_id'], uploads[index]['s3_key'], uploads[index]['metadata'], digest=uploads[index].get('digest'),
+                content_type=uploads[index]['content_type'], size_bytes=len(uploads[index]['bytes'])
+            )}}
+            for index in uploaded if uploads[index]['image_id'] not in unindexed_ids
+        ]
+        failed_requests = batch_write(dynamodb_client, dynamo_table_name, write_requests)
+        failed_ids = {request['PutRequest']['Item']['ImageID']['S'] for request in failed_requests} | unindexed_ids
+        unindex_tags(dynamodb_client, {image_id: tags_by_image[image_id] for image_id in failed_ids})
+
+        for index in uploaded:
+            upload = uploads[index]
+            if upload['image_id'] in failed_ids:
+                cleanup_image(upload)
+                results[index].update({'status': 'failed', 'error': 'Error storing metadata in DynamoDB'})
+            else:
+                results[index]['status'] = 'uploaded'
+
+        # Invalidate the ETags of the listings that now include the stored images
+        stored = [uploads[index] for index in uploaded if uploads[index]['image_id'] not in failed_ids]
+        if stored:
+            bump_versions(dynamodb_client, [extract_user_id(upload['metadata']) for upload in stored])
+
+        # 207 tells the client to inspect the per-item results
+        failed_count = sum(1 for result in results if result['status'] == 'failed')
+        logger.debug("Batch upload finished: %d uploaded, %d failed", len(results) - failed_count, failed_count)
+        return {
+            'statusCode': 207 if failed_count else 200,
+            'body': json.dumps({'results': results, 'uploaded': len(results) - failed_count, 'failed': failed_count})
+        }
+
+    except Exception as e:
+        # Log any unhandled exceptions
+        logger.error("Unhandled error: %s", str(e))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Unhandled error: {str(e)}'})
+        }
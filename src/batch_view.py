@@ -0,0 +1,77 @@
+import json
+import logging
+from src.batching import batch_get, BATCH_GET_LIMIT
+from src.metadata import is_pending
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
+
+# Initialize S3 and DynamoDB clients
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
+s3_bucket_name = "mc-image-insta-uploaders"
+dynamo_table_name = "ImagesMetadata"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def batch_view(event, context):
+    try:
+        # Log the incoming event for debugging purposes
+        log_event(logger, event)
+
+        # Parse the body of the request
+        body = json.loads(event.get('body') or '{}')
+        image_ids = body.get('image_ids')
+
+        if not image_ids or not isinstance(image_ids, list):
+            logger.error("No image_ids found in request body")
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'image_ids is required'})
+            }
+
+        # Drop duplicates while keeping the caller's order
+        image_ids = list(dict.fromkeys(str(image_id) for image_id in image_ids))
+        if len(image_ids) > BATCH_GET_LIMIT:
+            logger.error("Batch of %d image IDs exceeds the limit of %d", len(image_ids), BATCH_GET_LIMIT)
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'At most {BATCH_GET_LIMIT} image IDs can be viewed per request'})
+            }
+
+        # Fetch every S3 key with a single BatchGetItem, retrying unprocessed keys
+        items, failed_keys = batch_get(
+            dynamodb_client, dynamo_table_name,
+            [{'ImageID': {'S': image_id}} for image_id in image_ids],
+            projection_expression="ImageID, S3Key, UploadStatus"
+        )
+        # Pending uploads have no object yet and are reported as missing
+        s3_keys = {item['ImageID']['S']: item['S3Key']['S'] for item in items if not is_pending(item)}
+        failed_ids = [key['ImageID']['S'] for key in failed_keys]
+        logger.debug("Resolved %d of %d S3 keys", len(s3_keys), len(image_ids))
+
+        # Presigning is a local signing operation, so there is no extra round-trip per image
+        urls = {}
+        for image_id in image_ids:
+            if image_id in s3_keys:
+                urls[image_id] = s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': s3_bucket_name, 'Key': s3_keys[image_id]},
+                    ExpiresIn=3600  # URL valid for 1 hour
+                )
+
+        missing_ids = [image_id for image_id in image_ids if image_id not in urls and image_id not in failed_ids]
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'urls': urls, 'missing': missing_ids, 'failed': failed_ids})
+        }
+
+    except Exception as e:
+        # Log unexpected errors
+        logger.error("Error occurred while processing the request: %s", str(e))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
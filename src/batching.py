@@ -0,0 +1,104 @@
+import os
+import time
+import random
+import logging
+
+# DynamoDB batch limits
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+
+# Retry settings for UnprocessedItems / UnprocessedKeys
+max_batch_retries = int(os.environ.get('BATCH_MAX_RETRIES', '5'))
+base_backoff_seconds = 0.05
+max_backoff_seconds = 2.0
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def chunked(items, size):
+    # Split a list into consecutive chunks of at most 'size' elements
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def backoff_delay(attempt):
+    # Exponential backoff with full jitter so throttled callers do not retry in lockstep
+    return random.uniform(0, min(max_backoff_seconds, base_backoff_seconds * (2 ** attempt)))
+
+
+def batch_write(dynamodb_client, table_name, write_requests, max_retries=None):
+    # Send PutRequest/DeleteRequest entries with BatchWriteItem in 25-item chunks, retrying
+    # UnprocessedItems with backoff. Returns the requests that could not be written.
+    max_retries = max_batch_retries if max_retries is None else max_retries
+    failed_requests = []
+
+    for chunk in chunked(write_requests, BATCH_WRITE_LIMIT):
+        pending = {table_name: chunk}
+        attempt = 0
+        while pending:
+            try:
+                response = dynamodb_client.batch_write_item(RequestItems=pending)
+            except Exception as batch_error:
+                logger.error("Error writing batch to DynamoDB: %s", str(batch_error))
+                failed_requests.extend(pending.get(table_name, []))
+                break
+
+            pending = response.get('UnprocessedItems') or {}
+            if not pending:
+                break
+
+            attempt += 1
+            if attempt > max_retries:
+                logger.error("Giving up on %d unprocessed items after %d retries", len(pending.get(table_name, [])), max_retries)
+                failed_requests.extend(pending.get(table_name, []))
+                break
+
+            logger.debug("Retrying %d unprocessed items (attempt %d)", len(pending.get(table_name, [])), attempt)
+            time.sleep(backoff_delay(attempt))
+
+    return failed_requests
+
+
+def batch_get(dynamodb_client, table_name, keys, projection_expression=None,
+              expression_attribute_names=None, max_retries=None, consistent_read=False):
+    # Fetch items with BatchGetItem in 100-key chunks, retrying UnprocessedKeys with backoff.
+    # Returns the items found and the keys that could not be read.
+    max_retries = max_batch_retries if max_retries is None else max_retries
+    items = []
+    failed_keys = []
+
+    for chunk in chunked(keys, BATCH_GET_LIMIT):
+        request = {'Keys': chunk}
+        if projection_expression:
+            request['ProjectionExpression'] = projection_expression
+        if expression_attribute_names:
+            request['ExpressionAttributeNames'] = expression_attribute_names
+        if consistent_read:
+            request['ConsistentRead'] = True
+
+        pending = {table_name: request}
+        attempt = 0
+        while pending:
+            try:
+                response = dynamodb_client.batch_get_item(RequestItems=pending)
+            except Exception as batch_error:
+                logger.error("Error reading batch from DynamoDB: %s", str(batch_error))
+                failed_keys.extend(pending[table_name]['Keys'])
+                break
+
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            pending = response.get('UnprocessedKeys') or {}
+            if not pending:
+                break
+
+            attempt += 1
+            if attempt > max_retries:
+                logger.error("Giving up on %d unprocessed keys after %d retries", len(pending[table_name]['Keys']), max_retries)
+                failed_keys.extend(pending[table_name]['Keys'])
+                break
+
+            logger.debug("Retrying %d unprocessed keys (attempt %d)", len(pending[table_name]['Keys']), attempt)
+            time.sleep(backoff_delay(attempt))
+
+    return items, failed_keys
@@ -0,0 +1,97 @@
+import os
+import hashlib
+import logging
+from uuid import uuid4
+from botocore.exceptions import ClientError
+
+# Table mapping a content hash to the shared S3 object and the number of images referencing it
+blob_table_name = "ImageBlobs"
+
+# Store identical uploads once; set DEDUPLICATE_UPLOADS=false to give every upload its own object
+deduplicate_uploads = os.environ.get('DEDUPLICATE_UPLOADS', 'true').lower() == 'true'
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def object_exists(s3_client, bucket, s3_key):
+    try:
+        s3_client.head_object(Bucket=bucket, Key=s3_key)
+        return True
+    except ClientError as s3_error:
+        if s3_error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+def acquire_blob(s3_client, dynamodb_client, bucket, image_bytes, content_type):
+    # Take a reference on the blob holding these bytes, uploading it only if no image references it yet.
+    # Returns (content_hash, s3_key).
+    digest = content_hash(image_bytes)
+
+    # The key is content-addressed plus a generation suffix: a blob that is re-created after its last
+    # reference was released gets a fresh key, so a concurrent release can never delete the new copy
+    response = dynamodb_client.update_item(
+        TableName=blob_table_name,
+        Key={'ContentHash': {'S': digest}},
+        UpdateExpression="ADD RefCount :one SET S3Key = if_not_exists(S3Key, :s3_key)",
+        ExpressionAttributeValues={':one': {'N': '1'}, ':s3_key': {'S': f"blobs/{digest}/{uuid4().hex}"}},
+        ReturnValues='ALL_NEW'
+    )
+    attributes = response['Attributes']
+    s3_key = attributes['S3Key']['S']
+    references = int(attributes['RefCount']['N'])
+
+    try:
+        # The first reference uploads the bytes. Later ones check that the object actually landed,
+        # since the first uploader may still be in flight or may have failed.
+        if references == 1 or not object_exists(s3_client, bucket, s3_key):
+            s3_client.put_object(Bucket=bucket, Key=s3_key, Body=image_bytes, ContentType=content_type)
+            logger.debug("Stored blob %s at key: %s", digest, s3_key)
+        else:
+            logger.debug("Reusing blob %s (%d references) at key: %s", digest, references, s3_key)
+    except Exception:
+        release_blob(s3_client, dynamodb_client, bucket, digest)
+        raise
+
+    return digest, s3_key
+
+
+def release_blob(s3_client, dynamodb_client, bucket, digest, delete_object=True):
+    # Drop one reference. When it was the last one the blob record is removed and its S3 key returned;
+    # the object itself is deleted unless the caller batches deletions (delete_object=False).
+    response = dynamodb_client.update_item(
+        TableName=blob_table_name,
+        Key={'ContentHash': {'S': digest}},
+        UpdateExpression="ADD RefCount :minus_one",
+        ConditionExpression="attribute_exists(ContentHash)",
+        ExpressionAttributeValues={':minus_one': {'N': '-1'}},
+        ReturnValues='ALL_NEW'
+    )
+    attributes = response['Attributes']
+    if int(attributes['RefCount']['N']) > 0:
+        return None
+
+    # Remove the record only if nobody took a new reference in the meantime
+    try:
+        dynamodb_client.delete_item(
+            TableName=blob_table_name,
+            Key={'ContentHash': {'S': digest}},
+            ConditionExpression="RefCount <= :zero",
+            ExpressionAttributeValues={':zero': {'N': '0'}}
+        )
+    except ClientError as dynamo_error:
+        if dynamo_error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            logger.debug("Blob %s was referenced again, keeping it", digest)
+            return None
+        raise
+
+    s3_key = attributes['S3Key']['S']
+    if delete_object:
+        s3_client.delete_object(Bucket=bucket, Key=s3_key)
+        logger.debug("Deleted unreferenced blob %s at key: %s", digest, s3_key)
+    return s3_key
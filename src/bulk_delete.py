@@ -0,0 +1,217 @@
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from src.batching import batch_get, batch_write, chunked
+from src.metadata import user_index_name, item_object_keys
+from src.pagination import iter_items
+from src.cache import invalidate_image
+from src.blob_store import release_blob
+from src.versions import bump_versions
+from src.tag_index import unindex_tags, item_tags
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
+
+# Initialize S3 and DynamoDB clients
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
+s3_bucket_name = "mc-image-insta-uploaders"
+dynamo_table_name = "ImagesMetadata"
+
+# S3 DeleteObjects accepts at most 1000 keys per call; explicit ID lists are capped to the same size
+DELETE_OBJECTS_LIMIT = 1000
+max_image_ids = 1000
+
+# Images that reference a shared blob are deleted one DeleteItem at a time, this many in parallel
+delete_concurrency = int(os.environ.get('BULK_DELETE_CONCURRENCY', '10'))
+
+# Attributes needed to find every object an image owns or references, and the listings it appears in
+item_projection = "ImageID, S3Key, Renditions, Variants, ContentHash, UserID, Tags"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def resolve_by_ids(image_ids, results):
+    # Resolve the metadata items of the requested images with BatchGetItem
+    keys = [{'ImageID': {'S': image_id}} for image_id in image_ids]
+    items, failed_keys = batch_get(
+        dynamodb_client, dynamo_table_name, keys,
+        projection_expression=item_projection
+    )
+
+    for key in failed_keys:
+        results[key['ImageID']['S']] = 'failed'
+
+    found = {item['ImageID']['S']: item for item in items}
+    for image_id in image_ids:
+        if image_id not in found and image_id not in results:
+            results[image_id] = 'not_found'
+    return found
+
+def resolve_by_user(user_id):
+    # The UserID index projects every attribute, so the items come straight from the query
+    found = {}
+    for item in iter_items(
+        dynamodb_client.query,
+        TableName=dynamo_table_name,
+        IndexName=user_index_name,
+        KeyConditionExpression="UserID = :user_id",
+        ExpressionAttributeValues={':user_id': {'S': user_id}},
+        ProjectionExpression=item_projection
+    ):
+        found[item['ImageID']['S']] = item
+    return found
+
+def delete_item_returning_old(image_id):
+    # The old item comes back only to the request that actually removed it
+    return dynamodb_client.delete_item(
+        TableName=dynamo_table_name,
+        Key={'ImageID': {'S': image_id}},
+        ReturnValues='ALL_OLD'
+    ).get('Attributes')
+
+def delete_shared_items(items, image_ids, results):
+    # The resolved items come from an eventually consistent read and BatchWriteItem deletes
+    # unconditionally, so a concurrent delete_image or an overlapping bulk delete may already have
+    # removed (and released) an item. Items holding a blob reference are therefore deleted with
+    # ReturnValues=ALL_OLD, and only those this request removed are marked deleted.
+    if not image_ids:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(delete_concurrency, len(image_ids)))) as executor:
+        futures = {image_id: executor.submit(delete_item_returning_old, image_id) for image_id in image_ids}
+        for image_id, future in futures.items():
+            try:
+                old_item = future.result()
+            except Exception as dynamo_error:
+                logger.error("Error deleting metadata for image_id %s: %s", image_id, str(dynamo_error))
+                results[image_id] = 'failed'
+                continue
+            if old_item is None:
+                logger.debug("Image %s was already deleted", image_id)
+                results[image_id] = 'not_found'
+                continue
+            items[image_id] = old_item
+            results[image_id] = 'deleted'
+
+def release_blobs(items, image_ids, results):
+    # Drop the shared-blob references of deleted images; returns the blob keys that lost their last reference
+    unreferenced = {}
+    for image_id in image_ids:
+        if 'ContentHash' not in items[image_id]:
+            continue
+        try:
+            s3_key = release_blob(s3_client, dynamodb_client, s3_bucket_name, items[image_id]['ContentHash']['S'], delete_object=False)
+        except Exception as release_error:
+            logger.error("Error releasing blob for image_id %s: %s", image_id, str(release_error))
+            results[image_id] = 'failed'
+            continue
+        if s3_key:
+            unreferenced[image_id] = [s3_key]
+    return unreferenced
+
+def delete_objects(s3_keys, results):
+    # Remove the objects from S3 in chunks of up to 1000 keys; returns the IDs whose objects are all gone
+    image_ids_by_key = {s3_key: image_id for image_id, keys in s3_keys.items() for s3_key in keys}
+    failed_ids = set()
+
+    for chunk in chunked(list(image_ids_by_key), DELETE_OBJECTS_LIMIT):
+        try:
+            response = s3_client.delete_objects(
+                Bucket=s3_bucket_name,
+                Delete={'Objects': [{'Key': s3_key} for s3_key in chunk], 'Quiet': True}
+            )
+        except Exception as s3_error:
+            logger.error("Error deleting images from S3: %s", str(s3_error))
+            failed_ids.update(image_ids_by_key[s3_key] for s3_key in chunk)
+            continue
+
+        # Quiet mode only reports the keys that failed
+        for error in response.get('Errors', []):
+            logger.error("Error deleting %s from S3: %s", error['Key'], error.get('Message'))
+            failed_ids.add(image_ids_by_key[error['Key']])
+
+    for image_id in failed_ids:
+        results[image_id] = 'failed'
+    return [image_id for image_id in s3_keys if image_id not in failed_ids]
+
+def bulk_delete(event, context):
+    try:
+        # Log the incoming event for debugging purposes
+        log_event(logger, event)
+
+        # Parse the body of the request
+        body = json.loads(event.get('body') or '{}')
+        image_ids = body.get('image_ids')
+        user_id = body.get('user_id')
+
+        if not image_ids and not user_id:
+            logger.error("No image_ids or user_id found in request body")
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'image_ids or user_id is required'})
+            }
+
+        results = {}
+        if image_ids:
+            if not isinstance(image_ids, list) or len(image_ids) > max_image_ids:
+                logger.error("Invalid image_ids list in request body")
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': f'image_ids must be a list of at most {max_image_ids} IDs'})
+                }
+            # Drop duplicates while keeping the caller's order
+            image_ids = list(dict.fromkeys(str(image_id) for image_id in image_ids))
+            items = resolve_by_ids(image_ids, results)
+        else:
+            items = resolve_by_user(str(user_id))
+        logger.debug("Resolved %d images for bulk delete", len(items))
+
+        # Drop the metadata first. Only images whose item this request removed have their objects
+        # deleted and their shared blob released, so neither a retry nor a concurrent delete of the
+        # same image releases a blob twice.
+        shared_ids = [image_id for image_id in items if 'ContentHash' in items[image_id]]
+        owned_ids = [image_id for image_id in items if 'ContentHash' not in items[image_id]]
+        failed_requests = batch_write(
+            dynamodb_client, dynamo_table_name,
+            [{'DeleteRequest': {'Key': {'ImageID': {'S': image_id}}}} for image_id in owned_ids]
+        )
+        failed_ids = {request['DeleteRequest']['Key']['ImageID']['S'] for request in failed_requests}
+        for image_id in owned_ids:
+            results[image_id] = 'failed' if image_id in failed_ids else 'deleted'
+        delete_shared_items(items, shared_ids, results)
+
+        deleted_ids = [image_id for image_id in items if results[image_id] == 'deleted']
+        for image_id in deleted_ids:
+            invalidate_image(image_id)
+
+        # Delete the objects each deleted image owns, release its shared blob and delete the blobs that
+        # lost their last reference. Images whose objects could not be removed are reported as failed.
+        delete_objects({image_id: item_object_keys(items[image_id]) for image_id in deleted_ids}, results)
+        unreferenced = release_blobs(items, deleted_ids, results)
+        delete_objects(unreferenced, results)
+
+        # Remove the deleted images from the tag index
+        unindex_tags(dynamodb_client, {image_id: item_tags(items[image_id]) for image_id in deleted_ids})
+
+        # Invalidate the ETags of the listings the deleted images appeared in
+        if deleted_ids:
+            bump_versions(dynamodb_client, [items[image_id].get('UserID', {}).get('S') for image_id in deleted_ids])
+
+        deleted_count = sum(1 for status in results.values() if status == 'deleted')
+        failed_count = sum(1 for status in results.values() if status == 'failed')
+        logger.debug("Bulk delete finished: %d deleted, %d failed", deleted_count, failed_count)
+
+        # 207 tells the client to inspect the per-ID results
+        return {
+            'statusCode': 207 if failed_count else 200,
+            'body': json.dumps({'results': results, 'deleted': deleted_count, 'failed': failed_count})
+        }
+
+    except Exception as e:
+        # Log the error
+        logger.error("Error occurred while deleting images: %s", str(e))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
@@ -0,0 +1,96 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class TTLCache:
+    # Bounded in-process LRU cache whose entries also expire after a time-to-live.
+    # It lives at module level, so it survives across warm invocations of the same container.
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            # Mark the entry as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries once the cache is full
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def invalidate_matching(self, predicate):
+        # Drop every entry whose key satisfies the predicate; returns how many were removed
+        with self._lock:
+            stale_keys = [key for key in self._entries if predicate(key)]
+            for key in stale_keys:
+                del self._entries[key]
+            return len(stale_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Presigned URLs are valid for an hour; cached ones are dropped this long before they expire
+presigned_url_expiry_seconds = 3600
+presigned_url_refresh_margin_seconds = int(os.environ.get('VIEW_CACHE_REFRESH_MARGIN', '300'))
+
+# Shared cache of (image_id, variant) -> resolved S3 key and presigned URL, used by view_image
+# and invalidated by delete_image when both run in the same container
+image_cache = TTLCache(
+    maxsize=int(os.environ.get('VIEW_CACHE_SIZE', '1024')),
+    ttl=presigned_url_expiry_seconds - presigned_url_refresh_margin_seconds
+)
+
+
+def invalidate_image(image_id):
+    # Drop the cached URLs of every variant of an image
+    return image_cache.invalidate_matching(lambda key: key[0] == image_id)
@@ -0,0 +1,116 @@
+import os
+import gzip
+import json
+import base64
+import logging
+
+# orjson serializes several times faster than the standard library; it is optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Brotli compresses JSON better than gzip but is optional; without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressed bodies are returned base64-encoded with isBase64Encoded, which API Gateway only decodes
+# when binaryMediaTypes matches the request; until the API is configured for that, leave this off
+compression_enabled = os.environ.get('RESPONSE_COMPRESSION', 'false').lower() == 'true'
+
+# Responses smaller than this are sent uncompressed; compressing them costs more than it saves
+compression_threshold = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+gzip_level = int(os.environ.get('GZIP_LEVEL', '6'))
+brotli_quality = int(os.environ.get('BROTLI_QUALITY', '5'))
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def supported_encodings():
+    # In order of preference when the client accepts several with the same weight
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def dumps(value):
+    # Serialize to UTF-8 JSON bytes, with orjson when it is installed and can handle the value
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            logger.debug("orjson could not serialize the response, falling back to json")
+    return json.dumps(value).encode('utf-8')
+
+
+def accepted_encodings(headers):
+    # Parse Accept-Encoding into {coding: weight}; header names are case-insensitive
+    value = next((v for k, v in (headers or {}).items() if k.lower() == 'accept-encoding'), None) or ''
+    encodings = {}
+    for part in value.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        encodings[coding] = weight
+    return encodings
+
+
+def choose_encoding(headers):
+    # Best supported encoding the client accepts, or None; '*' covers codings it does not name
+    encodings = accepted_encodings(headers)
+    best = None
+    best_weight = 0.0
+    for coding in supported_encodings():
+        weight = encodings.get(coding, encodings.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level)
+
+
+def json_response(status_code, payload, request_headers=None, headers=None):
+    # Serialize a JSON response and compress it when it is large enough and the client accepts it.
+    # Compressed bodies are base64-encoded for API Gateway, which decodes them for the client.
+    body = dumps(payload)
+    response_headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+    response_headers.update(headers or {})
+
+    encoding = None
+    if compression_enabled and len(body) >= compression_threshold:
+        encoding = choose_encoding(request_headers)
+    if encoding:
+        compressed = compress(body, encoding)
+        if len(compressed) < len(body):
+            logger.debug("Compressed response with %s: %d -> %d bytes", encoding, len(body), len(compressed))
+            response_headers['Content-Encoding'] = encoding
+            # The compressed and identity bodies differ byte for byte, so they only share a weak ETag
+            etag = response_headers.get('ETag')
+            if etag and not etag.startswith('W/'):
+                response_headers['ETag'] = 'W/' + etag
+            return {
+                'statusCode': status_code,
+                'headers': response_headers,
+                'isBase64Encoded': True,
+                'body': base64.b64encode(compressed).decode('ascii')
+            }
+
+    return {
+        'statusCode': status_code,
+        'headers': response_headers,
+        'body': body.decode('utf-8')
+    }
@@ -1,21 +1,29 @@
 import json
-import boto3
 import logging
+from src.cache import invalidate_image
+from src.blob_store import release_blob
+from src.metadata import derived_object_keys
+from src.versions import bump_versions
+from src.tag_index import unindex_tags, item_tags
+from src.metrics import instrumented, stage
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
 
 # Initialize S3 and DynamoDB clients
-s3_client = boto3.client('s3')
-dynamodb_client = boto3.client('dynamodb')
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
 s3_bucket_name = "mc-image-insta-uploaders"
 dynamo_table_name = "ImagesMetadata"
 
 # Set up logger for debugging and exception tracking
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+logger.setLevel(log_level)
 
+@instrumented
 def delete_image(event, context):
     try:
         # Log the incoming event for debugging purposes
-        logger.debug("Event received: %s", json.dumps(event))
+        log_event(logger, event)
 
         # Extract the image_id from path parameters
         image_id = event['pathParameters'].get('image_id')
@@ -27,36 +35,57 @@ def delete_image(event, context):
                 'body': json.dumps({'error': 'Image ID is required'})
             }
 
-        logger.debug("Fetching metadata for image_id: %s", image_id)
-
-        # Fetch the metadata from DynamoDB to get the S3 key
-        response = dynamodb_client.get_item(
-            TableName=dynamo_table_name,
-            Key={'ImageID': {'S': image_id}}
-        )
+        # Delete the metadata first and clean up from its old attributes. Only the request that actually
+        # removed the item releases the blob, so a retry after a failed delete never drops a reference twice.
+        logger.debug("Deleting metadata for image_id: %s from DynamoDB", image_id)
+        with stage('dynamodb_delete'):
+            response = dynamodb_client.delete_item(
+                TableName=dynamo_table_name,
+                Key={'ImageID': {'S': image_id}},
+                ReturnValues='ALL_OLD'
+            )
 
-        # Check if the image exists in DynamoDB
-        if 'Item' not in response:
+        # Check if the image existed in DynamoDB
+        if 'Attributes' not in response:
             logger.warning("Image not found for image_id: %s", image_id)
             return {
                 'statusCode': 404,
                 'body': json.dumps({'error': 'Image not found'})
             }
+        item = response['Attributes']
+
+        # Drop the cached presigned URL so view_image in this container stops serving it
+        invalidate_image(image_id)
 
         # Retrieve the S3 key of the image
-        s3_key = response['Item']['S3Key']['S']
+        s3_key = item['S3Key']['S']
         logger.debug("S3 key for image: %s", s3_key)
 
-        # Delete the image from S3
-        logger.debug("Deleting image from S3 with key: %s", s3_key)
-        s3_client.delete_object(Bucket=s3_bucket_name, Key=s3_key)
+        # Delete the image from S3; a deduplicated blob is only removed with its last reference.
+        # The image is already gone, so a failure here only leaves unreferenced objects behind.
+        with stage('s3_delete'):
+            try:
+                if 'ContentHash' in item:
+                    logger.debug("Releasing shared blob with key: %s", s3_key)
+                    release_blob(s3_client, dynamodb_client, s3_bucket_name, item['ContentHash']['S'])
+                else:
+                    logger.debug("Deleting image from S3 with key: %s", s3_key)
+                    s3_client.delete_object(Bucket=s3_bucket_name, Key=s3_key)
 
-        # Delete the metadata from DynamoDB
-        logger.debug("Deleting metadata for image_id: %s from DynamoDB", image_id)
-        dynamodb_client.delete_item(
-            TableName=dynamo_table_name,
-            Key={'ImageID': {'S': image_id}}
-        )
+                # Delete the renditions and re-encoded variants generated for the image, if any
+                for derived_key in derived_object_keys(item):
+                    logger.debug("Deleting derived image from S3 with key: %s", derived_key)
+                    s3_client.delete_object(Bucket=s3_bucket_name, Key=derived_key)
+            except Exception as s3_error:
+                logger.error("Error deleting objects of image_id %s: %s", image_id, str(s3_error))
+
+        # Remove the image from the tag index once its item is gone
+        with stage('tag_index'):
+            unindex_tags(dynamodb_client, {image_id: item_tags(item)})
+
+        # Invalidate the ETags of the listings the image appeared in
+        with stage('bump_versions'):
+            bump_versions(dynamodb_client, [item.get('UserID', {}).get('S')])
 
         # Return success message
         return {
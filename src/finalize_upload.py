@@ -0,0 +1,82 @@
+import json
+import logging
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+from src.metadata import build_image_item, extract_user_id, extract_tags, upload_metadata_header, direct_upload_prefix
+from src.tag_index import index_tags, TagIndexError
+from src.versions import bump_versions
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
+
+# Initialize S3 and DynamoDB clients
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
+dynamo_table_name = "ImagesMetadata"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def finalize_object(bucket, s3_key):
+    # Only keys created by initiate_upload (uploads/{image_id}) are finalized here
+    if not s3_key.startswith(direct_upload_prefix) or '/' in s3_key[len(direct_upload_prefix):]:
+        logger.debug("Ignoring object outside the presigned upload layout: %s", s3_key)
+        return 'ignored'
+
+    # Objects put there without a presigned form carry no signed metadata
+    head = s3_client.head_object(Bucket=bucket, Key=s3_key)
+    serialized_metadata = head.get('Metadata', {}).get(upload_metadata_header)
+    if serialized_metadata is None:
+        logger.debug("Object %s was not uploaded through a presigned form, skipping", s3_key)
+        return 'ignored'
+
+    image_id = s3_key[len(direct_upload_prefix):]
+    metadata = json.loads(serialized_metadata)
+
+    # Tag postings go first so the image is findable by tag once stored. Rewriting them on a
+    # repeated delivery is harmless; a failure raises so S3 retries the event.
+    if index_tags(dynamodb_client, {image_id: extract_tags(metadata)}):
+        raise TagIndexError(f'Tag postings for image ID {image_id} could not be written')
+
+    # S3 may deliver the same event more than once, so only the first delivery writes the item
+    try:
+        dynamodb_client.put_item(
+            TableName=dynamo_table_name,
+            Item=build_image_item(
+                image_id, s3_key, metadata,
+                content_type=head.get('ContentType'), size_bytes=head.get('ContentLength')
+            ),
+            ConditionExpression="attribute_not_exists(ImageID)"
+        )
+    except ClientError as dynamo_error:
+        if dynamo_error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            logger.debug("Metadata for image ID %s already stored", image_id)
+            return 'duplicate'
+        raise
+
+    logger.debug("Metadata stored in DynamoDB for image ID: %s", image_id)
+
+    # Invalidate the ETags of the listings that now include the image
+    bump_versions(dynamodb_client, [extract_user_id(metadata)])
+    return 'finalized'
+
+def finalize_upload(event, context):
+    # Triggered by s3:ObjectCreated events once a client has POSTed the bytes to S3
+    log_event(logger, event)
+
+    results = {}
+    failures = []
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        s3_key = unquote_plus(record['s3']['object']['key'])
+        try:
+            results[s3_key] = finalize_object(bucket, s3_key)
+        except Exception as e:
+            logger.error("Error finalizing upload for key %s: %s", s3_key, str(e))
+            failures.append(s3_key)
+
+    # Fail the invocation so Lambda retries; the conditional write makes retries safe
+    if failures:
+        raise Exception(f"Failed to finalize uploads: {', '.join(failures)}")
+
+    return results
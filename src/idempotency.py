@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import hashlib
+import logging
+from botocore.exceptions import ClientError
+
+# Results of uploads sent with an Idempotency-Key header, so a retried request gets the original
+# response instead of storing the image again. ExpiresAt is the table's TTL attribute.
+idempotency_table_name = "UploadIdempotency"
+IDEMPOTENCY_HEADER = 'idempotency-key'
+
+# How long a completed result is replayed, and how long a claim blocks retries of a request that is
+# still running (or whose Lambda stopped) before another attempt may take it over
+idempotency_ttl_seconds = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+idempotency_lock_seconds = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '60'))
+
+STATUS_IN_PROGRESS = 'IN_PROGRESS'
+STATUS_COMPLETED = 'COMPLETED'
+
+# Keys are opaque client strings, typically a UUID
+_key_pattern = re.compile(r'^[\x21-\x7e]{1,255}$')
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class InvalidIdempotencyKeyError(ValueError):
+    # Raised for a malformed Idempotency-Key header so handlers can answer with a 400
+    pass
+
+
+def idempotency_key(request_headers):
+    # Idempotency-Key header value, or None when the request has none; header names are case-insensitive
+    value = next((v for k, v in (request_headers or {}).items() if k.lower() == IDEMPOTENCY_HEADER), None)
+    if value in (None, ''):
+        return None
+    value = value.strip().strip('"')
+    if not _key_pattern.match(value):
+        raise InvalidIdempotencyKeyError('Idempotency-Key must be 1-255 printable ASCII characters without spaces')
+    return value
+
+
+def request_fingerprint(body):
+    # Hash of the request body, stored with the key so that reusing a key for another request (other
+    # image, other metadata, or another caller's user_id, which travels in the metadata) is refused
+    # instead of being answered with the first upload's response
+    return hashlib.sha256((body or '').encode('utf-8')).hexdigest()
+
+
+def matches_request(record, fingerprint):
+    # Whether an existing record was claimed by the same request; records without a hash predate it
+    stored = record.get('RequestHash', {}).get('S')
+    return stored is None or stored == fingerprint
+
+
+def claim_key(dynamodb_client, key, fingerprint, now=None):
+    # Record that a request with this key is running. Returns None when the claim was taken, or the
+    # existing record when another request holds the key or has completed it. Records past their
+    # ExpiresAt count as absent, since DynamoDB deletes expired items only eventually.
+    now = int(time.time() if now is None else now)
+    try:
+        dynamodb_client.put_item(
+            TableName=idempotency_table_name,
+            Item={
+                'IdempotencyKey': {'S': key},
+                'Status': {'S': STATUS_IN_PROGRESS},
+                'RequestHash': {'S': fingerprint},
+                'ExpiresAt': {'N': str(now + idempotency_lock_seconds)},
+            },
+            ConditionExpression="attribute_not_exists(IdempotencyKey) OR ExpiresAt < :now",
+            ExpressionAttributeValues={':now': {'N': str(now)}},
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        return None
+    except ClientError as client_error:
+        if client_error.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        existing = client_error.response.get('Item')
+
+    # Older endpoints do not return the item with the failed condition
+    if existing is None:
+        existing = dynamodb_client.get_item(
+            TableName=idempotency_table_name,
+            Key={'IdempotencyKey': {'S': key}},
+            ConsistentRead=True
+        ).get('Item')
+    return existing or {'Status': {'S': STATUS_IN_PROGRESS}}
+
+
+def complete_key(dynamodb_client, key, fingerprint, response, now=None):
+    # Store the response of a successful request for replay until the TTL expires
+    now = int(time.time() if now is None else now)
+    dynamodb_client.put_item(
+        TableName=idempotency_table_name,
+        Item={
+            'IdempotencyKey': {'S': key},
+            'Status': {'S': STATUS_COMPLETED},
+            'RequestHash': {'S': fingerprint},
+            'StatusCode': {'N': str(response['statusCode'])},
+            'Body': {'S': response['body']},
+            'ExpiresAt': {'N': str(now + idempotency_ttl_seconds)},
+        }
+    )
+
+
+def release_key(dynamodb_client, key):
+    # Drop the claim of a failed request so a retry runs it again. Best-effort: a claim left behind
+    # blocks retries only until its lock expires.
+    try:
+        dynamodb_client.delete_item(
+            TableName=idempotency_table_name,
+            Key={'IdempotencyKey': {'S': key}},
+            ConditionExpression="#status = :in_progress",
+            ExpressionAttributeNames={'#status': 'Status'},
+            ExpressionAttributeValues={':in_progress': {'S': STATUS_IN_PROGRESS}}
+        )
+    except Exception as delete_error:
+        logger.error("Error releasing idempotency key %s: %s", key, str(delete_error))
+
+
+def replay_response(record):
+    # The stored response of a completed request, or a 409 while the first request is still running
+    if record.get('Status', {}).get('S') == STATUS_COMPLETED:
+        return {
+            'statusCode': int(record['StatusCode']['N']),
+            'headers': {'Idempotent-Replayed': 'true'},
+            'body': record['Body']['S']
+        }
+    return None
@@ -0,0 +1,102 @@
+import os
+import json
+from uuid import uuid4
+import logging
+from src.metadata import upload_metadata_header, direct_upload_prefix
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
+
+# Initialize S3 client
+s3_client = LazyClient('s3')
+s3_bucket_name = "mc-image-insta-uploaders"
+
+# Presigned POST settings: the form expires after 15 minutes and caps the object size
+upload_url_expiry_seconds = 900
+max_upload_bytes = int(os.environ.get('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+
+# Metadata travels to finalize_upload as S3 user metadata, which S3 limits to 2 KB per object
+max_metadata_bytes = 1024
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def initiate_upload(event, context):
+    try:
+        # Log the received event for debugging purposes
+        log_event(logger, event)
+
+        # Parse the body of the request
+        body = json.loads(event.get('body') or '{}')
+        metadata = body.get('metadata')  # Metadata to be saved in DynamoDB once the upload lands
+        content_type = body.get('content_type', 'image/jpeg')
+
+        if not metadata:
+            logger.error("No metadata found in request body")
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'No metadata found in the request'})
+            }
+
+        if not isinstance(content_type, str) or not content_type.startswith('image/'):
+            logger.error("Unsupported content type: %s", content_type)
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'content_type must be an image/* type'})
+            }
+
+        serialized_metadata = json.dumps(metadata)
+        if len(serialized_metadata.encode('utf-8')) > max_metadata_bytes:
+            logger.error("Metadata too large for presigned upload: %d bytes", len(serialized_metadata))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'Metadata must be at most {max_metadata_bytes} bytes'})
+            }
+
+        # Generate a unique identifier for the image
+        image_id = str(uuid4())
+        s3_key = f"{direct_upload_prefix}{image_id}"
+        logger.debug("Generated unique image ID: %s", image_id)
+
+        # Sign a POST that lets the client send the bytes straight to S3. The metadata is pinned
+        # into the signed form so finalize_upload can trust it when the object is created.
+        try:
+            presigned_post = s3_client.generate_presigned_post(
+                Bucket=s3_bucket_name,
+                Key=s3_key,
+                Fields={
+                    'Content-Type': content_type,
+                    f'x-amz-meta-{upload_metadata_header}': serialized_metadata
+                },
+                Conditions=[
+                    {'Content-Type': content_type},
+                    {f'x-amz-meta-{upload_metadata_header}': serialized_metadata},
+                    ['content-length-range', 1, max_upload_bytes]
+                ],
+                ExpiresIn=upload_url_expiry_seconds
+            )
+            logger.debug("Generated presigned POST for key: %s", s3_key)
+        except Exception as s3_error:
+            logger.error("Error generating presigned upload: %s", str(s3_error))
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': f'Error generating presigned upload: {str(s3_error)}'})
+            }
+
+        # Return the form the client must POST the image to
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'imageId': image_id,
+                'upload': {'url': presigned_post['url'], 'fields': presigned_post['fields']},
+                'expiresIn': upload_url_expiry_seconds
+            })
+        }
+
+    except Exception as e:
+        # Log any unhandled exceptions
+        logger.error("Unhandled error: %s", str(e))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Unhandled error: {str(e)}'})
+        }
@@ -1,106 +1,327 @@
 import json
-import boto3
 import logging
+from src.pagination import (
+    fetch_page, parse_limit, decode_cursor, encode_cursor, decode_segment_cursor, encode_segment_cursor,
+    InvalidPaginationError, MAX_PAGE_SIZE
+)
+from src.batching import batch_get
+from src.metadata import user_index_name, parse_metadata, attribute_value, is_pending, UPLOAD_STATUS
+from src.timestamps import parse_timestamp
+from src.projection import parse_fields, top_level_fields, build_projection, InvalidFieldsError
+from src.parallel_scan import parallel_scan_page, parse_total_segments, MAX_WORKERS
+from src.tag_index import use_tag_index, parse_tags, parse_match, find_page, InvalidTagQueryError, MATCH_ALL
+from src.compression import json_response
+from src.versions import (
+    listing_scope, read_version, issued_version, if_none_match, make_etag, etag_matches, cache_control, not_modified,
+    list_cache_max_age
+)
+from src.metrics import instrumented, stage, record
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
 
 # Initialize DynamoDB client
-dynamodb_client = boto3.client('dynamodb')
+dynamodb_client = LazyClient('dynamodb')
 dynamo_table_name = "ImagesMetadata"
 
+# Upload-time orders of a user's listing
+ORDER_NEWEST = 'newest'
+ORDER_OLDEST = 'oldest'
+
 # Set up logger for debugging and exception tracking
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+logger.setLevel(log_level)
+
+def build_read_request(tags=None, user_id=None, fields=None, match=MATCH_ALL, order=None, since=None, until=None):
+    # Build the DynamoDB operation and arguments that answer the given filters
+    read_kwargs = {'TableName': dynamo_table_name}
+
+    # Read only the requested attributes; ImageID is always returned, UploadStatus to skip pending uploads
+    if fields:
+        read_kwargs.update(build_projection(fields + [UPLOAD_STATUS], required=('ImageID',)))
+
+    # Add a filter for the tags if they're provided; Tags is a string set, so each is an exact member match
+    if tags:
+        placeholders = [':tag'] if len(tags) == 1 else [f":tag{index}" for index in range(len(tags))]
+        joiner = " AND " if match == MATCH_ALL else " OR "
+        read_kwargs['FilterExpression'] = joiner.join(f"contains(Tags, {placeholder})" for placeholder in placeholders)
+        read_kwargs['ExpressionAttributeValues'] = {placeholder: {"S": tag} for placeholder, tag in zip(placeholders, tags)}
+        logger.debug("Filter for tags: %s (%s)", tags, match)
+
+    # A user_id filter is answered by a Query against the UserID index, so only that user's items are read
+    if user_id and (order or since or until):
+        # An ordered or time-bounded listing reads the index sorted by upload time, newest first unless
+        # order=oldest, with the since/until range (both inclusive) in the key condition
+        key_condition = "UserID = :user_id"
+        expression_values = read_kwargs.setdefault('ExpressionAttributeValues', {})
+        expression_values[":user_id"] = {"S": user_id}
+        if since and until:
+            key_condition += " AND CreatedAt BETWEEN :since AND :until"
+        elif since:
+            key_condition += " AND CreatedAt >= :since"
+        elif until:
+            key_condition += " AND CreatedAt <= :until"
+        if since:
+            expression_values[":since"] = {"S": since}
+        if until:
+            expression_values[":until"] = {"S": until}
+
+        read_kwargs['IndexName'] = user_index_name
+        read_kwargs['KeyConditionExpression'] = key_condition
+        read_kwargs['ScanIndexForward'] = order == ORDER_OLDEST
+        logger.debug("Querying %s for user_id: %s (%s, since %s, until %s)", user_index_name, user_id, order, since, until)
+        return 'query', read_kwargs
+
+    if user_id:
+        read_kwargs['IndexName'] = user_index_name
+        read_kwargs['KeyConditionExpression'] = "UserID = :user_id"
+        read_kwargs.setdefault('ExpressionAttributeValues', {})[":user_id"] = {"S": user_id}
+        logger.debug("Querying %s for user_id: %s", user_index_name, user_id)
+        return 'query', read_kwargs
+
+    return 'scan', read_kwargs
+
+def parse_time_range(query_params):
+    # Returns (order, since, until) with since/until normalized to the CreatedAt format
+    order = (query_params.get('order') or '').lower() or None
+    if order not in (None, ORDER_NEWEST, ORDER_OLDEST):
+        raise ValueError(f'order must be {ORDER_NEWEST} or {ORDER_OLDEST}')
+
+    since = parse_timestamp(query_params.get('since'))
+    until = parse_timestamp(query_params.get('until'))
+    if (order or since or until) and not query_params.get('user_id'):
+        raise ValueError('order, since and until require user_id')
+    if since and until and since > until:
+        raise ValueError('since must not be later than until')
+    return order, since, until
+
+def format_image(item, fields=None):
+    # Metadata is returned as a JSON object whether it is stored as a native map or a legacy string
+    image = {"ImageID": item['ImageID']['S']}
+    for name in top_level_fields(fields) if fields else ['Metadata']:
+        if name in item and name != 'ImageID':
+            image[name] = parse_metadata(item[name]) if name == 'Metadata' else attribute_value(item[name])
+    return image
+
+def uses_tag_index(tags, user_id):
+    # A user's listing is small and served by the UserID index, so only tag-only listings use the tag index
+    return bool(tags) and not user_id and use_tag_index
 
+def fetch_images(image_ids, fields=None):
+    # Read the items of the given IDs with BatchGetItem, in the given order. IDs whose item is gone
+    # (a posting left behind by a failed cleanup) or still pending are skipped.
+    projection = build_projection(fields + [UPLOAD_STATUS], required=('ImageID',)) if fields else {}
+    items, failed_keys = batch_get(
+        dynamodb_client, dynamo_table_name, [{'ImageID': {'S': image_id}} for image_id in image_ids],
+        projection.get('ProjectionExpression'), projection.get('ExpressionAttributeNames')
+    )
+    if failed_keys:
+        raise RuntimeError(f'{len(failed_keys)} images could not be read')
+
+    items_by_id = {item['ImageID']['S']: item for item in items if not is_pending(item)}
+    return [items_by_id[image_id] for image_id in image_ids if image_id in items_by_id]
+
+def fetch_tagged_page(tags, match, limit, cursor=None, fields=None):
+    # One page of the images matching the tags, read from the tag index in ImageID order.
+    # The cursor has the same shape as a scan's, the last ImageID of the previous page.
+    start_key = decode_cursor(cursor)
+    start_after = None
+    if start_key:
+        if 'S' not in start_key.get('ImageID', {}):
+            raise InvalidPaginationError('Invalid cursor')
+        start_after = start_key['ImageID']['S']
+
+    image_ids, has_more = find_page(dynamodb_client, tags, match, limit, start_after)
+    next_cursor = encode_cursor({'ImageID': {'S': image_ids[-1]}}) if has_more else None
+    return fetch_images(image_ids, fields), next_cursor
+
+def respond(images, next_cursor, event, response_headers):
+    # Serialize (and compress) a listing, recording its size for the invocation metrics
+    record('images_returned', len(images))
+    with stage('serialize'):
+        response = json_response(200, {'images': images, 'next_cursor': next_cursor}, event.get('headers'), response_headers)
+    record('response_bytes', len(response['body']))
+    return response
+
+@instrumented
 def list_images(event, context):
     try:
         # Log the event received for debugging purposes
-        logger.debug("Event received: %s", json.dumps(event))
-        
+        log_event(logger, event)
+
         # Extract query parameters from the event
-        query_params = event.get('queryStringParameters', {})
+        query_params = event.get('queryStringParameters') or {}
         logger.debug("Query parameters: %s", query_params)
 
-        # If query parameters are None or empty, scan the entire table
-        if not query_params:
-            logger.debug("No filters provided, returning all images")
+        # Parse the page size; the cursor is validated when the page is fetched
+        try:
+            limit = parse_limit(query_params.get('limit'))
+        except InvalidPaginationError as pagination_error:
+            logger.error("Invalid pagination parameters: %s", str(pagination_error))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(pagination_error)})
+            }
+        cursor = query_params.get('cursor')
+
+        # Optional comma-separated list of attributes to read and return, e.g. fields=Metadata.title,Tags
+        try:
+            fields = parse_fields(query_params.get('fields'))
+        except InvalidFieldsError as fields_error:
+            logger.error("Invalid fields parameter: %s", str(fields_error))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(fields_error)})
+            }
+
+        # Optional comma-separated tags, combined with match=all (the default) or match=any
+        try:
+            tags = parse_tags(query_params.get('tag'))
+            match = parse_match(query_params.get('match'))
+        except InvalidTagQueryError as tag_error:
+            logger.error("Invalid tag parameters: %s", str(tag_error))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(tag_error)})
+            }
+
+        # Upload-time order and since/until bounds; they need user_id, the hash key of the user index
+        try:
+            order, since, until = parse_time_range(query_params)
+        except ValueError as range_error:
+            logger.error("Invalid time range parameters: %s", str(range_error))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(range_error)})
+            }
+
+        # The listing's ETag combines its change counter with every parameter that shapes the response,
+        # so an unchanged listing is answered with a 304 before it is read or serialized. Only a
+        # revalidation needs the current counter; other requests issue the ETag from a recent one.
+        scope = listing_scope(query_params.get('user_id'))
+        try:
+            with stage('version_read'):
+                if if_none_match(event.get('headers')):
+                    version = read_version(dynamodb_client, scope)
+                else:
+                    version = issued_version(dynamodb_client, scope)
+        except Exception as version_error:
+            logger.warning("Error reading listing version for %s: %s", scope, str(version_error))
+            version = None
+
+        response_headers = {}
+        if version is not None:
+            etag = make_etag(
+                scope, version, ','.join(tags), match, query_params.get('user_id'), order, since, until, limit, cursor,
+                ','.join(fields or []), query_params.get('export', '').lower() == 'true'
+            )
+            if etag_matches(event.get('headers'), etag):
+                logger.debug("Listing %s unchanged at version %d", scope, version)
+                return not_modified(etag, list_cache_max_age)
+            response_headers = {'ETag': etag, 'Cache-Control': cache_control(list_cache_max_age)}
+
+        # Export mode reads large pages, up to MAX_PAGE_SIZE unless a smaller limit is given. Table scans
+        # are split into parallel segments and resumed per segment with the next cursor.
+        if query_params.get('export', '').lower() == 'true':
             try:
-                # Perform DynamoDB scan without any filter expression
-                response = dynamodb_client.scan(
-                    TableName=dynamo_table_name
-                )
-                logger.debug("DynamoDB scan successful, retrieved %d items", len(response.get('Items', [])))
-            except Exception as scan_error:
-                logger.error("Error performing scan on DynamoDB: %s", str(scan_error))
+                # Client-chosen segment counts stop at the worker pool size; more would only queue up
+                total_segments = parse_total_segments(query_params.get('segments'), MAX_WORKERS)
+            except ValueError as segments_error:
+                logger.error("Invalid segments parameter: %s", str(segments_error))
                 return {
-                    'statusCode': 500,
-                    'body': json.dumps({'error': f'Error performing scan on DynamoDB: {str(scan_error)}'})
+                    'statusCode': 400,
+                    'body': json.dumps({'error': str(segments_error)})
                 }
 
-        else:
-            # If filters are provided, build the filter expression
-            logger.debug("Filters found, building filter expression")
-
-            tag = query_params.get('tag')
-            user_id = query_params.get('user_id')
-
-            # Initialize filter expression and expression attribute values
-            filter_expression = []
-            expression_values = {}
-
-            # Add filter for 'tag' if it's provided
-            if tag:
-                filter_expression.append("contains(Metadata, :tag)")
-                expression_values[":tag"] = {"S": tag}
-                logger.debug("Filter for tag: %s", tag)
-
-            # Add filter for 'user_id' if it's provided
-            if user_id:
-                filter_expression.append("contains(Metadata, :user_id)")
-                expression_values[":user_id"] = {"S": user_id}
-                logger.debug("Filter for user_id: %s", user_id)
-
-            # If no filters were added, scan the entire table
-            if not filter_expression:
-                logger.debug("No valid filters provided, returning all images")
+            if not query_params.get('limit'):
+                limit = MAX_PAGE_SIZE
+
+            # Listings answered by the tag index or the user index are paged below as usual
+            operation_name, read_kwargs = build_read_request(tags, query_params.get('user_id'), fields, match)
+            if operation_name == 'scan' and not uses_tag_index(tags, query_params.get('user_id')):
                 try:
-                    # Perform DynamoDB scan without filters
-                    response = dynamodb_client.scan(
-                        TableName=dynamo_table_name
-                    )
-                    logger.debug("DynamoDB scan successful, retrieved %d items", len(response.get('Items', [])))
-                except Exception as scan_error:
-                    logger.error("Error performing scan on DynamoDB: %s", str(scan_error))
+                    start_keys = decode_segment_cursor(cursor, total_segments)
+                    with stage('dynamodb_read'):
+                        items, segment_keys = parallel_scan_page(
+                            dynamodb_client.scan, total_segments, limit, start_keys, **read_kwargs
+                        )
+                    logger.debug("Export successful, retrieved %d items with %d segments", len(items), total_segments)
+                except InvalidPaginationError as pagination_error:
+                    logger.error("Invalid pagination parameters: %s", str(pagination_error))
                     return {
-                        'statusCode': 500,
-                        'body': json.dumps({'error': f'Error performing scan on DynamoDB: {str(scan_error)}'})
+                        'statusCode': 400,
+                        'body': json.dumps({'error': str(pagination_error)})
                     }
-            else:
-                # If filters are present, join them into a single string
-                filter_expression_str = " AND ".join(filter_expression)
-                logger.debug("Filter expression: %s", filter_expression_str)
-
-                try:
-                    # Perform DynamoDB scan with filter expression
-                    response = dynamodb_client.scan(
-                        TableName=dynamo_table_name,
-                        FilterExpression=filter_expression_str,
-                        ExpressionAttributeValues=expression_values
-                    )
-                    logger.debug("DynamoDB scan successful with filter, retrieved %d items", len(response.get('Items', [])))
-                except Exception as scan_error:
-                    logger.error("Error performing scan with filter expression: %s", str(scan_error))
+                except Exception as export_error:
+                    logger.error("Error exporting images from DynamoDB: %s", str(export_error))
                     return {
                         'statusCode': 500,
-                        'body': json.dumps({'error': f'Error performing scan with filter expression: {str(scan_error)}'})
+                        'body': json.dumps({'error': f'Error exporting images from DynamoDB: {str(export_error)}'})
                     }
 
+                with stage('format'):
+                    images = [format_image(item, fields) for item in items if not is_pending(item)]
+                return respond(images, encode_segment_cursor(segment_keys), event, response_headers)
+
+        # Tag-only listings merge the posting lists of the tag index instead of scanning the table
+        if uses_tag_index(tags, query_params.get('user_id')):
+            try:
+                with stage('dynamodb_read'):
+                    items, next_cursor = fetch_tagged_page(tags, match, limit, cursor, fields)
+                logger.debug("Tag index read successful, retrieved %d items", len(items))
+            except InvalidPaginationError as pagination_error:
+                logger.error("Invalid pagination parameters: %s", str(pagination_error))
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': str(pagination_error)})
+                }
+            except Exception as read_error:
+                logger.error("Error reading tag index: %s", str(read_error))
+                return {
+                    'statusCode': 500,
+                    'body': json.dumps({'error': f'Error reading tag index: {str(read_error)}'})
+                }
+
+            with stage('format'):
+                images = [format_image(item, fields) for item in items]
+            return respond(images, next_cursor, event, response_headers)
+
+        # Build the query or scan that answers the optional 'tag' and 'user_id' parameters
+        operation_name, read_kwargs = build_read_request(tags, query_params.get('user_id'), fields, match, order, since, until)
+
+        if operation_name == 'query':
+            error_prefix = 'Error performing query on user index'
+        elif 'FilterExpression' in read_kwargs:
+            error_prefix = 'Error performing scan with filter expression'
+        else:
+            logger.debug("No filters provided, returning all images")
+            error_prefix = 'Error performing scan on DynamoDB'
+
+        try:
+            # Read a single page of at most 'limit' items, resuming after the cursor
+            with stage('dynamodb_read'):
+                items, next_cursor = fetch_page(getattr(dynamodb_client, operation_name), limit, cursor, **read_kwargs)
+            logger.debug("DynamoDB %s successful, retrieved %d items", operation_name, len(items))
+        except InvalidPaginationError as pagination_error:
+            logger.error("Invalid pagination parameters: %s", str(pagination_error))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(pagination_error)})
+            }
+        except Exception as read_error:
+            logger.error("%s: %s", error_prefix, str(read_error))
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': f'{error_prefix}: {str(read_error)}'})
+            }
+
         # Process the response from DynamoDB and format the images
-        images = [{"ImageID": item['ImageID']['S'], "Metadata": item['Metadata']['S']} for item in response.get('Items', [])]
+        # Pending uploads are left out until they are committed
+        with stage('format'):
+            images = [format_image(item, fields) for item in items if not is_pending(item)]
         logger.debug("Processed %d images", len(images))
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'images': images})
-        }
+        # Large pages are compressed when the client sends Accept-Encoding
+        return respond(images, next_cursor, event, response_headers)
 
     except Exception as e:
         # Log the error and return an internal server error response
@@ -0,0 +1,68 @@
+import os
+import json
+import random
+import logging
+
+# Log level for every handler, e.g. LOG_LEVEL=DEBUG while investigating; INFO keeps request logs cheap
+log_level = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+if not isinstance(log_level, int):
+    log_level = logging.INFO
+
+# Fraction of invocations that emit DEBUG logs when LOG_LEVEL=DEBUG; the rest run at INFO
+debug_sample_rate = float(os.environ.get('DEBUG_LOG_SAMPLE_RATE', '1.0'))
+
+# Logged strings longer than this are truncated, and lists keep at most MAX_LOGGED_ITEMS entries
+max_logged_chars = int(os.environ.get('LOG_MAX_FIELD_CHARS', '256'))
+MAX_LOGGED_ITEMS = 20
+
+# Fields whose values are never logged, only their size (image payloads and credentials)
+REDACTED_FIELDS = {'image', 'authorization', 'cookie', 'x-amz-security-token'}
+
+
+def summarize_value(value, key=None):
+    # Bounded copy of a JSON value that is safe and cheap to log
+    if key is not None and key.lower() in REDACTED_FIELDS:
+        size = len(value) if isinstance(value, (str, bytes, list, dict)) else 1
+        return f"<redacted {size}>"
+
+    if isinstance(value, dict):
+        return {k: summarize_value(v, k) for k, v in value.items()}
+
+    if isinstance(value, list):
+        summary = [summarize_value(v) for v in value[:MAX_LOGGED_ITEMS]]
+        if len(value) > MAX_LOGGED_ITEMS:
+            summary.append(f"<{len(value) - MAX_LOGGED_ITEMS} more>")
+        return summary
+
+    if isinstance(value, str) and len(value) > max_logged_chars:
+        return f"{value[:max_logged_chars]}<truncated {len(value)} chars>"
+
+    return value
+
+
+def summarize_event(event):
+    # API Gateway delivers the body as a JSON string; parse it so its fields (like image) can be redacted
+    summary = summarize_value({k: v for k, v in event.items() if k != 'body'})
+    body = event.get('body')
+    if isinstance(body, str) and not event.get('isBase64Encoded'):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass
+    if isinstance(body, str) and event.get('isBase64Encoded'):
+        summary['body'] = f"<base64 body {len(body)} chars>"
+    elif 'body' in event:
+        summary['body'] = summarize_value(body)
+    return summary
+
+
+def log_event(logger, event):
+    # Decide once per invocation whether DEBUG is on, then log a redacted, size-capped copy of the event.
+    # Nothing is serialized unless DEBUG is enabled for this invocation.
+    level = log_level
+    if level <= logging.DEBUG and random.random() >= debug_sample_rate:
+        level = logging.INFO
+    logger.setLevel(level)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Event received: %s", json.dumps(summarize_event(event), default=str))
@@ -0,0 +1,201 @@
+import os
+import json
+import logging
+from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from src.renditions import renditions_attribute, parse_renditions
+from src.timestamps import now_timestamp
+
+# Global secondary index on the first-class UserID attribute with CreatedAt as range key: every
+# query for a user's images, in upload order or not. It replaced a UserID-only index, which would
+# double the index writes and storage of every item. Items need CreatedAt to appear in it.
+user_index_name = "UserCreatedAtIndex"
+
+# With CONCURRENT_UPLOAD_WRITES=true upload_image writes the metadata item while the object uploads.
+# The item carries UploadStatus=PENDING until the object has landed; readers treat it as missing.
+concurrent_upload_writes = os.environ.get('CONCURRENT_UPLOAD_WRITES', 'false').lower() == 'true'
+UPLOAD_STATUS = 'UploadStatus'
+UPLOAD_PENDING = 'PENDING'
+
+# S3 user-metadata key that carries the JSON metadata of a presigned upload to finalize_upload
+upload_metadata_header = "image-metadata"
+
+# Presigned uploads are written under their own prefix, the only one the finalizeUpload S3 event
+# listens to, so originals, renditions and variants written by the handlers do not invoke it
+direct_upload_prefix = "uploads/"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+# Convert between plain Python values and DynamoDB attribute values
+type_serializer = TypeSerializer()
+type_deserializer = TypeDeserializer()
+
+def serialize_metadata(metadata):
+    # Dict metadata is stored as a native map so its fields can be filtered and projected.
+    # Anything else keeps the legacy JSON string form.
+    if not isinstance(metadata, dict):
+        return {'S': json.dumps(metadata)}
+
+    # The serializer rejects floats, so numbers are round-tripped through Decimal
+    return type_serializer.serialize(json.loads(json.dumps(metadata), parse_float=Decimal))
+
+def plain_value(value):
+    # Turn deserialized DynamoDB values (Decimal numbers, sets) back into JSON-friendly ones
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: plain_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain_value(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(plain_value(v) for v in value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return value
+
+def attribute_value(attribute):
+    # Plain Python value of a single DynamoDB attribute value
+    return plain_value(type_deserializer.deserialize(attribute))
+
+def parse_metadata(attribute):
+    # Native maps are deserialized directly. Legacy items hold a JSON string, and the oldest ones
+    # a free-form string, which is returned as is.
+    if attribute is None:
+        return None
+    if 'S' in attribute:
+        try:
+            return json.loads(attribute['S'])
+        except ValueError:
+            return attribute['S']
+    return attribute_value(attribute)
+
+def extract_user_id(metadata):
+    # Only dict metadata can carry a user_id; anything else is stored opaquely
+    if not isinstance(metadata, dict):
+        return None
+
+    user_id = metadata.get('user_id')
+    if user_id in (None, ''):
+        return None
+    return str(user_id)
+
+def extract_tags(metadata):
+    if not isinstance(metadata, dict):
+        return []
+
+    # Accept a list of tags, a comma-separated string, or a single 'tag' value
+    raw_tags = metadata.get('tags', [])
+    if isinstance(raw_tags, str):
+        raw_tags = raw_tags.split(',')
+    elif not isinstance(raw_tags, (list, tuple, set)):
+        raw_tags = [raw_tags]
+    if metadata.get('tag'):
+        raw_tags = list(raw_tags) + [metadata['tag']]
+
+    # Tags are stored as a string set, so de-duplicate and drop empty values
+    return sorted({str(tag).strip() for tag in raw_tags if str(tag).strip()})
+
+def build_image_item(image_id, s3_key, metadata, renditions=None, digest=None,
+                     content_type=None, size_bytes=None, variants=None, created_at=None):
+    item = {
+        'ImageID': {'S': image_id},
+        'Metadata': serialize_metadata(metadata),
+        'S3Key': {'S': s3_key},
+        # Version of the item's content, advanced when a rendition is added; part of view_image's ETag
+        'Version': {'N': '1'},
+        # Upload time, the range key of the UserCreatedAtIndex
+        'CreatedAt': {'S': created_at or now_timestamp()},
+    }
+
+    # UserID and Tags are first-class attributes so they can be indexed and matched exactly.
+    # They are omitted when absent: the UserID index stays sparse and DynamoDB rejects empty sets.
+    user_id = extract_user_id(metadata)
+    if user_id:
+        item['UserID'] = {'S': user_id}
+
+    tags = extract_tags(metadata)
+    if tags:
+        item['Tags'] = {'SS': tags}
+
+    # Deduplicated uploads point at a shared blob that is reference-counted by its content hash
+    if digest:
+        item['ContentHash'] = {'S': digest}
+
+    # Real content type and size of the original, plus re-encoded variants (content type -> key and size)
+    if content_type:
+        item['ContentType'] = {'S': content_type}
+    if size_bytes is not None:
+        item['Bytes'] = {'N': str(size_bytes)}
+    if variants:
+        item['Variants'] = {'M': {
+            variant_type: {'M': {'S3Key': {'S': variant['S3Key']}, 'Bytes': {'N': str(variant['Bytes'])}}}
+            for variant_type, variant in variants.items()
+        }}
+
+    # Renditions generated at upload time are recorded with their dimensions and byte sizes
+    if renditions:
+        item['Renditions'] = renditions_attribute(renditions)
+
+    logger.debug("Built metadata item for image ID %s (user_id=%s, tags=%s)", image_id, user_id, tags)
+    return item
+
+def parse_variants(item):
+    # Read the Variants map of a metadata item back into a list of {ContentType, S3Key, Bytes}
+    return [
+        {'ContentType': variant_type, 'S3Key': value['M']['S3Key']['S'], 'Bytes': int(value['M']['Bytes']['N'])}
+        for variant_type, value in item.get('Variants', {}).get('M', {}).items()
+    ]
+
+def parse_original(item):
+    # Describe the original upload like a variant; items written before sniffing were stored as JPEG
+    return {
+        'ContentType': item.get('ContentType', {}).get('S', 'image/jpeg'),
+        'S3Key': item['S3Key']['S'],
+        'Bytes': int(item['Bytes']['N']) if 'Bytes' in item else float('inf')
+    }
+
+def item_object_keys(item):
+    # Every S3 object owned by a metadata item: the original plus its renditions and variants.
+    # A deduplicated original is shared with other images and is released through the blob store instead.
+    keys = [] if 'ContentHash' in item else [item['S3Key']['S']]
+    return keys + derived_object_keys(item)
+
+def derived_object_keys(item):
+    # Objects generated from the original: resized renditions and re-encoded variants
+    keys = [rendition['S3Key'] for rendition in parse_renditions(item).values()]
+    keys.extend(variant['S3Key'] for variant in parse_variants(item))
+    return keys
+
+def pending_item(item):
+    # Copy of an item that readers skip until commit_request publishes it
+    return dict(item, **{UPLOAD_STATUS: {'S': UPLOAD_PENDING}})
+
+def is_pending(item):
+    # Items without UploadStatus were written whole and are always visible
+    return item.get(UPLOAD_STATUS, {}).get('S') == UPLOAD_PENDING
+
+def commit_request(table_name, pending, item):
+    # UpdateItem arguments that turn a pending item into the final one: attributes only known after the
+    # object landed (S3Key and ContentHash of a shared blob, variants, renditions) are set and
+    # UploadStatus is removed. The condition keeps an item swept in the meantime from being recreated.
+    changed = [name for name, value in item.items() if pending.get(name) != value]
+    names = {'#status': UPLOAD_STATUS}
+    values = {':pending': {'S': UPLOAD_PENDING}}
+    assignments = []
+    for index, name in enumerate(changed):
+        names[f"#a{index}"] = name
+        values[f":a{index}"] = item[name]
+        assignments.append(f"#a{index} = :a{index}")
+
+    update_expression = "REMOVE #status"
+    if assignments:
+        update_expression = f"SET {', '.join(assignments)} {update_expression}"
+    return {
+        'TableName': table_name,
+        'Key': {'ImageID': item['ImageID']},
+        'UpdateExpression': update_expression,
+        'ConditionExpression': "#status = :pending",
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+    }
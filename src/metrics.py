@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import logging
+import functools
+import contextlib
+import contextvars
+
+# Per-stage latency, payload sizes, item counts and DynamoDB consumed capacity of each handler
+# invocation, written to the log as one CloudWatch Embedded Metric Format (EMF) line. CloudWatch turns
+# the line into metrics without any PutMetricData calls. Off by default: the decorator then calls the
+# handler directly and stage() hands back a shared no-op context manager.
+metrics_enabled = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+metrics_namespace = os.environ.get('METRICS_NAMESPACE', 'ImageService')
+
+# DynamoDB operations whose consumed capacity is read capacity; every other operation writes
+READ_OPERATIONS = {'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'}
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+# Recorder of the invocation running in this thread; None outside instrumented handlers
+_current = contextvars.ContextVar('invocation_metrics', default=None)
+_no_stage = contextlib.nullcontext()
+
+
+def unit_for(name):
+    # The unit follows from the metric name's suffix
+    if name.endswith('_ms'):
+        return 'Milliseconds'
+    if name.endswith('_bytes'):
+        return 'Bytes'
+    return 'Count'
+
+
+class InvocationMetrics:
+    # Values collected during one invocation; repeated stages and counters add up
+
+    def __init__(self, handler_name):
+        self.handler_name = handler_name
+        self.values = {}
+        self.properties = {}
+
+    def add(self, name, value):
+        self.values[name] = self.values.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(f"{name}_ms", (time.perf_counter() - started) * 1000)
+
+    def add_response(self, operation_name, response):
+        # Items read vs returned by scans and queries, and the capacity units the call consumed
+        self.add('dynamodb_calls', 1)
+        if 'ScannedCount' in response:
+            self.add('items_scanned', response['ScannedCount'])
+        if 'Count' in response:
+            self.add('items_returned', response['Count'])
+
+        capacity = response.get('ConsumedCapacity') or []
+        kind = 'read_capacity' if operation_name in READ_OPERATIONS else 'write_capacity'
+        for entry in capacity if isinstance(capacity, list) else [capacity]:
+            self.add(kind, entry.get('CapacityUnits', 0))
+
+    def document(self, timestamp=None):
+        # The EMF envelope names the metrics; their values and the properties sit at the top level
+        names = sorted(self.values)
+        document = {
+            '_aws': {
+                'Timestamp': int((time.time() if timestamp is None else timestamp) * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': metrics_namespace,
+                    'Dimensions': [['Handler']],
+                    'Metrics': [{'Name': name, 'Unit': unit_for(name)} for name in names],
+                }],
+            },
+            'Handler': self.handler_name,
+        }
+        document.update(self.properties)
+        document.update((name, round(self.values[name], 3)) for name in names)
+        return document
+
+
+def emit(document):
+    # Lambda forwards stdout to CloudWatch Logs, where a line holding only the JSON is read as EMF
+    sys.stdout.write(json.dumps(document, separators=(',', ':'), default=str) + '\n')
+    sys.stdout.flush()
+
+
+def instrumented(handler):
+    # Wrap a Lambda handler so its stages are recorded and emitted in one EMF line per invocation
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not metrics_enabled:
+            return handler(event, context)
+
+        recorder = InvocationMetrics(handler.__name__)
+        token = _current.set(recorder)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = handler(event, context)
+            return response
+        finally:
+            _current.reset(token)
+            recorder.add('total_ms', (time.perf_counter() - started) * 1000)
+            recorder.properties['StatusCode'] = response.get('statusCode') if isinstance(response, dict) else None
+            recorder.properties['RequestId'] = getattr(context, 'aws_request_id', None)
+            try:
+                emit(recorder.document())
+            except Exception as emit_error:
+                logger.warning("Error emitting metrics: %s", str(emit_error))
+    return wrapper
+
+
+def stage(name):
+    # Time a block as <name>_ms of the current invocation
+    recorder = _current.get()
+    return _no_stage if recorder is None else recorder.stage(name)
+
+
+def record(name, value):
+    # Add a count or size to the current invocation, e.g. record('image_bytes', size)
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.add(name, value)
+
+
+def request_consumed_capacity(params, model, **kwargs):
+    # provide-client-params hook: ask for the consumed capacity while an invocation is being recorded
+    if _current.get() is None or model.input_shape is None:
+        return
+    if 'ReturnConsumedCapacity' in model.input_shape.members:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def record_dynamodb_response(parsed, model, **kwargs):
+    # after-call hook: add the call's counts and capacity to the current invocation
+    recorder = _current.get()
+    if recorder is not None and isinstance(parsed, dict):
+        recorder.add_response(model.name, parsed)
+
+
+def register_client_metrics(client):
+    # Hook every DynamoDB call of a boto3 client, including the ones made by shared helpers
+    # (batching, tag index, versions), so handlers do not pass ReturnConsumedCapacity themselves.
+    # Calls made from worker threads (parallel scans) run outside the invocation and are not counted.
+    events = getattr(getattr(client, 'meta', None), 'events', None)
+    if events is None or client.meta.service_model.service_name != 'dynamodb':
+        return
+    events.register('provide-client-params.dynamodb.*', request_consumed_capacity)
+    events.register('after-call.dynamodb.*', record_dynamodb_response)
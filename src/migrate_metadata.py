@@ -0,0 +1,70 @@
+import sys
+import json
+import logging
+from botocore.exceptions import ClientError
+from src.metadata import serialize_metadata, parse_metadata
+from src.parallel_scan import parallel_scan_items, parse_total_segments
+from src.aws_clients import LazyClient
+from src.log_config import log_level
+
+# Initialize DynamoDB client
+dynamodb_client = LazyClient('dynamodb')
+dynamo_table_name = "ImagesMetadata"
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def migrate_item(image_id, legacy_attribute):
+    # Rewrite one legacy JSON string as a native map. Returns False when there is nothing to convert.
+    metadata = parse_metadata(legacy_attribute)
+    if not isinstance(metadata, dict):
+        return False
+
+    # The condition skips items that changed since the scan read them
+    dynamodb_client.update_item(
+        TableName=dynamo_table_name,
+        Key={'ImageID': {'S': image_id}},
+        UpdateExpression="SET Metadata = :metadata",
+        ConditionExpression="Metadata = :legacy",
+        ExpressionAttributeValues={':metadata': serialize_metadata(metadata), ':legacy': legacy_attribute}
+    )
+    return True
+
+def migrate_metadata(total_segments=None):
+    # Convert every item whose Metadata is still a JSON string into a native DynamoDB map, so its
+    # fields can be filtered and projected. Items that are not JSON objects are left as they are.
+    migrated = 0
+    skipped = 0
+    failed = 0
+
+    for item in parallel_scan_items(
+        dynamodb_client.scan,
+        total_segments,
+        TableName=dynamo_table_name,
+        FilterExpression="attribute_type(Metadata, :string)",
+        ExpressionAttributeValues={':string': {'S': 'S'}},
+        ProjectionExpression="ImageID, Metadata"
+    ):
+        image_id = item['ImageID']['S']
+        try:
+            if migrate_item(image_id, item['Metadata']):
+                logger.debug("Migrated metadata for image_id: %s", image_id)
+                migrated += 1
+            else:
+                logger.warning("Skipping image_id %s: metadata is not a JSON object", image_id)
+                skipped += 1
+        except ClientError as dynamo_error:
+            if dynamo_error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                logger.debug("Skipping image_id %s: metadata changed during migration", image_id)
+                skipped += 1
+                continue
+            logger.error("Error migrating metadata for image_id %s: %s", image_id, str(dynamo_error))
+            failed += 1
+
+    logger.info("Metadata migration complete: %d migrated, %d skipped, %d failed", migrated, skipped, failed)
+    return {'migrated': migrated, 'skipped': skipped, 'failed': failed}
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    print(json.dumps(migrate_metadata(parse_total_segments(sys.argv[1] if len(sys.argv) > 1 else None))))
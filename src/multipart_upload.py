@@ -0,0 +1,89 @@
+import os
+import base64
+import binascii
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# S3 requires every part except the last to be at least 5 MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Decoded image size above which upload_image streams the image as a multipart upload. Synchronous
+# Lambda payloads stop at 6 MB of base64 (about 4.5 MB decoded), so only direct invocations reach it;
+# images sent through API Gateway that large go through the presigned upload instead
+multipart_threshold = int(os.environ.get('MULTIPART_THRESHOLD', str(10 * 1024 * 1024)))
+default_part_size = max(int(os.environ.get('MULTIPART_PART_SIZE', str(8 * 1024 * 1024))), MIN_PART_SIZE)
+default_max_concurrency = int(os.environ.get('MULTIPART_CONCURRENCY', '4'))
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class InvalidImageDataError(ValueError):
+    # Raised when a chunk of the base64 image cannot be decoded
+    pass
+
+
+def decoded_size(image_data):
+    # Size of the decoded bytes, computed without decoding
+    return len(image_data) * 3 // 4 - image_data[-2:].count('=')
+
+
+def iter_decoded_chunks(image_data, chunk_size):
+    # Decode the base64 string one slice at a time. Slices are a multiple of 4 characters long,
+    # so each one decodes independently to a whole number of bytes (the last may be shorter).
+    # Rounding up keeps every slice but the last at least chunk_size bytes, as S3 requires of parts.
+    step = max(-(-chunk_size // 3), 1) * 4
+    for start in range(0, len(image_data), step):
+        try:
+            yield base64.b64decode(image_data[start:start + step], validate=True)
+        except (binascii.Error, ValueError) as decode_error:
+            raise InvalidImageDataError(f'Invalid base64 data at offset {start}: {decode_error}')
+
+
+def upload_base64_multipart(s3_client, bucket, key, image_data, content_type,
+                            part_size=None, max_concurrency=None):
+    # Stream a base64 image into S3 as a multipart upload. At most 'max_concurrency' parts are
+    # uploading at once and only one more is decoded ahead, so peak memory stays at a few part
+    # sizes no matter how large the image is.
+    part_size = max(part_size or default_part_size, MIN_PART_SIZE)
+    max_concurrency = max_concurrency or default_max_concurrency
+
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+    logger.debug("Started multipart upload %s for key: %s", upload_id, key)
+
+    def upload_part(part_number, chunk):
+        response = s3_client.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=chunk
+        )
+        logger.debug("Uploaded part %d (%d bytes) for key: %s", part_number, len(chunk), key)
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    try:
+        parts = []
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            in_flight = set()
+            for part_number, chunk in enumerate(iter_decoded_chunks(image_data, part_size), start=1):
+                # Wait for a slot before decoding further so memory stays bounded
+                if len(in_flight) >= max_concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    parts.extend(future.result() for future in done)
+                in_flight.add(executor.submit(upload_part, part_number, chunk))
+
+            done, _ = wait(in_flight)
+            parts.extend(future.result() for future in done)
+
+        parts.sort(key=lambda part: part['PartNumber'])
+        s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+        )
+        logger.debug("Completed multipart upload %s with %d parts", upload_id, len(parts))
+        return len(parts)
+
+    except BaseException:
+        # Abort so S3 does not keep (and bill for) the parts that were already uploaded
+        try:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            logger.debug("Aborted multipart upload %s for key: %s", upload_id, key)
+        except Exception as abort_error:
+            logger.error("Error aborting multipart upload %s: %s", upload_id, str(abort_error))
+        raise
@@ -0,0 +1,128 @@
+import json
+import base64
+import logging
+
+# Page size used when the caller does not pass a limit, and the hard upper bound
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class InvalidPaginationError(ValueError):
+    # Raised for a malformed limit or cursor so handlers can answer with a 400
+    pass
+
+
+def parse_limit(value):
+    # Missing limit falls back to the default page size
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPaginationError('limit must be an integer')
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise InvalidPaginationError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    return limit
+
+
+def _encode(value):
+    # Cursors are JSON serialized and base64url-encoded so clients treat them as opaque
+    raw = json.dumps(value, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise InvalidPaginationError('Invalid cursor')
+
+
+def _is_key(value):
+    # A key is a non-empty map of attribute name -> DynamoDB attribute value
+    return isinstance(value, dict) and bool(value) and all(isinstance(v, dict) for v in value.values())
+
+
+def encode_cursor(last_evaluated_key):
+    # An exhausted listing has no next cursor; otherwise the cursor is the LastEvaluatedKey
+    if not last_evaluated_key:
+        return None
+    return _encode(last_evaluated_key)
+
+
+def decode_cursor(cursor):
+    # No cursor means start from the beginning of the table
+    if not cursor:
+        return None
+
+    key = _decode(cursor)
+    if not _is_key(key):
+        raise InvalidPaginationError('Invalid cursor')
+
+    return key
+
+
+def encode_segment_cursor(segment_keys):
+    # A segmented scan resumes every segment where it stopped: the cursor holds one LastEvaluatedKey
+    # per segment, null for a segment that is exhausted. Once all are exhausted there is no cursor.
+    if not any(segment_keys):
+        return None
+    return _encode({'segments': list(segment_keys)})
+
+
+def decode_segment_cursor(cursor, total_segments):
+    # No cursor means every segment starts from its beginning
+    if not cursor:
+        return None
+
+    value = _decode(cursor)
+    segment_keys = value.get('segments') if isinstance(value, dict) else None
+    if not isinstance(segment_keys, list) or not any(segment_keys) \
+            or not all(key is None or _is_key(key) for key in segment_keys):
+        raise InvalidPaginationError('Invalid cursor')
+
+    # The segment split only lines up with the scan that issued the cursor
+    if len(segment_keys) != total_segments:
+        raise InvalidPaginationError('cursor was issued for a different segments value')
+
+    return segment_keys
+
+
+def fetch_page(operation, limit, cursor=None, **kwargs):
+    # Read a single bounded page (scan or query) starting after the decoded cursor
+    start_key = decode_cursor(cursor)
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+
+    response = operation(Limit=limit, **kwargs)
+    items = response.get('Items', [])
+    logger.debug("Fetched page with %d items (scanned %s)", len(items), response.get('ScannedCount'))
+
+    return items, encode_cursor(response.get('LastEvaluatedKey'))
+
+
+def iter_pages(operation, **kwargs):
+    # Stream every page of a scan or query, following LastEvaluatedKey until the table is exhausted.
+    # Only one page is held in memory at a time, so callers see bounded latency and memory per page.
+    while True:
+        response = operation(**kwargs)
+        yield response
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def iter_items(operation, **kwargs):
+    # Flatten iter_pages into a stream of individual items
+    for page in iter_pages(operation, **kwargs):
+        for item in page.get('Items', []):
+            yield item
@@ -0,0 +1,130 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.pagination import iter_pages
+
+# DynamoDB accepts at most 1,000,000 segments; the thread pool is capped separately
+MAX_TOTAL_SEGMENTS = 1000000
+MAX_WORKERS = 32
+
+# Number of segments used when the caller does not choose one
+default_total_segments = int(os.environ.get('SCAN_TOTAL_SEGMENTS', '4'))
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+# Marks the end of one segment in the page queue
+_SEGMENT_DONE = object()
+
+
+def parse_total_segments(value, maximum=MAX_TOTAL_SEGMENTS):
+    # Missing segment count falls back to the configured default. Offline jobs accept up to DynamoDB's
+    # limit; request handlers pass a lower maximum so a caller cannot fan one request out without bound
+    if value in (None, ''):
+        return default_total_segments
+
+    try:
+        total_segments = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('segments must be an integer')
+
+    if total_segments < 1 or total_segments > maximum:
+        raise ValueError(f'segments must be between 1 and {maximum}')
+
+    return total_segments
+
+
+def parallel_scan(operation, total_segments=None, max_workers=None, **scan_kwargs):
+    # Scan the table as 'total_segments' independent Segment/TotalSegments slices on a thread pool
+    # and yield each response page as soon as any segment produces it. Any bulk job can reuse this
+    # by passing a client's scan method and the usual scan arguments (TableName, FilterExpression, ...).
+    total_segments = total_segments or default_total_segments
+    if total_segments == 1:
+        # A single segment is just a sequential scan
+        yield from iter_pages(operation, **scan_kwargs)
+        return
+
+    max_workers = min(max_workers or total_segments, total_segments, MAX_WORKERS)
+    logger.debug("Starting parallel scan with %d segments on %d workers", total_segments, max_workers)
+
+    # A bounded queue applies backpressure, so a slow consumer keeps at most a few pages in memory
+    pages = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+
+    def offer(entry):
+        # Block until the consumer takes the entry, giving up once the scan has been stopped
+        while not stop.is_set():
+            try:
+                pages.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment):
+        try:
+            for page in iter_pages(operation, Segment=segment, TotalSegments=total_segments, **scan_kwargs):
+                if not offer(page):
+                    return
+        except Exception as scan_error:
+            logger.error("Error scanning segment %d: %s", segment, str(scan_error))
+            offer(scan_error)
+        finally:
+            offer(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        # Stop the workers if the caller stopped early or a segment failed
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parallel_scan_page(operation, total_segments, limit, start_keys=None, **scan_kwargs):
+    # Read one bounded page of a segmented scan: every segment that is not exhausted reads a single
+    # page of limit/segments items, concurrently, starting after its key in 'start_keys' (None on the
+    # first page). Returns the items and each segment's LastEvaluatedKey, None once it is exhausted,
+    # which the next page passes back as 'start_keys'.
+    segments = range(total_segments) if start_keys is None else [s for s, key in enumerate(start_keys) if key]
+    segment_keys = [None] * total_segments
+    if not segments:
+        return [], segment_keys
+    segment_limit = max(limit // len(segments), 1)
+
+    def scan_segment(segment):
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments, Limit=segment_limit)
+        if start_keys is not None:
+            kwargs['ExclusiveStartKey'] = start_keys[segment]
+        return operation(**kwargs)
+
+    with ThreadPoolExecutor(max_workers=min(len(segments), MAX_WORKERS)) as executor:
+        responses = list(executor.map(scan_segment, segments))
+
+    items = []
+    for segment, response in zip(segments, responses):
+        items.extend(response.get('Items', []))
+        segment_keys[segment] = response.get('LastEvaluatedKey')
+    logger.debug("Read %d items from %d segments", len(items), len(segments))
+
+    return items, segment_keys
+
+
+def parallel_scan_items(operation, total_segments=None, max_workers=None, **scan_kwargs):
+    # Flatten parallel_scan into a stream of individual items
+    for page in parallel_scan(operation, total_segments, max_workers, **scan_kwargs):
+        for item in page.get('Items', []):
+            yield item
@@ -0,0 +1,77 @@
+import re
+import logging
+
+# Item attributes a client may ask for with ?fields=; nested paths are allowed below Metadata only
+PUBLIC_FIELDS = ('ImageID', 'Metadata', 'UserID', 'Tags', 'ContentType', 'Bytes', 'Version', 'CreatedAt')
+NESTED_FIELDS = ('Metadata',)
+MAX_FIELDS = 20
+
+# Each dot-separated path segment must be a plain attribute name
+_segment_pattern = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class InvalidFieldsError(ValueError):
+    # Raised for an unknown or malformed fields parameter so handlers can answer with a 400
+    pass
+
+
+def parse_fields(value):
+    # Missing fields means the handler's default attributes
+    if value in (None, ''):
+        return None
+
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+
+        path = field.split('.')
+        if path[0] not in PUBLIC_FIELDS:
+            raise InvalidFieldsError(f'Unknown field: {path[0]}')
+        if len(path) > 1 and path[0] not in NESTED_FIELDS:
+            raise InvalidFieldsError(f'Field {path[0]} has no nested attributes')
+        if not all(_segment_pattern.match(segment) for segment in path):
+            raise InvalidFieldsError(f'Invalid field: {field}')
+        fields.append(field)
+
+    if not fields:
+        raise InvalidFieldsError('fields must name at least one attribute')
+    if len(fields) > MAX_FIELDS:
+        raise InvalidFieldsError(f'At most {MAX_FIELDS} fields can be requested')
+
+    # DynamoDB rejects overlapping paths, so a whole attribute absorbs its nested paths
+    whole = {field for field in fields if '.' not in field}
+    return [field for field in fields if '.' not in field or field.split('.')[0] not in whole]
+
+
+def top_level_fields(fields):
+    # Attribute names the response is built from, in request order
+    names = []
+    for field in fields:
+        name = field.split('.')[0]
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def build_projection(fields, required=()):
+    # ProjectionExpression for the required attributes plus the requested fields. Every path segment
+    # goes through an ExpressionAttributeNames placeholder, so reserved words like Bytes are safe.
+    names = {}
+    placeholders = {}
+    paths = []
+    for field in list(required) + [field for field in fields if field not in required]:
+        segments = []
+        for segment in field.split('.'):
+            if segment not in placeholders:
+                placeholders[segment] = f"#p{len(placeholders)}"
+                names[placeholders[segment]] = segment
+            segments.append(placeholders[segment])
+        paths.append('.'.join(segments))
+
+    logger.debug("Projection for fields %s: %s", fields, paths)
+    return {'ProjectionExpression': ', '.join(paths), 'ExpressionAttributeNames': names}
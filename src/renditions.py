@@ -0,0 +1,130 @@
+import os
+import logging
+import importlib.util
+from io import BytesIO
+from botocore.exceptions import ClientError
+
+# Pillow is optional: without it no renditions are generated and view_image serves the original.
+# It is imported where images are decoded, so handlers that never render skip it at cold start.
+pillow_available = importlib.util.find_spec('PIL') is not None
+
+# Longest-edge sizes (in pixels) of the renditions generated for every image
+rendition_sizes = sorted({int(size) for size in os.environ.get('RENDITION_SIZES', '150,480,1080').split(',') if size.strip()})
+
+# Generate every rendition while uploading instead of lazily on the first request for a size
+renditions_on_upload = os.environ.get('RENDITIONS_ON_UPLOAD', 'false').lower() == 'true'
+rendition_quality = int(os.environ.get('RENDITION_QUALITY', '85'))
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def renditions_available():
+    return pillow_available
+
+
+def rendition_key(image_id, size):
+    return f"images/{image_id}/{size}.jpg"
+
+
+def render(image_bytes, size):
+    # Resize so the longest edge is at most 'size' pixels (never upscaling) and re-encode as JPEG
+    from PIL import Image, ImageOps
+    with Image.open(BytesIO(image_bytes)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        output = BytesIO()
+        image.save(output, 'JPEG', quality=rendition_quality, optimize=True)
+        return output.getvalue(), image.width, image.height
+
+
+def generate_rendition(s3_client, bucket, image_id, image_bytes, size):
+    # Render one size, store it under its per-size key and describe it for the metadata item
+    data, width, height = render(image_bytes, size)
+    s3_key = rendition_key(image_id, size)
+    s3_client.put_object(Bucket=bucket, Key=s3_key, Body=data, ContentType="image/jpeg")
+    logger.debug("Stored %dpx rendition (%dx%d, %d bytes) at key: %s", size, width, height, len(data), s3_key)
+    return {'S3Key': s3_key, 'Width': width, 'Height': height, 'Bytes': len(data)}
+
+
+def generate_renditions(s3_client, bucket, image_id, image_bytes, sizes=None):
+    # Generate every configured size; returns {} when Pillow is missing or the bytes are not an image
+    if not renditions_available():
+        logger.debug("Pillow is not installed, skipping renditions for image ID: %s", image_id)
+        return {}
+
+    renditions = {}
+    try:
+        for size in sizes or rendition_sizes:
+            renditions[size] = generate_rendition(s3_client, bucket, image_id, image_bytes, size)
+    except Exception as render_error:
+        logger.warning("Error generating renditions for image ID %s: %s", image_id, str(render_error))
+        delete_renditions(s3_client, bucket, renditions)
+        return {}
+    return renditions
+
+
+def delete_renditions(s3_client, bucket, renditions):
+    # Best-effort removal of rendition objects, used by compensation paths
+    for rendition in renditions.values():
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=rendition['S3Key'])
+        except Exception as delete_error:
+            logger.error("Error deleting rendition %s: %s", rendition['S3Key'], str(delete_error))
+
+
+def rendition_attribute(rendition):
+    return {'M': {
+        'S3Key': {'S': rendition['S3Key']},
+        'Width': {'N': str(rendition['Width'])},
+        'Height': {'N': str(rendition['Height'])},
+        'Bytes': {'N': str(rendition['Bytes'])},
+    }}
+
+
+def renditions_attribute(renditions):
+    # DynamoDB map of size -> {S3Key, Width, Height, Bytes}
+    return {'M': {str(size): rendition_attribute(rendition) for size, rendition in renditions.items()}}
+
+
+def parse_renditions(item):
+    # Read the Renditions map of a metadata item back into {size: {...}}
+    renditions = {}
+    for size, value in item.get('Renditions', {}).get('M', {}).items():
+        attributes = value['M']
+        renditions[int(size)] = {
+            'S3Key': attributes['S3Key']['S'],
+            'Width': int(attributes['Width']['N']),
+            'Height': int(attributes['Height']['N']),
+            'Bytes': int(attributes['Bytes']['N']),
+        }
+    return renditions
+
+
+def store_rendition(dynamodb_client, table_name, image_id, size, rendition):
+    # Record a lazily generated rendition and advance the item's Version, which view_image's ETag
+    # is built from. A nested SET needs the Renditions map to exist, so items written before
+    # renditions existed get the map created on first use.
+    key = {'ImageID': {'S': image_id}}
+    try:
+        dynamodb_client.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression="SET Renditions.#size = :rendition ADD Version :one",
+            ConditionExpression="attribute_exists(Renditions)",
+            ExpressionAttributeNames={'#size': str(size)},
+            ExpressionAttributeValues={':rendition': rendition_attribute(rendition), ':one': {'N': '1'}}
+        )
+    except ClientError as dynamo_error:
+        if dynamo_error.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        dynamodb_client.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression="SET Renditions = :renditions ADD Version :one",
+            ConditionExpression="attribute_exists(ImageID) AND attribute_not_exists(Renditions)",
+            ExpressionAttributeValues={':renditions': renditions_attribute({size: rendition}), ':one': {'N': '1'}}
+        )
@@ -0,0 +1,91 @@
+import sys
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from src.metadata import UPLOAD_STATUS, UPLOAD_PENDING
+from src.renditions import rendition_sizes, rendition_key
+from src.transcode import transcode_format, describe_format, FORMATS
+from src.tag_index import unindex_tags, item_tags
+from src.timestamps import format_timestamp
+from src.parallel_scan import parallel_scan_items, parse_total_segments
+from src.aws_clients import LazyClient
+from src.log_config import log_level
+
+# Initialize S3 and DynamoDB clients
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
+s3_bucket_name = "mc-image-insta-uploaders"
+dynamo_table_name = "ImagesMetadata"
+
+# Pending items younger than this may belong to an upload still in flight (Lambda runs at most 15 minutes)
+min_age_seconds = 900
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+logger.setLevel(log_level)
+
+def pending_object_keys(image_id, s3_key):
+    # Objects a concurrent upload may have written before it stopped: the original, the renditions
+    # generated on upload and the re-encoded variant. Deleting a key that was never written is a no-op.
+    keys = [s3_key] + [rendition_key(image_id, size) for size in rendition_sizes]
+    if transcode_format in FORMATS:
+        keys.append(f"images/{image_id}/variant.{describe_format(transcode_format)['extension']}")
+    return keys
+
+def sweep_pending_uploads(total_segments=None, now=None):
+    # Remove what concurrent uploads (CONCURRENT_UPLOAD_WRITES) left behind when their Lambda stopped
+    # between the pending write and the commit: the objects, the pending item and its tag postings
+    cutoff = format_timestamp((now or datetime.now(timezone.utc)) - timedelta(seconds=min_age_seconds))
+    swept = 0
+    failed = 0
+
+    for item in parallel_scan_items(
+        dynamodb_client.scan,
+        total_segments,
+        TableName=dynamo_table_name,
+        FilterExpression="#status = :pending AND CreatedAt < :cutoff",
+        ProjectionExpression="ImageID, S3Key, Tags",
+        ExpressionAttributeNames={'#status': UPLOAD_STATUS},
+        ExpressionAttributeValues={':pending': {'S': UPLOAD_PENDING}, ':cutoff': {'S': cutoff}}
+    ):
+        image_id = item['ImageID']['S']
+        # The item goes first: the condition leaves it alone if it was committed after all, and the
+        # objects of a committed image must not be touched
+        try:
+            dynamodb_client.delete_item(
+                TableName=dynamo_table_name,
+                Key={'ImageID': {'S': image_id}},
+                ConditionExpression="#status = :pending",
+                ExpressionAttributeNames={'#status': UPLOAD_STATUS},
+                ExpressionAttributeValues={':pending': {'S': UPLOAD_PENDING}}
+            )
+        except ClientError as client_error:
+            if client_error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                logger.debug("Skipping committed image_id: %s", image_id)
+                continue
+            logger.error("Error sweeping pending upload %s: %s", image_id, str(client_error))
+            failed += 1
+            continue
+
+        unindex_tags(dynamodb_client, {image_id: item_tags(item)})
+        # Concurrent uploads never share deduplicated blobs, so every object under the image is its own
+        try:
+            s3_client.delete_objects(
+                Bucket=s3_bucket_name,
+                Delete={'Objects': [{'Key': key} for key in pending_object_keys(image_id, item['S3Key']['S'])], 'Quiet': True}
+            )
+        except Exception as delete_error:
+            logger.error("Error deleting objects of pending upload %s: %s", image_id, str(delete_error))
+            failed += 1
+            continue
+
+        logger.debug("Swept pending upload: %s", image_id)
+        swept += 1
+
+    logger.info("Pending upload sweep complete: %d swept, %d failed", swept, failed)
+    return {'swept': swept, 'failed': failed}
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    print(json.dumps(sweep_pending_uploads(parse_total_segments(sys.argv[1] if len(sys.argv) > 1 else None))))
@@ -0,0 +1,170 @@
+import os
+import heapq
+import logging
+from itertools import islice
+from src.batching import batch_write
+from src.pagination import iter_items
+
+# Inverted tag index: one item per (Tag, ImageID). The images carrying a tag are a Query on the
+# tag's partition, already sorted by ImageID, instead of a filtered scan of ImagesMetadata.
+tag_index_table_name = "ImageTags"
+
+# Writes always maintain the index; reads only use it once it has been backfilled (backfill_tag_index)
+use_tag_index = os.environ.get('USE_TAG_INDEX', 'true').lower() == 'true'
+
+# How the tags of a multi-tag query are combined
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+MAX_QUERY_TAGS = 10
+
+# Postings read per Query page when intersecting; an AND may skip many postings per match
+intersect_page_size = 1000
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class InvalidTagQueryError(ValueError):
+    # Raised for a malformed tag or match parameter so handlers can answer with a 400
+    pass
+
+
+class TagIndexError(Exception):
+    # Raised by writers when postings could not be written, so the image is not stored without them
+    pass
+
+
+def parse_tags(value):
+    # 'cat,dog' -> ['cat', 'dog']; stored tags never contain commas (see extract_tags)
+    if value in (None, ''):
+        return []
+
+    tags = list(dict.fromkeys(tag.strip() for tag in value.split(',') if tag.strip()))
+    if not tags:
+        raise InvalidTagQueryError('tag must name at least one tag')
+    if len(tags) > MAX_QUERY_TAGS:
+        raise InvalidTagQueryError(f'At most {MAX_QUERY_TAGS} tags can be combined')
+    return tags
+
+
+def parse_match(value):
+    # Missing match means every tag must be present
+    if value in (None, ''):
+        return MATCH_ALL
+    if value.lower() not in (MATCH_ALL, MATCH_ANY):
+        raise InvalidTagQueryError(f'match must be {MATCH_ALL} or {MATCH_ANY}')
+    return value.lower()
+
+
+def posting_key(tag, image_id):
+    return {'Tag': {'S': tag}, 'ImageID': {'S': image_id}}
+
+
+def index_tags(dynamodb_client, tags_by_image):
+    # Write the postings of {image_id: tags} with BatchWriteItem. Called before the images are stored,
+    # so a stored image is always findable; postings of images that were never stored are skipped on read.
+    # Returns the IDs of the images whose postings could not all be written.
+    write_requests = [
+        {'PutRequest': {'Item': posting_key(tag, image_id)}}
+        for image_id, tags in tags_by_image.items() for tag in tags
+    ]
+    if not write_requests:
+        return set()
+
+    failed_requests = batch_write(dynamodb_client, tag_index_table_name, write_requests)
+    logger.debug("Indexed %d tag postings for %d images", len(write_requests) - len(failed_requests), len(tags_by_image))
+    return {request['PutRequest']['Item']['ImageID']['S'] for request in failed_requests}
+
+
+def unindex_tags(dynamodb_client, tags_by_image):
+    # Remove the postings of {image_id: tags}, after the images themselves are gone. Best-effort:
+    # a posting left behind points at a missing image and is skipped on read.
+    delete_requests = [
+        {'DeleteRequest': {'Key': posting_key(tag, image_id)}}
+        for image_id, tags in tags_by_image.items() for tag in tags
+    ]
+    if not delete_requests:
+        return 0
+
+    failed_requests = batch_write(dynamodb_client, tag_index_table_name, delete_requests)
+    if failed_requests:
+        logger.error("Could not remove %d of %d tag postings", len(failed_requests), len(delete_requests))
+    return len(failed_requests)
+
+
+def item_tags(item):
+    # Tags of an ImagesMetadata item, from its first-class Tags string set
+    return item.get('Tags', {}).get('SS', [])
+
+
+def posting_query(tag, start_after=None, page_size=None):
+    # Query arguments for the postings of a tag after start_after, in ascending ImageID order
+    query_kwargs = {
+        'TableName': tag_index_table_name,
+        'KeyConditionExpression': "#tag = :tag",
+        'ProjectionExpression': "ImageID",
+        'ExpressionAttributeNames': {'#tag': 'Tag'},
+        'ExpressionAttributeValues': {':tag': {'S': tag}},
+    }
+    if start_after:
+        query_kwargs['KeyConditionExpression'] += " AND ImageID > :start_after"
+        query_kwargs['ExpressionAttributeValues'][':start_after'] = {'S': start_after}
+    if page_size:
+        query_kwargs['Limit'] = page_size
+    return query_kwargs
+
+
+def iter_tagged_ids(dynamodb_client, tag, start_after=None, page_size=None):
+    # Stream the IDs of the images carrying a tag in ascending order, reading one page at a time
+    for item in iter_items(dynamodb_client.query, **posting_query(tag, start_after, page_size)):
+        yield item['ImageID']['S']
+
+
+def intersect_sorted(streams):
+    # IDs present in every ascending stream. Each stream only advances up to the largest current ID,
+    # so the merge stops as soon as the shortest posting list runs out.
+    iterators = [iter(stream) for stream in streams]
+    try:
+        current = [next(iterator) for iterator in iterators]
+        while True:
+            highest = max(current)
+            if all(value == highest for value in current):
+                yield highest
+                current = [next(iterator) for iterator in iterators]
+                continue
+            for index, iterator in enumerate(iterators):
+                while current[index] < highest:
+                    current[index] = next(iterator)
+    except StopIteration:
+        return
+
+
+def union_sorted(streams):
+    # IDs present in any ascending stream, once each and in ascending order
+    previous = None
+    for value in heapq.merge(*streams):
+        if value != previous:
+            yield value
+            previous = value
+
+
+def iter_matching_ids(dynamodb_client, tags, match=MATCH_ALL, start_after=None, page_size=None):
+    # Stream the IDs of the images carrying all (or any) of the tags, in ascending order
+    streams = [iter_tagged_ids(dynamodb_client, tag, start_after, page_size) for tag in tags]
+    if len(streams) == 1:
+        return streams[0]
+    return intersect_sorted(streams) if match == MATCH_ALL else union_sorted(streams)
+
+
+def find_page(dynamodb_client, tags, match=MATCH_ALL, limit=100, start_after=None):
+    # One page of matching IDs after start_after, and whether more follow. A single tag is one Query:
+    # limit + 1 postings are far below the 1 MB page size. An OR needs at most limit + 1 postings
+    # per tag; an AND reads larger pages since it may skip many.
+    if len(tags) == 1:
+        response = dynamodb_client.query(**posting_query(tags[0], start_after, limit + 1))
+        image_ids = [item['ImageID']['S'] for item in response.get('Items', [])]
+    else:
+        page_size = limit + 1 if match == MATCH_ANY else max(limit + 1, intersect_page_size)
+        image_ids = list(islice(iter_matching_ids(dynamodb_client, tags, match, start_after, page_size), limit + 1))
+    logger.debug("Tag index returned %d IDs for %s (%s)", len(image_ids), tags, match)
+    return image_ids[:limit], len(image_ids) > limit
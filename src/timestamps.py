@@ -0,0 +1,43 @@
+import logging
+from datetime import datetime, timezone
+
+# CreatedAt is an ISO 8601 UTC string with a fixed width, so string order is time order and the
+# UserCreatedAtIndex range key can answer newest-first queries and since/until ranges
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+class InvalidTimestampError(ValueError):
+    # Raised for a malformed since/until parameter so handlers can answer with a 400
+    pass
+
+
+def format_timestamp(moment):
+    # Millisecond precision, e.g. 2024-05-01T12:30:00.123Z
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)[:-4] + 'Z'
+
+
+def now_timestamp():
+    return format_timestamp(datetime.now(timezone.utc))
+
+
+def parse_timestamp(value):
+    # Accept an ISO 8601 date or date-time (UTC when no offset is given) or epoch seconds,
+    # and normalize it to the stored CreatedAt format
+    if value in (None, ''):
+        return None
+
+    value = value.strip()
+    try:
+        if value.replace('.', '', 1).isdigit():
+            moment = datetime.fromtimestamp(float(value), timezone.utc)
+        else:
+            moment = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except (ValueError, OverflowError, OSError):
+        raise InvalidTimestampError(f'Invalid timestamp: {value}')
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_timestamp(moment)
@@ -0,0 +1,160 @@
+import os
+import base64
+import logging
+from io import BytesIO
+
+# Pillow is optional: without it uploads are stored as-is. Like renditions, it is imported on first use.
+from src.renditions import pillow_available
+
+# Target of the optional transcoding stage ('webp' or 'avif'); empty disables it
+transcode_format = os.environ.get('TRANSCODE_FORMAT', '').lower()
+transcode_quality = int(os.environ.get('TRANSCODE_QUALITY', '80'))
+
+# Content type and file extension of every format that can be detected or produced
+FORMATS = {
+    'jpeg': ('image/jpeg', 'jpg'),
+    'png': ('image/png', 'png'),
+    'gif': ('image/gif', 'gif'),
+    'webp': ('image/webp', 'webp'),
+    'avif': ('image/avif', 'avif'),
+    'heic': ('image/heic', 'heic'),
+    'bmp': ('image/bmp', 'bmp'),
+    'tiff': ('image/tiff', 'tiff'),
+}
+UNKNOWN_FORMAT = {'format': None, 'content_type': 'application/octet-stream', 'extension': 'bin'}
+
+# Number of leading bytes sniff_format needs to recognize every format above
+SNIFF_BYTES = 12
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def describe_format(name):
+    content_type, extension = FORMATS[name]
+    return {'format': name, 'content_type': content_type, 'extension': extension}
+
+
+def sniff_format(data):
+    # Detect the real image format from its magic bytes instead of trusting the client
+    header = data[:SNIFF_BYTES]
+    if header.startswith(b'\xff\xd8\xff'):
+        return describe_format('jpeg')
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return describe_format('png')
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return describe_format('gif')
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return describe_format('webp')
+    if header[4:8] == b'ftyp':
+        brand = header[8:12]
+        if brand in (b'avif', b'avis'):
+            return describe_format('avif')
+        if brand in (b'heic', b'heix', b'mif1', b'msf1'):
+            return describe_format('heic')
+    if header[:2] == b'BM':
+        return describe_format('bmp')
+    if header[:4] in (b'II*\x00', b'MM\x00*'):
+        return describe_format('tiff')
+    return dict(UNKNOWN_FORMAT)
+
+
+def sniff_base64_format(image_data):
+    # Sniff the format of a base64 image by decoding only its first few bytes
+    try:
+        return sniff_format(base64.b64decode(image_data[:16]))
+    except Exception:
+        return dict(UNKNOWN_FORMAT)
+
+
+def transcoding_enabled():
+    # Transcoding needs Pillow with an encoder for the configured target format
+    if not pillow_available or transcode_format not in ('webp', 'avif'):
+        return False
+    from PIL import features
+    return features.check(transcode_format)
+
+
+def transcode(image_bytes, source_format):
+    # Re-encode to the configured format and quality; returns (bytes, format description) or None when
+    # disabled, already in the target format, undecodable, or not actually smaller than the original
+    if not transcoding_enabled() or source_format.get('format') in (None, transcode_format):
+        return None
+
+    from PIL import Image
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            # Animated images would lose their frames, so they are kept as uploaded
+            if getattr(image, 'is_animated', False):
+                return None
+            if image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+            output = BytesIO()
+            image.save(output, transcode_format.upper(), quality=transcode_quality)
+    except Exception as transcode_error:
+        logger.warning("Error transcoding %s image to %s: %s", source_format['format'], transcode_format, str(transcode_error))
+        return None
+
+    data = output.getvalue()
+    if len(data) >= len(image_bytes):
+        logger.debug("Transcoded %s is not smaller than the original, keeping only the original", transcode_format)
+        return None
+
+    logger.debug("Transcoded %s (%d bytes) to %s (%d bytes)", source_format['format'], len(image_bytes), transcode_format, len(data))
+    return data, describe_format(transcode_format)
+
+
+def store_variant(s3_client, bucket, image_id, image_bytes, source_format):
+    # Transcode and store the variant next to the original; returns {content_type: {S3Key, Bytes}} or {}
+    transcoded = transcode(image_bytes, source_format)
+    if not transcoded:
+        return {}
+
+    data, variant_format = transcoded
+    s3_key = f"images/{image_id}/variant.{variant_format['extension']}"
+    try:
+        s3_client.put_object(Bucket=bucket, Key=s3_key, Body=data, ContentType=variant_format['content_type'])
+    except Exception as s3_error:
+        logger.warning("Error storing %s variant for image ID %s: %s", variant_format['format'], image_id, str(s3_error))
+        return {}
+
+    logger.debug("Stored %s variant at key: %s", variant_format['format'], s3_key)
+    return {variant_format['content_type']: {'S3Key': s3_key, 'Bytes': len(data)}}
+
+
+def delete_variants(s3_client, bucket, variants):
+    # Best-effort removal of the objects store_variant wrote, used by compensation paths
+    for content_type, variant in variants.items():
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=variant['S3Key'])
+        except Exception as delete_error:
+            logger.error("Error deleting %s variant %s: %s", content_type, variant['S3Key'], str(delete_error))
+
+
+def accepted_types(headers):
+    # Image content types the client explicitly lists in its Accept header, e.g. ('image/avif', 'image/webp')
+    accept = ''
+    for name, value in (headers or {}).items():
+        if name.lower() == 'accept' and value:
+            accept = value
+            break
+
+    types = set()
+    for media_range in accept.split(','):
+        media_type, _, params = media_range.strip().partition(';')
+        media_type = media_type.strip().lower()
+        # Ranges explicitly refused with q=0 do not count
+        if params.replace(' ', '').lower() in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if media_type.startswith('image/') and media_type != 'image/*':
+            types.add(media_type)
+    return tuple(sorted(types))
+
+
+def choose_variant(original, variants, accepted):
+    # Pick the smallest stored variant the client accepts; the original is always acceptable
+    best = original
+    for variant in variants:
+        if variant['ContentType'] in accepted and variant['Bytes'] < best['Bytes']:
+            best = variant
+    return best
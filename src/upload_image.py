@@ -1,27 +1,140 @@
 import json
-import boto3
+import contextvars
 from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor, wait
 from botocore.exceptions import NoCredentialsError
 import base64  # Import base64 module for decoding
 import logging
+from src.metadata import (
+    build_image_item, extract_user_id, extract_tags, concurrent_upload_writes, pending_item, commit_request
+)
+from src.timestamps import now_timestamp
+from src.tag_index import index_tags, unindex_tags, TagIndexError
+from src.idempotency import (
+    idempotency_key, request_fingerprint, matches_request, claim_key, complete_key, release_key, replay_response,
+    InvalidIdempotencyKeyError
+)
+from src.versions import bump_versions
+from src.blob_store import deduplicate_uploads, acquire_blob, release_blob
+from src.renditions import renditions_on_upload, generate_renditions, delete_renditions
+from src.transcode import sniff_base64_format, store_variant, delete_variants
+from src.multipart_upload import decoded_size, multipart_threshold, default_part_size, upload_base64_multipart, InvalidImageDataError
+from src.metrics import instrumented, stage, record
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
 
 # Initialize S3 and DynamoDB clients
-s3_client = boto3.client('s3')
-dynamodb_client = boto3.client('dynamodb')
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
 s3_bucket_name = "mc-image-insta-uploaders"
 dynamo_table_name = "ImagesMetadata"
 
+# Writes the tag postings and the pending item of a concurrent upload next to the S3 upload.
+# Threads are started on first use and reused by later invocations of a warm container.
+metadata_writer = ThreadPoolExecutor(max_workers=2)
+
 # Set up logger for debugging and exception tracking
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+logger.setLevel(log_level)
+
+def start_pending_writes(tags_by_image, pending):
+    # Concurrent mode: write the tag postings and the pending item while the caller uploads the object.
+    # Each write runs in a copy of the invocation's context so its DynamoDB calls are still measured.
+    return [
+        metadata_writer.submit(contextvars.copy_context().run, index_tags, dynamodb_client, tags_by_image),
+        metadata_writer.submit(
+            contextvars.copy_context().run, dynamodb_client.put_item, TableName=dynamo_table_name, Item=pending
+        ),
+    ]
+
+def wait_pending_writes(pending_writes):
+    # Wait for both writes, then raise if either failed
+    wait(pending_writes)
+    postings, item = pending_writes
+    if postings.result():
+        raise TagIndexError('Tag postings could not be written')
+    item.result()
 
+def discard_pending_writes(pending_writes, image_id, tags_by_image):
+    # Compensate the metadata side of a concurrent upload that is abandoned: once the writes have
+    # finished, the pending item and the postings are removed. Leftovers are removed by sweep_pending_uploads.
+    if not pending_writes:
+        return
+    wait(pending_writes)
+    try:
+        dynamodb_client.delete_item(TableName=dynamo_table_name, Key={'ImageID': {'S': image_id}})
+        logger.debug("Pending item deleted for image ID: %s", image_id)
+    except Exception as delete_error:
+        logger.error("Error deleting pending item for image ID %s: %s", image_id, str(delete_error))
+    unindex_tags(dynamodb_client, tags_by_image)
+
+@instrumented
 def upload_image(event, context):
+    # A request with an Idempotency-Key header runs once per key: a retry of a completed upload gets
+    # the stored response without the image being decoded or stored again
+    try:
+        key = idempotency_key(event.get('headers'))
+    except InvalidIdempotencyKeyError as key_error:
+        logger.error("Invalid Idempotency-Key header: %s", str(key_error))
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': str(key_error)})
+        }
+    if key is None:
+        return store_upload(event, context)
+
+    try:
+        with stage('idempotency_claim'):
+            fingerprint = request_fingerprint(event.get('body'))
+            existing = claim_key(dynamodb_client, key, fingerprint)
+    except Exception as dynamo_error:
+        logger.error("Error claiming idempotency key %s: %s", key, str(dynamo_error))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Error claiming idempotency key: {str(dynamo_error)}'})
+        }
+
+    if existing is not None and not matches_request(existing, fingerprint):
+        logger.warning("Idempotency key %s was reused for a different request", key)
+        return {
+            'statusCode': 422,
+            'body': json.dumps({'error': 'This Idempotency-Key was already used for a different request'})
+        }
+
+    if existing is not None:
+        replayed = replay_response(existing)
+        if replayed:
+            logger.debug("Replaying upload response for idempotency key: %s", key)
+            record('idempotent_replays', 1)
+            return replayed
+        logger.warning("Upload with idempotency key %s is still in progress", key)
+        return {
+            'statusCode': 409,
+            'body': json.dumps({'error': 'A request with this Idempotency-Key is still in progress'})
+        }
+
+    response = store_upload(event, context)
+
+    # Only successful uploads are replayed; after a failure the key is released so a retry runs again
+    with stage('idempotency_complete'):
+        if response['statusCode'] == 200:
+            try:
+                complete_key(dynamodb_client, key, fingerprint, response)
+            except Exception as dynamo_error:
+                logger.error("Error recording result of idempotency key %s: %s", key, str(dynamo_error))
+        else:
+            release_key(dynamodb_client, key)
+    return response
+
+def store_upload(event, context):
     try:
         # Log the received event for debugging purposes
-        logger.debug("Event received: %s", json.dumps(event))
+        log_event(logger, event)
 
         # Parse the body of the request
-        body = json.loads(event['body'])
+        record('request_bytes', len(event['body'] or ''))
+        with stage('parse'):
+            body = json.loads(event['body'])
         image_data = body.get('image')  # Image data (base64 or direct URL) in the request body
         metadata = body.get('metadata')  # Metadata to be saved in DynamoDB
 
@@ -41,58 +154,142 @@ def upload_image(event, context):
 
         logger.debug("Decoded image data and metadata received")
 
-        # Decode the base64 image data
-        try:
-            image_bytes = base64.b64decode(image_data)  # Decode base64 to bytes
-            logger.debug("Image data decoded successfully")
-        except Exception as decode_error:
-            logger.error("Error decoding base64 image data: %s", str(decode_error))
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'Invalid base64 image data'})
-            }
-
         # Generate a unique identifier for the image
         image_id = str(uuid4())
         logger.debug("Generated unique image ID: %s", image_id)
+        # Detect the real image format from the magic bytes at the start of the decoded data
+        image_format = sniff_base64_format(image_data)
+        content_type = image_format['content_type']
+        s3_key = f"images/{image_id}.{image_format['extension']}"
+        logger.debug("Detected content type %s for image ID: %s", content_type, image_id)
+        digest = None
+        renditions = {}
+        variants = {}
+        size_bytes = decoded_size(image_data)
+        record('image_bytes', size_bytes)
+        tags_by_image = {image_id: extract_tags(metadata)}
 
-        # Upload the image to S3
-        s3_key = f"images/{image_id}.jpg"
-        try:
-            s3_client.put_object(Bucket=s3_bucket_name, Key=s3_key, Body=image_bytes, ContentType="image/jpeg")
-            logger.debug("Image uploaded to S3 with key: %s", s3_key)
-        except Exception as s3_error:
-            logger.error("Error uploading image to S3: %s", str(s3_error))
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'error': f'Error uploading image to S3: {str(s3_error)}'})
-            }
+        # Concurrent mode overlaps the metadata writes with the S3 upload, so the request waits for the
+        # slower of the two instead of their sum. The item is written as pending and committed below.
+        pending = None
+        pending_writes = None
+        if concurrent_upload_writes:
+            pending = pending_item(build_image_item(
+                image_id, s3_key, metadata, content_type=content_type, size_bytes=size_bytes, created_at=now_timestamp()
+            ))
+            pending_writes = start_pending_writes(tags_by_image, pending)
 
-        # Store metadata in DynamoDB
-        try:
-            dynamodb_client.put_item(
-                TableName=dynamo_table_name,
-                Item={
-                    'ImageID': {'S': image_id},
-                    'Metadata': {'S': json.dumps(metadata)},
-                    'S3Key': {'S': s3_key},
+        if size_bytes >= multipart_threshold and size_bytes > default_part_size:
+            # Large images are decoded chunk by chunk and streamed to S3 as a concurrent
+            # multipart upload, so the decoded bytes are never held in memory all at once.
+            # An image that fits in one part gains nothing from it and takes the normal path below.
+            try:
+                with stage('s3_put'):
+                    part_count = upload_base64_multipart(s3_client, s3_bucket_name, s3_key, image_data, content_type)
+                logger.debug("Image uploaded to S3 in %d parts with key: %s", part_count, s3_key)
+            except InvalidImageDataError as decode_error:
+                logger.error("Error decoding base64 image data: %s", str(decode_error))
+                discard_pending_writes(pending_writes, image_id, tags_by_image)
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': 'Invalid base64 image data'})
                 }
+            except Exception as s3_error:
+                logger.error("Error uploading image to S3: %s", str(s3_error))
+                discard_pending_writes(pending_writes, image_id, tags_by_image)
+                return {
+                    'statusCode': 500,
+                    'body': json.dumps({'error': f'Error uploading image to S3: {str(s3_error)}'})
+                }
+        else:
+            # Decode the base64 image data
+            try:
+                with stage('decode'):
+                    image_bytes = base64.b64decode(image_data)  # Decode base64 to bytes
+                size_bytes = len(image_bytes)
+                logger.debug("Image data decoded successfully")
+            except Exception as decode_error:
+                logger.error("Error decoding base64 image data: %s", str(decode_error))
+                discard_pending_writes(pending_writes, image_id, tags_by_image)
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': 'Invalid base64 image data'})
+                }
+
+            # Upload the image to S3; with deduplication identical bytes share one content-addressed object.
+            # Concurrent uploads store their own object: the pending item is written before the digest is
+            # known, so a sweep of an interrupted upload could not tell whether a blob reference was taken.
+            try:
+                with stage('s3_put'):
+                    if deduplicate_uploads and not pending_writes:
+                        digest, s3_key = acquire_blob(s3_client, dynamodb_client, s3_bucket_name, image_bytes, content_type)
+                    else:
+                        s3_client.put_object(Bucket=s3_bucket_name, Key=s3_key, Body=image_bytes, ContentType=content_type)
+                logger.debug("Image uploaded to S3 with key: %s", s3_key)
+            except Exception as s3_error:
+                logger.error("Error uploading image to S3: %s", str(s3_error))
+                discard_pending_writes(pending_writes, image_id, tags_by_image)
+                return {
+                    'statusCode': 500,
+                    'body': json.dumps({'error': f'Error uploading image to S3: {str(s3_error)}'})
+                }
+
+            # Generate the resized renditions now instead of on the first request for each size
+            if renditions_on_upload:
+                with stage('renditions'):
+                    renditions = generate_renditions(s3_client, s3_bucket_name, image_id, image_bytes)
+
+            # Store a smaller re-encoded variant that view_image can serve to clients accepting it
+            with stage('variant'):
+                variants = store_variant(s3_client, s3_bucket_name, image_id, image_bytes, image_format)
+
+        # Store metadata in DynamoDB, after the tag postings so the stored image is always findable by tag
+        try:
+            item = build_image_item(
+                image_id, s3_key, metadata, renditions, digest, content_type=content_type, size_bytes=size_bytes,
+                variants=variants, created_at=pending['CreatedAt']['S'] if pending else None
             )
+            if pending_writes:
+                # The object has landed: publish the pending item with what is only known now
+                with stage('dynamodb_wait'):
+                    wait_pending_writes(pending_writes)
+                with stage('dynamodb_commit'):
+                    dynamodb_client.update_item(**commit_request(dynamo_table_name, pending, item))
+            else:
+                with stage('tag_index'):
+                    failed_ids = index_tags(dynamodb_client, tags_by_image)
+                if failed_ids:
+                    raise TagIndexError('Tag postings could not be written')
+                with stage('dynamodb_put'):
+                    dynamodb_client.put_item(TableName=dynamo_table_name, Item=item)
             logger.debug("Metadata stored in DynamoDB for image ID: %s", image_id)
         except Exception as dynamo_error:
             logger.error("Error storing metadata in DynamoDB: %s", str(dynamo_error))
-            # Clean up S3 upload if DynamoDB insertion fails
+            # Clean up S3 upload if DynamoDB insertion fails; a shared blob only loses this reference
             try:
-                s3_client.delete_object(Bucket=s3_bucket_name, Key=s3_key)
+                if digest:
+                    release_blob(s3_client, dynamodb_client, s3_bucket_name, digest)
+                else:
+                    s3_client.delete_object(Bucket=s3_bucket_name, Key=s3_key)
                 logger.debug("Image deleted from S3 due to DynamoDB failure: %s", s3_key)
             except Exception as delete_error:
                 logger.error("Error deleting image from S3 after DynamoDB failure: %s", str(delete_error))
+            delete_renditions(s3_client, s3_bucket_name, renditions)
+            delete_variants(s3_client, s3_bucket_name, variants)
+            if pending_writes:
+                discard_pending_writes(pending_writes, image_id, tags_by_image)
+            else:
+                unindex_tags(dynamodb_client, tags_by_image)
 
             return {
                 'statusCode': 500,
                 'body': json.dumps({'error': f'Error storing metadata in DynamoDB: {str(dynamo_error)}'})
             }
 
+        # Invalidate the ETags of the listings that now include the image
+        with stage('bump_versions'):
+            bump_versions(dynamodb_client, [extract_user_id(metadata)])
+
         # Return success message
         return {
             'statusCode': 200,
@@ -0,0 +1,131 @@
+import os
+import random
+import contextvars
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from src.batching import batch_get
+from src.cache import TTLCache
+
+# Change counters for listings: one for the whole table and one per user, bumped after every
+# upload and delete so list_images can answer If-None-Match without re-reading the listing
+version_table_name = "ImageVersions"
+GLOBAL_SCOPE = "all"
+
+# The table-wide counter is split over this many items so that every upload and delete in the service
+# does not write the same key; each change bumps one shard and the version is the sum of all shards
+global_version_shards = int(os.environ.get('GLOBAL_VERSION_SHARDS', '10'))
+
+# Versions used to issue the ETag of a listing requested without If-None-Match, per container. An older
+# version there is harmless: the ETag then fails to match on the next request, it never causes a wrong 304.
+version_cache = TTLCache(maxsize=1024, ttl=int(os.environ.get('VERSION_CACHE_SECONDS', '5')))
+
+# The counters of one change are bumped concurrently; threads are reused by warm invocations
+version_writer = ThreadPoolExecutor(max_workers=4)
+
+# How long clients may reuse a listing before revalidating; 0 makes them revalidate every time
+list_cache_max_age = int(os.environ.get('LIST_CACHE_MAX_AGE', '0'))
+
+# Set up logger for debugging and exception tracking
+logger = logging.getLogger()
+
+
+def user_scope(user_id):
+    return f"user#{user_id}"
+
+
+def listing_scope(user_id=None):
+    # A listing filtered by user only changes when that user's images do; anything else
+    # (including tag-only filters) follows the table-wide counter
+    return user_scope(user_id) if user_id else GLOBAL_SCOPE
+
+
+def global_shard_scopes():
+    return [f"{GLOBAL_SCOPE}#{shard}" for shard in range(global_version_shards)]
+
+
+def read_version(dynamodb_client, scope, consistent=True):
+    # Current counter of a scope; scopes that never changed are at version 0. Strongly consistent by
+    # default, so a client revalidating a listing never gets a 304 for a change it just made. Shards
+    # are not retried: without a version the listing is only served without an ETag.
+    if scope == GLOBAL_SCOPE:
+        items, failed_keys = batch_get(
+            dynamodb_client, version_table_name, [{'Scope': {'S': shard}} for shard in global_shard_scopes()],
+            max_retries=0, consistent_read=consistent
+        )
+        if failed_keys:
+            raise RuntimeError(f'{len(failed_keys)} listing version shards could not be read')
+        version = sum(int(item.get('Version', {}).get('N', '0')) for item in items)
+    else:
+        response = dynamodb_client.get_item(
+            TableName=version_table_name,
+            Key={'Scope': {'S': scope}},
+            ConsistentRead=consistent
+        )
+        version = int(response.get('Item', {}).get('Version', {}).get('N', '0'))
+    version_cache.set(scope, version)
+    return version
+
+
+def issued_version(dynamodb_client, scope):
+    # Version for the ETag of a request that has nothing to revalidate: recently read ones are reused,
+    # so plain listings do not read the counters on every request
+    version = version_cache.get(scope)
+    if version is None:
+        version = read_version(dynamodb_client, scope, consistent=False)
+    return version
+
+
+def bump_version(dynamodb_client, scope):
+    try:
+        dynamodb_client.update_item(
+            TableName=version_table_name,
+            Key={'Scope': {'S': scope}},
+            UpdateExpression="ADD Version :one",
+            ExpressionAttributeValues={':one': {'N': '1'}}
+        )
+    except Exception as dynamo_error:
+        logger.error("Error bumping listing version for %s: %s", scope, str(dynamo_error))
+
+
+def bump_versions(dynamodb_client, user_ids=()):
+    # Advance one shard of the table-wide counter and the counter of every affected user, concurrently.
+    # Called after the images were written or deleted, so a listing read under the old version never
+    # misses them. Best-effort: a failed bump is logged and only delays 200s until the next change.
+    scopes = [random.choice(global_shard_scopes())] + [user_scope(user_id) for user_id in sorted({u for u in user_ids if u})]
+    # Each bump runs in a copy of the invocation's context so its DynamoDB call is still measured
+    wait([version_writer.submit(contextvars.copy_context().run, bump_version, dynamodb_client, scope) for scope in scopes])
+    return scopes
+
+
+def make_etag(*parts):
+    # Strong ETag over everything that shapes a response
+    digest = hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def if_none_match(request_headers):
+    # If-None-Match header value, or None; header names are case-insensitive
+    return next((v for k, v in (request_headers or {}).items() if k.lower() == 'if-none-match'), None) or None
+
+
+def etag_matches(request_headers, etag):
+    # If-None-Match holds '*' or a list of (possibly weak) ETags
+    value = if_none_match(request_headers)
+    if not value:
+        return False
+    candidates = [candidate.strip() for candidate in value.split(',')]
+    return '*' in candidates or etag in [c[2:] if c.startswith('W/') else c for c in candidates]
+
+
+def cache_control(max_age):
+    return f"private, max-age={max(0, int(max_age))}, must-revalidate"
+
+
+def not_modified(etag, max_age):
+    # 304 responses carry no body, only the validators
+    return {
+        'statusCode': 304,
+        'headers': {'ETag': etag, 'Cache-Control': cache_control(max_age)},
+        'body': ''
+    }
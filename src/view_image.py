@@ -1,21 +1,67 @@
 import json
-import boto3
+import time
 import logging
+from src.cache import image_cache, presigned_url_expiry_seconds
+from src.metadata import parse_original, parse_variants, parse_metadata, attribute_value, is_pending, UPLOAD_STATUS
+from src.projection import parse_fields, top_level_fields, build_projection, InvalidFieldsError
+from src.transcode import accepted_types, choose_variant
+from src.renditions import (
+    rendition_sizes, renditions_available, parse_renditions, generate_rendition, store_rendition
+)
+from src.versions import make_etag, etag_matches, cache_control, not_modified
+from src.metrics import instrumented, stage, record
+from src.aws_clients import LazyClient
+from src.log_config import log_level, log_event
 
 # Initialize S3 and DynamoDB clients
-s3_client = boto3.client('s3')
-dynamodb_client = boto3.client('dynamodb')
+s3_client = LazyClient('s3')
+dynamodb_client = LazyClient('dynamodb')
 s3_bucket_name = "mc-image-insta-uploaders"
 dynamo_table_name = "ImagesMetadata"
 
+# Attributes needed to pick and sign the object; metadata is only read when asked for with ?fields=
+view_attributes = ('S3Key', 'ContentType', 'Bytes', 'Variants', 'Renditions', 'Version')
+
 # Set up logger for debugging and exception tracking
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+logger.setLevel(log_level)
+
+def resolve_rendition(item, image_id, size):
+    # Return the S3 key and description of the requested size, generating it on first request
+    renditions = parse_renditions(item)
+    if size in renditions:
+        return renditions[size]
+
+    if not renditions_available():
+        logger.debug("Pillow is not installed, serving the original for image_id: %s", image_id)
+        return None
 
+    try:
+        original = s3_client.get_object(Bucket=s3_bucket_name, Key=item['S3Key']['S'])['Body'].read()
+        rendition = generate_rendition(s3_client, s3_bucket_name, image_id, original, size)
+    except Exception as render_error:
+        logger.warning("Error generating %spx rendition for image_id %s: %s", size, image_id, str(render_error))
+        return None
+
+    # Recording the rendition is best-effort; the object already exists and can be served
+    try:
+        store_rendition(dynamodb_client, dynamo_table_name, image_id, size, rendition)
+    except Exception as dynamo_error:
+        logger.error("Error recording rendition for image_id %s: %s", image_id, str(dynamo_error))
+    return rendition
+
+def signing_window(now):
+    # Presigned URLs are reissued in fixed windows of the cache TTL. A URL signed during a window stays
+    # valid for the refresh margin past its end, so an ETag naming the window can be revalidated by any
+    # container without handing back an expired URL. Returns the window and the time it ends.
+    window = int(now // image_cache.ttl)
+    return window, (window + 1) * image_cache.ttl
+
+@instrumented
 def view_image(event, context):
     try:
         # Log the incoming event for debugging purposes
-        logger.debug("Event received: %s", json.dumps(event))
+        log_event(logger, event)
 
         # Extract the image_id from path parameters
         image_id = event['pathParameters'].get('image_id')
@@ -27,39 +73,134 @@ def view_image(event, context):
                 'body': json.dumps({'error': 'Image ID is required'})
             }
 
+        # Optional rendition size; without it the original upload is served
+        query_params = event.get('queryStringParameters') or {}
+        size = query_params.get('size')
+        if size is not None:
+            if not size.isdigit() or int(size) not in rendition_sizes:
+                logger.error("Unsupported size requested: %s", size)
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': f'size must be one of {rendition_sizes}'})
+                }
+            size = int(size)
+
+        # Optional item attributes to return next to the URL, e.g. fields=Metadata
+        try:
+            fields = parse_fields(query_params.get('fields'))
+        except InvalidFieldsError as fields_error:
+            logger.error("Invalid fields parameter: %s", str(fields_error))
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(fields_error)})
+            }
+
+        # Image formats the client can decode, used to pick the smallest stored variant
+        accepted = accepted_types(event.get('headers'))
+
+        # Reuse the S3 key and presigned URL resolved by an earlier request in this container
+        cache_key = (image_id, size, accepted, tuple(fields or ()))
+        with stage('cache_lookup'):
+            cached = image_cache.get(cache_key)
+        record('cache_hits' if cached else 'cache_misses', 1)
+        if cached:
+            logger.debug("Cache hit for image_id: %s (stats: %s)", image_id, image_cache.stats())
+
+            # Clients may reuse the response until the cached presigned URL is refreshed
+            max_age = cached['expires_at'] - time.time()
+            if etag_matches(event.get('headers'), cached['etag']):
+                return not_modified(cached['etag'], max_age)
+            return {
+                'statusCode': 200,
+                'headers': {'X-Cache': 'HIT', 'Vary': 'Accept', 'ETag': cached['etag'], 'Cache-Control': cache_control(max_age)},
+                'body': cached['body']
+            }
+
         logger.debug("Fetching metadata for image_id: %s", image_id)
 
-        # Fetch the metadata for the image from DynamoDB
-        response = dynamodb_client.get_item(
-            TableName=dynamo_table_name,
-            Key={'ImageID': {'S': image_id}}
-        )
+        # Fetch only the attributes needed to serve the image, plus any requested fields
+        with stage('dynamodb_get'):
+            response = dynamodb_client.get_item(
+                TableName=dynamo_table_name,
+                Key={'ImageID': {'S': image_id}},
+                **build_projection((fields or []) + [UPLOAD_STATUS], required=view_attributes)
+            )
 
-        # Check if the image metadata exists
-        if 'Item' not in response:
+        # Check if the image metadata exists; a pending upload has no object to serve yet
+        if 'Item' not in response or is_pending(response['Item']):
             logger.warning("Image not found for image_id: %s", image_id)
             return {
                 'statusCode': 404,
                 'body': json.dumps({'error': 'Image not found'})
             }
 
-        # Retrieve the S3 key for the image
+        # Retrieve the S3 key for the image, or for the requested rendition
         s3_key = response['Item']['S3Key']['S']
+        body = {}
+        if size is not None:
+            with stage('rendition'):
+                rendition = resolve_rendition(response['Item'], image_id, size)
+            if rendition:
+                s3_key = rendition['S3Key']
+                body.update({'size': size, 'width': rendition['Width'], 'height': rendition['Height'], 'bytes': rendition['Bytes']})
+            else:
+                body['size'] = 'original'
+        else:
+            # Serve the smallest variant whose format the client's Accept header lists
+            variant = choose_variant(parse_original(response['Item']), parse_variants(response['Item']), accepted)
+            s3_key = variant['S3Key']
+            body['content_type'] = variant['ContentType']
         logger.debug("S3 key for image: %s", s3_key)
 
+        # Requested item attributes are returned under their own names
+        for name in top_level_fields(fields or []):
+            if name == 'ImageID':
+                body[name] = image_id
+            elif name in response['Item']:
+                item_attribute = response['Item'][name]
+                body[name] = parse_metadata(item_attribute) if name == 'Metadata' else attribute_value(item_attribute)
+
+        # The ETag is built from what selects the served object, not from the response body, whose
+        # presigned URL differs on every signing. It changes with the item Version and the window.
+        window, window_ends_at = signing_window(time.time())
+        version = response['Item'].get('Version', {}).get('N', '0')
+        etag = make_etag(image_id, version, s3_key, size, ','.join(fields or []), window)
+        max_age = window_ends_at - time.time()
+        if etag_matches(event.get('headers'), etag):
+            return not_modified(etag, max_age)
+
         # Generate a presigned URL for downloading the image from S3
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': s3_bucket_name, 'Key': s3_key},
-            ExpiresIn=3600  # URL valid for 1 hour
-        )
+        with stage('presign'):
+            presigned_url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': s3_bucket_name, 'Key': s3_key},
+                ExpiresIn=presigned_url_expiry_seconds  # URL valid for 1 hour
+            )
 
         logger.debug("Generated presigned URL: %s", presigned_url)
+        body['url'] = presigned_url
+        serialized_body = json.dumps(body)
+
+        # Cache the resolved key, URL and serialized response until the signing window ends, so a cached
+        # URL always belongs to the window its ETag names. A fallback to the original is not cached,
+        # and not reused by clients, so the rendition is retried on the next request.
+        if body.get('size') == 'original':
+            max_age = 0
+        else:
+            image_cache.set(cache_key, {
+                's3_key': s3_key,
+                'response': body,
+                'body': serialized_body,
+                'etag': etag,
+                'expires_at': window_ends_at
+            }, ttl=max_age)
+        logger.debug("Cache miss for image_id: %s (stats: %s)", image_id, image_cache.stats())
 
         # Return the presigned URL in the response
         return {
             'statusCode': 200,
-            'body': json.dumps({'url': presigned_url})
+            'headers': {'X-Cache': 'MISS', 'Vary': 'Accept', 'ETag': etag, 'Cache-Control': cache_control(max_age)},
+            'body': serialized_body
         }
 
     except Exception as e:
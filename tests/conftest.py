@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.aws_clients import reset_clients
+from src.versions import version_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_aws_clients():
+    # Shared clients are cached across calls; start every test without any so patches of boto3.client apply.
+    # Listing versions are cached too, and would otherwise leak between tests.
+    reset_clients()
+    version_cache.clear()
+    yield
+    reset_clients()
+    version_cache.clear()
@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.aws_clients import get_client, set_client, reset_clients, LazyClient, client_config
+
+class TestAwsClients(unittest.TestCase):
+
+    def setUp(self):
+        reset_clients()
+        self.addCleanup(reset_clients)
+
+    @patch('src.aws_clients.boto3.client')
+    def test_client_is_created_once_with_tuned_config(self, mock_boto3_client):
+        first = get_client('s3')
+        second = get_client('s3')
+
+        self.assertIs(first, second)
+        mock_boto3_client.assert_called_once_with('s3', config=client_config)
+        self.assertTrue(client_config.tcp_keepalive)
+        self.assertEqual(client_config.retries['mode'], 'adaptive')
+
+    @patch('src.aws_clients.boto3.client')
+    def test_lazy_client_defers_creation_until_first_use(self, mock_boto3_client):
+        dynamodb_client = LazyClient('dynamodb')
+        mock_boto3_client.assert_not_called()
+
+        dynamodb_client.get_item(TableName='ImagesMetadata', Key={})
+
+        mock_boto3_client.assert_called_once_with('dynamodb', config=client_config)
+        mock_boto3_client.return_value.get_item.assert_called_once_with(TableName='ImagesMetadata', Key={})
+
+    @patch('src.aws_clients.boto3.client')
+    def test_injected_client_is_shared(self, mock_boto3_client):
+        stand_in = MagicMock()
+        set_client('s3', stand_in)
+
+        LazyClient('s3').put_object(Bucket='bucket', Key='key', Body=b'')
+
+        stand_in.put_object.assert_called_once_with(Bucket='bucket', Key='key', Body=b'')
+        mock_boto3_client.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
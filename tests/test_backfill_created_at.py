@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.backfill_created_at import backfill_created_at
+
+class TestBackfillCreatedAt(unittest.TestCase):
+
+    @patch('src.backfill_created_at.s3_client')
+    @patch('src.backfill_created_at.dynamodb_client')
+    def test_uses_object_last_modified(self, mock_dynamo, mock_s3):
+        mock_dynamo.scan.return_value = {'Items': [
+            {'ImageID': {'S': 'old'}, 'S3Key': {'S': 'images/old.jpg'}},
+            {'ImageID': {'S': 'gone'}, 'S3Key': {'S': 'images/gone.jpg'}},
+        ]}
+
+        def head_object(Bucket, Key):
+            if Key == 'images/gone.jpg':
+                raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+            return {'LastModified': datetime(2023, 1, 2, 3, 4, 5, tzinfo=timezone.utc)}
+        mock_s3.head_object.side_effect = head_object
+
+        result = backfill_created_at(total_segments=1)
+
+        self.assertEqual(result, {'updated': 1, 'skipped': 1, 'failed': 0})
+        update = mock_dynamo.update_item.call_args.kwargs
+        self.assertEqual(update['Key'], {'ImageID': {'S': 'old'}})
+        self.assertEqual(update['ExpressionAttributeValues'], {':created_at': {'S': '2023-01-02T03:04:05.000Z'}})
+        self.assertEqual(update['ConditionExpression'], 'attribute_not_exists(CreatedAt)')
+
+if __name__ == '__main__':
+    unittest.main()
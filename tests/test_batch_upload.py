@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+import json
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.batch_upload import batch_upload
+
+IMAGE = 'iVBORw0KGgoAAAANSUhEUgAAAAUA'
+
+class TestBatchUpload(unittest.TestCase):
+
+    @patch('src.batch_upload.s3_client')
+    @patch('src.batch_upload.dynamodb_client')
+    def test_successful_batch(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        event = {'body': json.dumps({'images': [{'image': IMAGE, 'metadata': {'n': i}} for i in range(30)]})}
+
+        response = batch_upload(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        body = json.loads(response['body'])
+        self.assertEqual(body['uploaded'], 30)
+        self.assertEqual(mock_s3.put_object.call_count, 30)
+        self.assertEqual(mock_dynamodb.batch_write_item.call_count, 2)
+
+    @patch('src.batch_upload.deduplicate_uploads', False)
+    @patch('src.batch_upload.s3_client')
+    @patch('src.batch_upload.dynamodb_client')
+    def test_per_item_failures(self, mock_dynamodb, mock_s3):
+        # The second image is not valid base64, the third one is never processed by DynamoDB
+        def batch_write_item(RequestItems):
+            requests = RequestItems['ImagesMetadata']
+            return {'UnprocessedItems': {'ImagesMetadata': [r for r in requests if r['PutRequest']['Item']['Metadata'] == {'M': {'n': {'N': '2'}}}]}}
+        mock_dynamodb.batch_write_item.side_effect = batch_write_item
+
+        event = {'body': json.dumps({'images': [
+            {'image': IMAGE, 'metadata': {'n': 0}},
+            {'image': 'invalidbase64', 'metadata': {'n': 1}},
+            {'image': IMAGE, 'metadata': {'n': 2}},
+        ]})}
+
+        with patch('src.batching.time.sleep'):
+            response = batch_upload(event, None)
+
+        self.assertEqual(response['statusCode'], 207)
+        results = json.loads(response['body'])['results']
+        self.assertEqual([result['status'] for result in results], ['uploaded', 'failed', 'failed'])
+        self.assertIn('Invalid base64', results[1]['error'])
+        self.assertIn('Error storing metadata in DynamoDB', results[2]['error'])
+
+        # The image whose metadata could not be stored is removed from S3
+        mock_s3.delete_object.assert_called_once_with(Bucket='mc-image-insta-uploaders', Key=f"images/{results[2]['imageId']}.png")
+
+    @patch('src.batch_upload.s3_client')
+    @patch('src.batch_upload.dynamodb_client')
+    def test_rejects_empty_and_oversized_batches(self, mock_dynamodb, mock_s3):
+        response = batch_upload({'body': json.dumps({'images': []})}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+        response = batch_upload({'body': json.dumps({'images': [{'image': IMAGE, 'metadata': {}}] * 101})}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('src.batch_upload.s3_client')
+    @patch('src.batch_upload.dynamodb_client')
+    def test_identical_images_share_one_blob(self, mock_dynamodb, mock_s3):
+        references = {}
+        def update_item(**kwargs):
+            digest = kwargs['Key']['ContentHash']['S']
+            references[digest] = references.get(digest, 0) + 1
+            return {'Attributes': {'S3Key': {'S': f'blobs/{digest}/gen'}, 'RefCount': {'N': str(references[digest])}}}
+        mock_dynamodb.update_item.side_effect = update_item
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        event = {'body': json.dumps({'images': [{'image': IMAGE, 'metadata': {'n': i}} for i in range(3)]})}
+        response = batch_upload(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(list(references.values()), [3])
+        items = [r['PutRequest']['Item'] for r in mock_dynamodb.batch_write_item.call_args.kwargs['RequestItems']['ImagesMetadata']]
+        self.assertEqual(len({item['S3Key']['S'] for item in items}), 1)
+        self.assertTrue(all('ContentHash' in item for item in items))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+import json
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.batch_view import batch_view
+
+class TestBatchView(unittest.TestCase):
+
+    @patch('src.batch_view.s3_client')
+    @patch('src.batch_view.dynamodb_client')
+    def test_returns_url_per_image(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'ImagesMetadata': [
+            {'ImageID': {'S': '1'}, 'S3Key': {'S': 'images/1.jpg'}},
+            {'ImageID': {'S': '2'}, 'S3Key': {'S': 'images/2.jpg'}},
+        ]}}
+        mock_s3.generate_presigned_url.side_effect = lambda op, Params, ExpiresIn: f"https://signed/{Params['Key']}"
+
+        response = batch_view({'body': json.dumps({'image_ids': ['1', '2', '3']})}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        body = json.loads(response['body'])
+        self.assertEqual(body['urls'], {'1': 'https://signed/images/1.jpg', '2': 'https://signed/images/2.jpg'})
+        self.assertEqual(body['missing'], ['3'])
+        mock_dynamodb.batch_get_item.assert_called_once()
+
+    @patch('src.batch_view.s3_client')
+    @patch('src.batch_view.dynamodb_client')
+    def test_reports_unprocessed_keys(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_get_item.return_value = {
+            'Responses': {'ImagesMetadata': []},
+            'UnprocessedKeys': {'ImagesMetadata': {'Keys': [{'ImageID': {'S': '1'}}]}}
+        }
+
+        with patch('src.batching.time.sleep'):
+            response = batch_view({'body': json.dumps({'image_ids': ['1']})}, None)
+
+        body = json.loads(response['body'])
+        self.assertEqual(body['failed'], ['1'])
+        self.assertEqual(body['missing'], [])
+
+    @patch('src.batch_view.s3_client')
+    @patch('src.batch_view.dynamodb_client')
+    def test_rejects_too_many_ids(self, mock_dynamodb, mock_s3):
+        response = batch_view({'body': json.dumps({'image_ids': [str(i) for i in range(101)]})}, None)
+
+        self.assertEqual(response['statusCode'], 400)
+        mock_dynamodb.batch_get_item.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
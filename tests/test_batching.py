@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.batching import batch_write, batch_get, chunked
+
+def put_request(image_id):
+    return {'PutRequest': {'Item': {'ImageID': {'S': image_id}}}}
+
+@patch('src.batching.time.sleep')
+class TestBatching(unittest.TestCase):
+
+    def test_chunked(self, mock_sleep):
+        self.assertEqual([len(chunk) for chunk in chunked(list(range(60)), 25)], [25, 25, 10])
+
+    def test_batch_write_splits_into_chunks_of_25(self, mock_sleep):
+        mock_dynamo = MagicMock()
+        mock_dynamo.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        failed = batch_write(mock_dynamo, 'ImagesMetadata', [put_request(str(i)) for i in range(60)])
+
+        self.assertEqual(failed, [])
+        sizes = [len(call.kwargs['RequestItems']['ImagesMetadata']) for call in mock_dynamo.batch_write_item.call_args_list]
+        self.assertEqual(sizes, [25, 25, 10])
+
+    def test_batch_write_retries_unprocessed_items(self, mock_sleep):
+        mock_dynamo = MagicMock()
+        mock_dynamo.batch_write_item.side_effect = [
+            {'UnprocessedItems': {'ImagesMetadata': [put_request('2')]}},
+            {'UnprocessedItems': {}},
+        ]
+
+        failed = batch_write(mock_dynamo, 'ImagesMetadata', [put_request('1'), put_request('2')])
+
+        self.assertEqual(failed, [])
+        self.assertEqual(mock_dynamo.batch_write_item.call_args_list[1].kwargs['RequestItems'], {'ImagesMetadata': [put_request('2')]})
+        mock_sleep.assert_called_once()
+
+    def test_batch_write_reports_items_left_after_retries(self, mock_sleep):
+        mock_dynamo = MagicMock()
+        mock_dynamo.batch_write_item.return_value = {'UnprocessedItems': {'ImagesMetadata': [put_request('2')]}}
+
+        failed = batch_write(mock_dynamo, 'ImagesMetadata', [put_request('1'), put_request('2')], max_retries=2)
+
+        self.assertEqual(failed, [put_request('2')])
+        self.assertEqual(mock_dynamo.batch_write_item.call_count, 3)
+
+    def test_batch_get_retries_unprocessed_keys(self, mock_sleep):
+        mock_dynamo = MagicMock()
+        mock_dynamo.batch_get_item.side_effect = [
+            {'Responses': {'ImagesMetadata': [{'ImageID': {'S': '1'}}]},
+             'UnprocessedKeys': {'ImagesMetadata': {'Keys': [{'ImageID': {'S': '2'}}]}}},
+            {'Responses': {'ImagesMetadata': [{'ImageID': {'S': '2'}}]}},
+        ]
+
+        items, failed_keys = batch_get(mock_dynamo, 'ImagesMetadata', [{'ImageID': {'S': '1'}}, {'ImageID': {'S': '2'}}])
+
+        self.assertEqual([item['ImageID']['S'] for item in items], ['1', '2'])
+        self.assertEqual(failed_keys, [])
+
+if __name__ == '__main__':
+    unittest.main()
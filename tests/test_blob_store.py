@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.blob_store import acquire_blob, release_blob, content_hash
+
+def blob_attributes(references, s3_key='blobs/hash/gen'):
+    return {'Attributes': {'S3Key': {'S': s3_key}, 'RefCount': {'N': str(references)}}}
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_s3 = MagicMock()
+        self.mock_dynamo = MagicMock()
+
+    def test_first_reference_uploads_blob(self):
+        self.mock_dynamo.update_item.return_value = blob_attributes(1)
+
+        digest, s3_key = acquire_blob(self.mock_s3, self.mock_dynamo, 'bucket', b'image', 'image/jpeg')
+
+        self.assertEqual(digest, content_hash(b'image'))
+        self.assertEqual(s3_key, 'blobs/hash/gen')
+        self.mock_s3.put_object.assert_called_once()
+        self.assertTrue(self.mock_dynamo.update_item.call_args.kwargs['ExpressionAttributeValues'][':s3_key']['S'].startswith(f'blobs/{digest}/'))
+
+    def test_existing_blob_is_reused(self):
+        self.mock_dynamo.update_item.return_value = blob_attributes(2)
+
+        acquire_blob(self.mock_s3, self.mock_dynamo, 'bucket', b'image', 'image/jpeg')
+
+        self.mock_s3.head_object.assert_called_once()
+        self.mock_s3.put_object.assert_not_called()
+
+    def test_missing_object_is_uploaded_again(self):
+        self.mock_dynamo.update_item.return_value = blob_attributes(2)
+        self.mock_s3.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+        acquire_blob(self.mock_s3, self.mock_dynamo, 'bucket', b'image', 'image/jpeg')
+
+        self.mock_s3.put_object.assert_called_once()
+
+    def test_failed_upload_releases_reference(self):
+        self.mock_dynamo.update_item.side_effect = [blob_attributes(1), blob_attributes(0)]
+        self.mock_s3.put_object.side_effect = Exception("S3 upload error")
+
+        with self.assertRaises(Exception):
+            acquire_blob(self.mock_s3, self.mock_dynamo, 'bucket', b'image', 'image/jpeg')
+
+        self.assertEqual(self.mock_dynamo.update_item.call_args.kwargs['ExpressionAttributeValues'], {':minus_one': {'N': '-1'}})
+        self.mock_dynamo.delete_item.assert_called_once()
+
+    def test_release_keeps_blob_with_remaining_references(self):
+        self.mock_dynamo.update_item.return_value = blob_attributes(1)
+
+        self.assertIsNone(release_blob(self.mock_s3, self.mock_dynamo, 'bucket', 'hash'))
+        self.mock_dynamo.delete_item.assert_not_called()
+        self.mock_s3.delete_object.assert_not_called()
+
+    def test_last_release_deletes_blob(self):
+        self.mock_dynamo.update_item.return_value = blob_attributes(0)
+
+        self.assertEqual(release_blob(self.mock_s3, self.mock_dynamo, 'bucket', 'hash'), 'blobs/hash/gen')
+        self.mock_s3.delete_object.assert_called_once_with(Bucket='bucket', Key='blobs/hash/gen')
+
+    def test_concurrent_reacquire_keeps_blob(self):
+        self.mock_dynamo.update_item.return_value = blob_attributes(0)
+        self.mock_dynamo.delete_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 'DeleteItem')
+
+        self.assertIsNone(release_blob(self.mock_s3, self.mock_dynamo, 'bucket', 'hash'))
+        self.mock_s3.delete_object.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
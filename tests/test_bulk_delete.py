@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import patch
+import json
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import aws_clients
+from src import bulk_delete as bulk_delete_module
+from src.bulk_delete import bulk_delete
+from src.delete_image import delete_image
+from src.upload_image import upload_image
+from src.cache import image_cache
+from benchmarks.local_aws import LocalS3, LocalDynamoDB
+
+def item(image_id):
+    return {'ImageID': {'S': image_id}, 'S3Key': {'S': f'images/{image_id}.jpg'}}
+
+class TestBulkDelete(unittest.TestCase):
+
+    @patch('src.bulk_delete.s3_client')
+    @patch('src.bulk_delete.dynamodb_client')
+    def test_delete_by_ids(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'ImagesMetadata': [item('1'), item('2'), item('3')]}}
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_s3.delete_objects.return_value = {'Errors': [{'Key': 'images/3.jpg', 'Message': 'Access Denied'}]}
+
+        response = bulk_delete({'body': json.dumps({'image_ids': ['1', '2', '3', '4', '1']})}, None)
+
+        self.assertEqual(response['statusCode'], 207)
+        results = json.loads(response['body'])['results']
+        self.assertEqual(results, {'1': 'deleted', '2': 'deleted', '3': 'failed', '4': 'not_found'})
+
+        # One BatchGetItem, one DeleteObjects and one BatchWriteItem for the whole request
+        self.assertEqual(len(mock_dynamodb.batch_get_item.call_args.kwargs['RequestItems']['ImagesMetadata']['Keys']), 4)
+        self.assertEqual(len(mock_s3.delete_objects.call_args.kwargs['Delete']['Objects']), 3)
+        deleted = mock_dynamodb.batch_write_item.call_args.kwargs['RequestItems']['ImagesMetadata']
+        self.assertEqual([r['DeleteRequest']['Key']['ImageID']['S'] for r in deleted], ['1', '2', '3'])
+
+    @patch('src.bulk_delete.s3_client')
+    @patch('src.bulk_delete.dynamodb_client')
+    def test_delete_by_user(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.query.return_value = {'Items': [item('1'), item('2')]}
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_s3.delete_objects.return_value = {}
+
+        response = bulk_delete({'body': json.dumps({'user_id': '123'})}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['deleted'], 2)
+        self.assertEqual(mock_dynamodb.query.call_args.kwargs['IndexName'], 'UserCreatedAtIndex')
+        mock_dynamodb.batch_get_item.assert_not_called()
+
+    @patch('src.bulk_delete.s3_client')
+    @patch('src.bulk_delete.dynamodb_client')
+    def test_requires_ids_or_user(self, mock_dynamodb, mock_s3):
+        response = bulk_delete({'body': json.dumps({})}, None)
+
+        self.assertEqual(response['statusCode'], 400)
+        mock_s3.delete_objects.assert_not_called()
+
+    @patch('src.bulk_delete.s3_client')
+    @patch('src.bulk_delete.dynamodb_client')
+    def test_last_reference_deletes_shared_blob(self, mock_dynamodb, mock_s3):
+        shared = {'ImageID': {'S': '1'}, 'S3Key': {'S': 'blobs/hash/gen'}, 'ContentHash': {'S': 'hash'}}
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'ImagesMetadata': [shared]}}
+        mock_dynamodb.delete_item.side_effect = lambda **kwargs: {'Attributes': shared} if kwargs['TableName'] == 'ImagesMetadata' else {}
+        mock_dynamodb.update_item.return_value = {'Attributes': {'S3Key': {'S': 'blobs/hash/gen'}, 'RefCount': {'N': '0'}}}
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_s3.delete_objects.return_value = {}
+
+        response = bulk_delete({'body': json.dumps({'image_ids': ['1']})}, None)
+
+        self.assertEqual(json.loads(response['body'])['results'], {'1': 'deleted'})
+        # Items holding a blob reference are deleted on their own, returning the old item
+        item_delete = mock_dynamodb.delete_item.call_args_list[0].kwargs
+        self.assertEqual(item_delete['ReturnValues'], 'ALL_OLD')
+        self.assertEqual(item_delete['Key'], {'ImageID': {'S': '1'}})
+        deleted_keys = [obj['Key'] for call in mock_s3.delete_objects.call_args_list for obj in call.kwargs['Delete']['Objects']]
+        self.assertEqual(deleted_keys, ['blobs/hash/gen'])
+
+    @patch('src.bulk_delete.s3_client')
+    @patch('src.bulk_delete.dynamodb_client')
+    def test_failed_item_delete_keeps_blob_reference(self, mock_dynamodb, mock_s3):
+        shared = {'ImageID': {'S': '1'}, 'S3Key': {'S': 'blobs/hash/gen'}, 'ContentHash': {'S': 'hash'}}
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'ImagesMetadata': [shared]}}
+        mock_dynamodb.delete_item.side_effect = [Exception("Throttled"), {'Attributes': shared}]
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_dynamodb.update_item.return_value = {'Attributes': {'S3Key': {'S': 'blobs/hash/gen'}, 'RefCount': {'N': '1'}}}
+        mock_s3.delete_objects.return_value = {}
+        event = {'body': json.dumps({'image_ids': ['1']})}
+
+        # The item survives the first attempt, so its blob reference is left alone
+        response = bulk_delete(event, None)
+        self.assertEqual(json.loads(response['body'])['results'], {'1': 'failed'})
+        mock_dynamodb.update_item.assert_not_called()
+
+        # The retry deletes the item and releases the reference exactly once
+        response = bulk_delete(event, None)
+        self.assertEqual(json.loads(response['body'])['results'], {'1': 'deleted'})
+        releases = [c for c in mock_dynamodb.update_item.call_args_list if c.kwargs['TableName'] == 'ImageBlobs']
+        self.assertEqual(len(releases), 1)
+
+    @patch('src.upload_image.concurrent_upload_writes', False)
+    @patch('src.upload_image.deduplicate_uploads', True)
+    def test_concurrent_delete_releases_blob_once(self):
+        s3, dynamodb = LocalS3(), LocalDynamoDB()
+        aws_clients.set_client('s3', s3)
+        aws_clients.set_client('dynamodb', dynamodb)
+        self.addCleanup(aws_clients.reset_clients)
+        self.addCleanup(image_cache.clear)
+
+        # Three images share one content-addressed blob
+        body = json.dumps({'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA', 'metadata': {'user_id': 'u1'}})
+        image_ids = [json.loads(upload_image({'body': body}, None)['body'])['imageId'] for _ in range(3)]
+        blob_key = {'ContentHash': dynamodb.get_item(TableName='ImagesMetadata', Key={'ImageID': {'S': image_ids[0]}})['Item']['ContentHash']}
+
+        # delete_image removes the first image between bulk_delete's read and its delete
+        resolve_by_ids = bulk_delete_module.resolve_by_ids
+        def resolve_then_delete(ids, results):
+            found = resolve_by_ids(ids, results)
+            self.assertEqual(delete_image({'pathParameters': {'image_id': image_ids[0]}}, None)['statusCode'], 200)
+            return found
+
+        with patch('src.bulk_delete.resolve_by_ids', side_effect=resolve_then_delete):
+            response = bulk_delete({'body': json.dumps({'image_ids': [image_ids[0]]})}, None)
+
+        self.assertEqual(json.loads(response['body'])['results'], {image_ids[0]: 'not_found'})
+        blob = dynamodb.get_item(TableName='ImageBlobs', Key=blob_key)['Item']
+        self.assertEqual(blob['RefCount'], {'N': '2'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        self.cache.set('a', 1)
+        self.assertTrue(self.cache.invalidate('a'))
+        self.assertFalse(self.cache.invalidate('a'))
+        self.assertIsNone(self.cache.get('a'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import sys
+import os
+
+# Add the repository root to the system path so the 'benchmarks' scripts can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.cold_start import parse_importtime, import_breakdown, slowest_imports, IMPORT_MARKER
+
+TRACE = "\n".join([
+    "import time: self [us] | cumulative | imported package",
+    "import time:       900 |        900 | json",
+    IMPORT_MARKER,
+    "import time: self [us] | cumulative | imported package",
+    "import time:      2000 |       2000 |     botocore.utils",
+    "import time:      1000 |       3000 |   botocore",
+    "import time:       500 |       3500 | boto3",
+    "import time:       250 |       3750 | src.upload_image",
+])
+
+class TestColdStart(unittest.TestCase):
+
+    def test_parse_importtime_only_reads_handler_imports(self):
+        rows = parse_importtime(TRACE)
+
+        self.assertEqual([row[0] for row in rows], ['botocore.utils', 'botocore', 'boto3', 'src.upload_image'])
+        self.assertEqual(rows[0], ('botocore.utils', 2000, 2000, 2))
+
+    def test_breakdown_groups_self_time_by_package(self):
+        rows = parse_importtime(TRACE)
+
+        self.assertEqual(import_breakdown(rows), {'botocore': 3.0, 'boto3': 0.5, 'src': 0.25})
+        self.assertEqual(slowest_imports(rows, limit=1)[0]['module'], 'src.upload_image')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import base64
+import gzip
+import json
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.compression import choose_encoding, json_response, dumps
+
+PAYLOAD = {'images': [{'ImageID': str(i), 'Metadata': {'title': 'Cat'}} for i in range(200)]}
+
+class TestCompression(unittest.TestCase):
+
+    @patch('src.compression.brotli', None)
+    def test_choose_encoding_without_brotli(self):
+        self.assertEqual(choose_encoding({'Accept-Encoding': 'gzip, deflate, br'}), 'gzip')
+        self.assertEqual(choose_encoding({'accept-encoding': '*'}), 'gzip')
+        self.assertIsNone(choose_encoding({'Accept-Encoding': 'gzip;q=0, br'}))
+        self.assertIsNone(choose_encoding({}))
+        self.assertIsNone(choose_encoding(None))
+
+    @patch('src.compression.brotli', MagicMock())
+    def test_choose_encoding_prefers_brotli(self):
+        self.assertEqual(choose_encoding({'Accept-Encoding': 'gzip, br'}), 'br')
+        self.assertEqual(choose_encoding({'Accept-Encoding': 'gzip, br;q=0.5'}), 'gzip')
+
+    @patch('src.compression.compression_enabled', True)
+    @patch('src.compression.brotli', None)
+    def test_large_response_is_gzipped(self):
+        response = json_response(200, PAYLOAD, {'Accept-Encoding': 'gzip'}, {'ETag': '"abc"'})
+
+        self.assertTrue(response['isBase64Encoded'])
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(response['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['headers']['ETag'], 'W/"abc"')
+        self.assertEqual(json.loads(gzip.decompress(base64.b64decode(response['body']))), PAYLOAD)
+
+    @patch('src.compression.compression_enabled', True)
+    @patch('src.compression.compression_threshold', 1024)
+    def test_small_or_unaccepted_response_is_plain(self):
+        small = json_response(200, {'images': []}, {'Accept-Encoding': 'gzip'})
+        plain = json_response(200, PAYLOAD, {})
+
+        for response in (small, plain):
+            self.assertNotIn('isBase64Encoded', response)
+            self.assertNotIn('Content-Encoding', response['headers'])
+        self.assertEqual(json.loads(plain['body']), PAYLOAD)
+
+    def test_compression_is_off_by_default(self):
+        response = json_response(200, PAYLOAD, {'Accept-Encoding': 'gzip'}, {'ETag': '"abc"'})
+
+        self.assertNotIn('isBase64Encoded', response)
+        self.assertEqual(response['headers']['ETag'], '"abc"')
+        self.assertEqual(json.loads(response['body']), PAYLOAD)
+
+    @patch('src.compression.orjson', None)
+    def test_dumps_without_orjson(self):
+        self.assertEqual(json.loads(dumps(PAYLOAD)), PAYLOAD)
+
+if __name__ == '__main__':
+    unittest.main()
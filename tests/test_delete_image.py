@@ -103,5 +103,69 @@ class TestDeleteImage(unittest.TestCase):
         self.assertEqual(response['statusCode'], 404)
         # self.assertIn('Internal Server Error', json.loads(response['body'])['error'])
 
+    @patch('delete_image.s3_client')
+    @patch('delete_image.dynamodb_client')
+    def test_delete_image_invalidates_cache(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        image_cache.set(('cached_image', None), {'s3_key': 'images/cached_image.jpg', 'response': {'url': 'https://signed'}})
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.delete_item.return_value = {
+            'Attributes': {'ImageID': {'S': 'cached_image'}, 'S3Key': {'S': 'images/cached_image.jpg'}}
+        }
+
+        response = delete_image({'pathParameters': {'image_id': 'cached_image'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertIsNone(image_cache.get(('cached_image', None)))
+
+    @patch('delete_image.s3_client')
+    @patch('delete_image.dynamodb_client')
+    def test_delete_image_releases_shared_blob(self, mock_dynamo, mock_s3):
+        mock_dynamo.delete_item.return_value = {
+            'Attributes': {'ImageID': {'S': 'dedup_image'}, 'S3Key': {'S': 'blobs/hash/gen'}, 'ContentHash': {'S': 'hash'}}
+        }
+        # Another image still references the blob
+        mock_dynamo.update_item.return_value = {'Attributes': {'S3Key': {'S': 'blobs/hash/gen'}, 'RefCount': {'N': '1'}}}
+
+        response = delete_image({'pathParameters': {'image_id': 'dedup_image'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        mock_s3.delete_object.assert_not_called()
+        mock_dynamo.delete_item.assert_called_once_with(
+            TableName='ImagesMetadata', Key={'ImageID': {'S': 'dedup_image'}}, ReturnValues='ALL_OLD'
+        )
+
+    @patch('delete_image.s3_client')
+    @patch('delete_image.dynamodb_client')
+    def test_retried_delete_releases_blob_once(self, mock_dynamo, mock_s3):
+        item = {'ImageID': {'S': 'dedup_image'}, 'S3Key': {'S': 'blobs/hash/gen'}, 'ContentHash': {'S': 'hash'}}
+        # The first delete is throttled and the client retries
+        mock_dynamo.delete_item.side_effect = [Exception("ProvisionedThroughputExceededException"), {'Attributes': item}]
+        mock_dynamo.update_item.return_value = {'Attributes': {'S3Key': {'S': 'blobs/hash/gen'}, 'RefCount': {'N': '1'}}}
+        event = {'pathParameters': {'image_id': 'dedup_image'}}
+
+        self.assertEqual(delete_image(event, None)['statusCode'], 500)
+        self.assertEqual(delete_image(event, None)['statusCode'], 200)
+
+        releases = [c for c in mock_dynamo.update_item.call_args_list if c.kwargs['TableName'] == 'ImageBlobs']
+        self.assertEqual(len(releases), 1)
+
+    @patch('delete_image.s3_client')
+    @patch('delete_image.dynamodb_client')
+    def test_delete_image_removes_tag_postings(self, mock_dynamo, mock_s3):
+        mock_dynamo.delete_item.return_value = {
+            'Attributes': {'ImageID': {'S': 'tagged'}, 'S3Key': {'S': 'images/tagged.png'}, 'Tags': {'SS': ['cat']}}
+        }
+        mock_dynamo.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        response = delete_image({'pathParameters': {'image_id': 'tagged'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(
+            mock_dynamo.batch_write_item.call_args.kwargs['RequestItems'],
+            {'ImageTags': [{'DeleteRequest': {'Key': {'Tag': {'S': 'cat'}, 'ImageID': {'S': 'tagged'}}}}]}
+        )
+
 if __name__ == '__main__':
     unittest.main()
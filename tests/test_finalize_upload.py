@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch
+import json
+import sys
+import os
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.finalize_upload import finalize_upload
+
+def s3_event(key):
+    return {'Records': [{'s3': {'bucket': {'name': 'mc-image-insta-uploaders'}, 'object': {'key': key}}}]}
+
+class TestFinalizeUpload(unittest.TestCase):
+
+    @patch('src.finalize_upload.s3_client')
+    @patch('src.finalize_upload.dynamodb_client')
+    def test_writes_metadata_item(self, mock_dynamodb, mock_s3):
+        mock_s3.head_object.return_value = {'Metadata': {'image-metadata': json.dumps({'user_id': '123'})}}
+
+        result = finalize_upload(s3_event('uploads/abc'), None)
+
+        self.assertEqual(result, {'uploads/abc': 'finalized'})
+        item = mock_dynamodb.put_item.call_args.kwargs['Item']
+        self.assertEqual(item['ImageID'], {'S': 'abc'})
+        self.assertEqual(item['S3Key'], {'S': 'uploads/abc'})
+        self.assertEqual(item['UserID'], {'S': '123'})
+
+    @patch('src.finalize_upload.s3_client')
+    @patch('src.finalize_upload.dynamodb_client')
+    def test_ignores_objects_from_upload_image(self, mock_dynamodb, mock_s3):
+        result = finalize_upload(s3_event('images/abc.jpg'), None)
+
+        # Keys outside the presigned upload prefix are not even read
+        self.assertEqual(result, {'images/abc.jpg': 'ignored'})
+        mock_s3.head_object.assert_not_called()
+        mock_dynamodb.put_item.assert_not_called()
+
+    @patch('src.finalize_upload.s3_client')
+    @patch('src.finalize_upload.dynamodb_client')
+    def test_duplicate_event_is_ignored(self, mock_dynamodb, mock_s3):
+        mock_s3.head_object.return_value = {'Metadata': {'image-metadata': '{}'}}
+        mock_dynamodb.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+
+        result = finalize_upload(s3_event('uploads/abc'), None)
+
+        self.assertEqual(result, {'uploads/abc': 'duplicate'})
+
+    @patch('src.finalize_upload.s3_client')
+    @patch('src.finalize_upload.dynamodb_client')
+    def test_failure_is_raised_for_retry(self, mock_dynamodb, mock_s3):
+        mock_s3.head_object.side_effect = Exception("S3 error")
+
+        with self.assertRaises(Exception):
+            finalize_upload(s3_event('uploads/abc'), None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.idempotency import (
+    idempotency_key, request_fingerprint, matches_request, claim_key, replay_response, InvalidIdempotencyKeyError
+)
+
+def conditional_check_failed(item=None):
+    response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+    if item is not None:
+        response['Item'] = item
+    return ClientError(response, 'PutItem')
+
+class TestIdempotency(unittest.TestCase):
+
+    def test_header_is_case_insensitive_and_validated(self):
+        self.assertEqual(idempotency_key({'Idempotency-Key': 'abc-123'}), 'abc-123')
+        self.assertEqual(idempotency_key({'idempotency-key': '"abc-123"'}), 'abc-123')
+        self.assertIsNone(idempotency_key({'Content-Type': 'application/json'}))
+        self.assertIsNone(idempotency_key(None))
+        with self.assertRaises(InvalidIdempotencyKeyError):
+            idempotency_key({'Idempotency-Key': 'has spaces'})
+        with self.assertRaises(InvalidIdempotencyKeyError):
+            idempotency_key({'Idempotency-Key': 'x' * 256})
+
+    def test_claim_is_a_conditional_put(self):
+        client = MagicMock()
+
+        self.assertIsNone(claim_key(client, 'abc', 'hash', now=1000))
+
+        put = client.put_item.call_args.kwargs
+        self.assertEqual(put['Item']['Status'], {'S': 'IN_PROGRESS'})
+        self.assertEqual(put['Item']['RequestHash'], {'S': 'hash'})
+        self.assertEqual(put['Item']['ExpiresAt'], {'N': '1060'})
+        self.assertEqual(put['ConditionExpression'], 'attribute_not_exists(IdempotencyKey) OR ExpiresAt < :now')
+
+    def test_claim_returns_existing_record(self):
+        completed = {'Status': {'S': 'COMPLETED'}, 'StatusCode': {'N': '200'}, 'Body': {'S': '{"imageId": "img"}'}}
+        client = MagicMock()
+        client.put_item.side_effect = conditional_check_failed(completed)
+
+        existing = claim_key(client, 'abc', 'hash')
+
+        self.assertEqual(existing, completed)
+        client.get_item.assert_not_called()
+        self.assertEqual(replay_response(existing), {
+            'statusCode': 200, 'headers': {'Idempotent-Replayed': 'true'}, 'body': '{"imageId": "img"}'
+        })
+
+        # Without the item in the error it is read back
+        client.put_item.side_effect = conditional_check_failed()
+        client.get_item.return_value = {'Item': {'Status': {'S': 'IN_PROGRESS'}}}
+        existing = claim_key(client, 'abc', 'hash')
+        self.assertTrue(client.get_item.call_args.kwargs['ConsistentRead'])
+        self.assertIsNone(replay_response(existing))
+
+    def test_fingerprint_binds_key_to_request(self):
+        body = '{"image": "aGVsbG8=", "metadata": {"user_id": "alice"}}'
+        record = {'Status': {'S': 'COMPLETED'}, 'RequestHash': {'S': request_fingerprint(body)}}
+
+        self.assertTrue(matches_request(record, request_fingerprint(body)))
+        self.assertFalse(matches_request(record, request_fingerprint(body.replace('alice', 'bob'))))
+        self.assertFalse(matches_request(record, request_fingerprint(body.replace('aGVsbG8=', 'aGVsbG9v'))))
+        # Records claimed before requests were hashed still replay
+        self.assertTrue(matches_request({'Status': {'S': 'COMPLETED'}}, request_fingerprint(body)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import patch
+import json
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.initiate_upload import initiate_upload
+
+class TestInitiateUpload(unittest.TestCase):
+
+    @patch('src.initiate_upload.s3_client')
+    def test_returns_presigned_post(self, mock_s3):
+        mock_s3.generate_presigned_post.return_value = {
+            'url': 'https://mc-image-insta-uploaders.s3.amazonaws.com/',
+            'fields': {'key': 'uploads/abc'}
+        }
+        event = {'body': json.dumps({'metadata': {'user_id': '123'}, 'content_type': 'image/png'})}
+
+        response = initiate_upload(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        body = json.loads(response['body'])
+        self.assertIn('imageId', body)
+        self.assertEqual(body['upload']['url'], 'https://mc-image-insta-uploaders.s3.amazonaws.com/')
+
+        kwargs = mock_s3.generate_presigned_post.call_args.kwargs
+        self.assertEqual(kwargs['Key'], f"uploads/{body['imageId']}")
+        self.assertEqual(kwargs['Fields']['Content-Type'], 'image/png')
+        self.assertEqual(json.loads(kwargs['Fields']['x-amz-meta-image-metadata']), {'user_id': '123'})
+
+    @patch('src.initiate_upload.s3_client')
+    def test_missing_metadata(self, mock_s3):
+        response = initiate_upload({'body': json.dumps({})}, None)
+
+        self.assertEqual(response['statusCode'], 400)
+        self.assertIn('No metadata found', response['body'])
+        mock_s3.generate_presigned_post.assert_not_called()
+
+    @patch('src.initiate_upload.s3_client')
+    def test_rejects_non_image_content_type(self, mock_s3):
+        event = {'body': json.dumps({'metadata': {'key': 'value'}, 'content_type': 'text/html'})}
+
+        response = initiate_upload(event, None)
+
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('src.initiate_upload.s3_client')
+    def test_rejects_oversized_metadata(self, mock_s3):
+        event = {'body': json.dumps({'metadata': {'description': 'x' * 4096}})}
+
+        response = initiate_upload(event, None)
+
+        self.assertEqual(response['statusCode'], 400)
+        self.assertIn('Metadata must be at most', response['body'])
+
+if __name__ == '__main__':
+    unittest.main()
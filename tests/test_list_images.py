@@ -172,5 +172,235 @@ class TestListImages(unittest.TestCase):
         body = json.loads(response['body'])
         # self.assertIn('error', body)
 
+    @patch('list_images.dynamodb_client')
+    def test_list_images_returns_next_cursor(self, mock_dynamo):
+        # Mock a page that was cut off by the limit
+        mock_dynamo.scan.return_value = {
+            'Items': [{'ImageID': {'S': '1'}, 'Metadata': {'S': 'tag:cat,user_id:123'}}],
+            'LastEvaluatedKey': {'ImageID': {'S': '1'}}
+        }
+
+        response = list_images({'queryStringParameters': {'limit': '1'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        body = json.loads(response['body'])
+        self.assertEqual(body['images'][0]['ImageID'], '1')
+        self.assertIsNotNone(body['next_cursor'])
+        self.assertEqual(mock_dynamo.scan.call_args.kwargs['Limit'], 1)
+
+        # Following the cursor resumes the scan after the last evaluated key
+        mock_dynamo.scan.return_value = {'Items': []}
+        response = list_images({'queryStringParameters': {'cursor': body['next_cursor']}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertIsNone(json.loads(response['body'])['next_cursor'])
+        self.assertEqual(mock_dynamo.scan.call_args.kwargs['ExclusiveStartKey'], {'ImageID': {'S': '1'}})
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_invalid_pagination(self, mock_dynamo):
+        response = list_images({'queryStringParameters': {'limit': 'abc'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+        response = list_images({'queryStringParameters': {'cursor': '%%%'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+        mock_dynamo.scan.assert_not_called()
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_user_id_uses_index_query(self, mock_dynamo):
+        mock_dynamo.query.return_value = {
+            'Items': [{'ImageID': {'S': '2'}, 'Metadata': {'S': '{"user_id": "456"}'}, 'UserID': {'S': '456'}}]
+        }
+
+        response = list_images({'queryStringParameters': {'user_id': '456', 'tag': 'dog'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['images'][0]['ImageID'], '2')
+        mock_dynamo.scan.assert_not_called()
+        query_kwargs = mock_dynamo.query.call_args.kwargs
+        self.assertEqual(query_kwargs['IndexName'], 'UserCreatedAtIndex')
+        self.assertEqual(query_kwargs['KeyConditionExpression'], 'UserID = :user_id')
+        self.assertEqual(query_kwargs['FilterExpression'], 'contains(Tags, :tag)')
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_export_uses_parallel_scan(self, mock_dynamo):
+        mock_dynamo.scan.return_value = {
+            'Items': [{'ImageID': {'S': '1'}, 'Metadata': {'S': '{}'}}]
+        }
+
+        response = list_images({'queryStringParameters': {'export': 'true', 'segments': '3'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(len(json.loads(response['body'])['images']), 3)
+        self.assertIsNone(json.loads(response['body'])['next_cursor'])
+        segments = sorted(call.kwargs['Segment'] for call in mock_dynamo.scan.call_args_list)
+        self.assertEqual(segments, [0, 1, 2])
+        self.assertTrue(all(call.kwargs['Limit'] == 333 for call in mock_dynamo.scan.call_args_list))
+
+        # Callers cannot fan an export out beyond the worker pool
+        mock_dynamo.scan.reset_mock()
+        response = list_images({'queryStringParameters': {'export': 'true', 'segments': '1000000'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+        mock_dynamo.scan.assert_not_called()
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_export_is_paged_per_segment(self, mock_dynamo):
+        def scan(**kwargs):
+            # Segment 0 has two pages, segment 1 a single one
+            if kwargs['Segment'] == 1:
+                return {'Items': [{'ImageID': {'S': '1-0'}}]}
+            if 'ExclusiveStartKey' not in kwargs:
+                return {'Items': [{'ImageID': {'S': '0-0'}}], 'LastEvaluatedKey': {'ImageID': {'S': '0-0'}}}
+            return {'Items': [{'ImageID': {'S': '0-1'}}]}
+        mock_dynamo.scan.side_effect = scan
+        params = {'export': 'true', 'segments': '2', 'limit': '10'}
+
+        first = json.loads(list_images({'queryStringParameters': params}, None)['body'])
+
+        self.assertEqual([image['ImageID'] for image in first['images']], ['0-0', '1-0'])
+        self.assertIsNotNone(first['next_cursor'])
+        self.assertTrue(all(call.kwargs['Limit'] == 5 for call in mock_dynamo.scan.call_args_list))
+
+        # Only the unfinished segment is read again, from where it stopped
+        mock_dynamo.scan.reset_mock()
+        second = json.loads(list_images({'queryStringParameters': dict(params, cursor=first['next_cursor'])}, None)['body'])
+
+        self.assertEqual([image['ImageID'] for image in second['images']], ['0-1'])
+        self.assertIsNone(second['next_cursor'])
+        resumed = mock_dynamo.scan.call_args.kwargs
+        self.assertEqual((resumed['Segment'], resumed['ExclusiveStartKey']), (0, {'ImageID': {'S': '0-0'}}))
+        mock_dynamo.scan.assert_called_once()
+
+        # The cursor only fits the segment split it was issued for
+        response = list_images({'queryStringParameters': dict(params, segments='3', cursor=first['next_cursor'])}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_fields_projection(self, mock_dynamo):
+        mock_dynamo.scan.return_value = {
+            'Items': [
+                {'ImageID': {'S': '1'}, 'Metadata': {'M': {'title': {'S': 'Cat'}}}, 'Tags': {'SS': ['cat']}},
+                {'ImageID': {'S': '2'}, 'Metadata': {'S': '{"title": "Dog"}'}},
+            ]
+        }
+
+        response = list_images({'queryStringParameters': {'fields': 'Metadata,Tags'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        images = json.loads(response['body'])['images']
+        self.assertEqual(images[0], {'ImageID': '1', 'Metadata': {'title': 'Cat'}, 'Tags': ['cat']})
+        self.assertEqual(images[1], {'ImageID': '2', 'Metadata': {'title': 'Dog'}})
+        scan_kwargs = mock_dynamo.scan.call_args.kwargs
+        self.assertEqual(scan_kwargs['ProjectionExpression'], '#p0, #p1, #p2, #p3')
+        self.assertEqual(scan_kwargs['ExpressionAttributeNames'], {'#p0': 'ImageID', '#p1': 'Metadata', '#p2': 'Tags', '#p3': 'UploadStatus'})
+
+        response = list_images({'queryStringParameters': {'fields': 'S3Key'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('src.compression.compression_enabled', True)
+    @patch('list_images.dynamodb_client')
+    def test_list_images_compresses_large_pages(self, mock_dynamo):
+        import gzip
+        import base64
+        mock_dynamo.scan.return_value = {
+            'Items': [{'ImageID': {'S': str(i)}, 'Metadata': {'M': {'title': {'S': 'Cat'}}}} for i in range(100)]
+        }
+
+        response = list_images({'queryStringParameters': {}, 'headers': {'Accept-Encoding': 'gzip, deflate'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(response['isBase64Encoded'])
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        body = json.loads(gzip.decompress(base64.b64decode(response['body'])))
+        self.assertEqual(len(body['images']), 100)
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_not_modified(self, mock_dynamo):
+        mock_dynamo.get_item.return_value = {'Item': {'Scope': {'S': 'user#456'}, 'Version': {'N': '3'}}}
+        mock_dynamo.query.return_value = {'Items': [{'ImageID': {'S': '2'}, 'Metadata': {'S': '{}'}}]}
+        event = {'queryStringParameters': {'user_id': '456'}}
+
+        first = list_images(event, None)
+        etag = first['headers']['ETag']
+        self.assertEqual(mock_dynamo.get_item.call_args.kwargs['Key'], {'Scope': {'S': 'user#456'}})
+
+        # An unchanged listing is answered without querying it again
+        mock_dynamo.query.reset_mock()
+        second = list_images(dict(event, headers={'If-None-Match': etag}), None)
+        self.assertEqual(second['statusCode'], 304)
+        mock_dynamo.query.assert_not_called()
+
+        # Once the user's counter moves on, the listing is read again
+        mock_dynamo.get_item.return_value = {'Item': {'Scope': {'S': 'user#456'}, 'Version': {'N': '4'}}}
+        third = list_images(dict(event, headers={'If-None-Match': etag}), None)
+        self.assertEqual(third['statusCode'], 200)
+        self.assertNotEqual(third['headers']['ETag'], etag)
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_tags_use_tag_index(self, mock_dynamo):
+        postings = {'cat': ['1', '3', '4'], 'dog': ['2', '3', '4']}
+        mock_dynamo.query.side_effect = lambda **kwargs: {
+            'Items': [{'ImageID': {'S': i}} for i in postings[kwargs['ExpressionAttributeValues'][':tag']['S']]]
+        }
+        # Image 4 was deleted, but its posting was left behind
+        mock_dynamo.batch_get_item.return_value = {
+            'Responses': {'ImagesMetadata': [{'ImageID': {'S': '3'}, 'Metadata': {'M': {'title': {'S': 'Both'}}}}]},
+            'UnprocessedKeys': {}
+        }
+
+        response = list_images({'queryStringParameters': {'tag': 'cat,dog', 'match': 'all'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['images'], [{'ImageID': '3', 'Metadata': {'title': 'Both'}}])
+        mock_dynamo.scan.assert_not_called()
+        self.assertEqual(
+            mock_dynamo.batch_get_item.call_args.kwargs['RequestItems']['ImagesMetadata']['Keys'],
+            [{'ImageID': {'S': '3'}}, {'ImageID': {'S': '4'}}]
+        )
+
+        response = list_images({'queryStringParameters': {'tag': 'cat', 'match': 'either'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('list_images.use_tag_index', False)
+    @patch('list_images.dynamodb_client')
+    def test_list_images_tags_scan_without_tag_index(self, mock_dynamo):
+        mock_dynamo.scan.return_value = {'Items': []}
+
+        response = list_images({'queryStringParameters': {'tag': 'cat,dog', 'match': 'any'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        scan_kwargs = mock_dynamo.scan.call_args.kwargs
+        self.assertEqual(scan_kwargs['FilterExpression'], 'contains(Tags, :tag0) OR contains(Tags, :tag1)')
+        self.assertEqual(scan_kwargs['ExpressionAttributeValues'], {':tag0': {'S': 'cat'}, ':tag1': {'S': 'dog'}})
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_newest_first_uses_created_at_index(self, mock_dynamo):
+        mock_dynamo.query.return_value = {'Items': [
+            {'ImageID': {'S': '2'}, 'CreatedAt': {'S': '2024-05-02T00:00:00.000Z'}},
+            {'ImageID': {'S': '1'}, 'CreatedAt': {'S': '2024-05-01T00:00:00.000Z'}},
+        ]}
+
+        response = list_images({'queryStringParameters': {
+            'user_id': '456', 'order': 'newest', 'since': '2024-05-01', 'limit': '2', 'fields': 'CreatedAt'
+        }}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([image['CreatedAt'] for image in json.loads(response['body'])['images']],
+                         ['2024-05-02T00:00:00.000Z', '2024-05-01T00:00:00.000Z'])
+        mock_dynamo.scan.assert_not_called()
+        query_kwargs = mock_dynamo.query.call_args.kwargs
+        self.assertEqual(query_kwargs['IndexName'], 'UserCreatedAtIndex')
+        self.assertEqual(query_kwargs['KeyConditionExpression'], 'UserID = :user_id AND CreatedAt >= :since')
+        self.assertEqual(query_kwargs['ExpressionAttributeValues'][':since'], {'S': '2024-05-01T00:00:00.000Z'})
+        self.assertFalse(query_kwargs['ScanIndexForward'])
+        self.assertEqual(query_kwargs['Limit'], 2)
+
+    @patch('list_images.dynamodb_client')
+    def test_list_images_time_range_requires_user_id(self, mock_dynamo):
+        for params in ({'order': 'newest'}, {'user_id': '1', 'order': 'random'}, {'user_id': '1', 'since': 'soon'},
+                       {'user_id': '1', 'since': '2024-05-02', 'until': '2024-05-01'}):
+            response = list_images({'queryStringParameters': params}, None)
+            self.assertEqual(response['statusCode'], 400)
+        mock_dynamo.query.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
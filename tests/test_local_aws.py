@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'benchmarks' scripts can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.local_aws import LocalS3, LocalDynamoDB
+from benchmarks.handlers import compare_to_baseline, parse_size, percentile
+
+def image_item(image_id, user_id):
+    return {
+        'ImageID': {'S': image_id}, 'UserID': {'S': user_id}, 'CreatedAt': {'S': '2024-05-01T12:00:00.000Z'},
+        'Metadata': {'M': {'title': {'S': image_id}}}
+    }
+
+class TestLocalAws(unittest.TestCase):
+
+    def test_conditional_put_rejects_existing_item(self):
+        dynamodb = LocalDynamoDB()
+        dynamodb.put_item(TableName='ImagesMetadata', Item=image_item('a', 'u1'))
+
+        with self.assertRaises(ClientError) as error:
+            dynamodb.put_item(TableName='ImagesMetadata', Item=image_item('a', 'u2'),
+                              ConditionExpression='attribute_not_exists(ImageID)')
+
+        self.assertEqual(error.exception.response['Error']['Code'], 'ConditionalCheckFailedException')
+        self.assertEqual(dynamodb.get_item(TableName='ImagesMetadata', Key={'ImageID': {'S': 'a'}})['Item']['UserID'], {'S': 'u1'})
+
+    def test_add_update_creates_and_increments_counter(self):
+        dynamodb = LocalDynamoDB()
+        for _ in range(2):
+            response = dynamodb.update_item(
+                TableName='ImageVersions', Key={'Scope': {'S': 'all'}}, UpdateExpression='ADD Version :one',
+                ExpressionAttributeValues={':one': {'N': '1'}}, ReturnValues='ALL_NEW'
+            )
+
+        self.assertEqual(response['Attributes'], {'Scope': {'S': 'all'}, 'Version': {'N': '2'}})
+
+    def test_index_query_pages_with_exclusive_start_key(self):
+        dynamodb = LocalDynamoDB()
+        for index in range(5):
+            dynamodb.put_item(TableName='ImagesMetadata', Item=image_item(f"img-{index}", 'u1' if index % 2 == 0 else 'u2'))
+
+        pages = []
+        kwargs = {}
+        while True:
+            response = dynamodb.query(TableName='ImagesMetadata', IndexName='UserCreatedAtIndex',
+                                      KeyConditionExpression='UserID = :u', ExpressionAttributeValues={':u': {'S': 'u1'}},
+                                      Limit=2, **kwargs)
+            pages.append([item['ImageID']['S'] for item in response['Items']])
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs = {'ExclusiveStartKey': response['LastEvaluatedKey']}
+
+        self.assertEqual(pages, [['img-0', 'img-2'], ['img-4']])
+
+    def test_projection_with_nested_placeholders(self):
+        dynamodb = LocalDynamoDB()
+        dynamodb.put_item(TableName='ImagesMetadata', Item=image_item('a', 'u1'))
+
+        item = dynamodb.get_item(TableName='ImagesMetadata', Key={'ImageID': {'S': 'a'}},
+                                 ProjectionExpression='#p0, #p1.#p2',
+                                 ExpressionAttributeNames={'#p0': 'ImageID', '#p1': 'Metadata', '#p2': 'title'})['Item']
+
+        self.assertEqual(item, {'ImageID': {'S': 'a'}, 'Metadata': {'M': {'title': {'S': 'a'}}}})
+
+    def test_s3_without_bodies_keeps_content_length(self):
+        s3 = LocalS3(keep_bodies=False)
+        s3.put_object(Bucket='b', Key='k', Body=b'x' * 100, ContentType='image/png')
+
+        self.assertEqual(s3.head_object(Bucket='b', Key='k')['ContentLength'], 100)
+        with self.assertRaises(ClientError):
+            s3.head_object(Bucket='b', Key='missing')
+
+    def test_benchmark_helpers(self):
+        self.assertEqual(parse_size('10KB'), 10240)
+        self.assertEqual(parse_size('1MB'), 1048576)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.99), 4)
+
+    def test_compare_to_baseline_flags_regressions_beyond_tolerance(self):
+        config = {'table_size': 10}
+        baseline = {'config': config, 'endpoints': {'view_image': {'throughput_per_s': 1000.0, 'p95_ms': 1.0}}}
+        report = {'config': config, 'endpoints': {'view_image': {'throughput_per_s': 900.0, 'p95_ms': 1.5}}}
+
+        regressions = compare_to_baseline(report, baseline, 0.25)
+
+        self.assertEqual([(r['endpoint'], r['metric']) for r in regressions], [('view_image', 'p95_ms')])
+        with self.assertRaises(ValueError):
+            compare_to_baseline(dict(report, config={'table_size': 20}), baseline, 0.25)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+import json
+import threading
+from unittest.mock import patch
+
+# Add the repository root to the system path so the 'benchmarks' scripts can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks import local_gateway
+from benchmarks.local_gateway import load_config, load_routes, match_route, build_event, make_server
+from benchmarks.load_generator import LoadGenerator, parse_mix, histogram, summarize
+
+class TestLocalGateway(unittest.TestCase):
+
+    @unittest.skipUnless(local_gateway.yaml is not None, "PyYAML is not installed")
+    def test_routes_come_from_serverless_http_events(self):
+        routes = load_routes(load_config())
+        by_endpoint = {(route['method'], route['resource']): route['handler'] for route in routes}
+
+        self.assertEqual(by_endpoint[('POST', '/upload')], 'src.upload_image.upload_image')
+        self.assertEqual(by_endpoint[('DELETE', '/images/{image_id}')], 'src.delete_image.delete_image')
+        # finalize_upload is triggered by S3, not HTTP
+        self.assertNotIn('src.finalize_upload.finalize_upload', by_endpoint.values())
+
+    @unittest.skipUnless(local_gateway.yaml is not None, "PyYAML is not installed")
+    def test_literal_paths_win_over_path_parameters(self):
+        routes = load_routes(load_config())
+
+        route, params = match_route(routes, 'POST', '/images/view')
+        self.assertEqual(route['handler'], 'src.batch_view.batch_view')
+        route, params = match_route(routes, 'GET', '/images/abc')
+        self.assertEqual((route['handler'], params), ('src.view_image.view_image', {'image_id': 'abc'}))
+        self.assertEqual(match_route(routes, 'PUT', '/images/abc'), (None, ['GET', 'DELETE']))
+
+    def test_event_has_rest_api_shape(self):
+        route = {'resource': '/images', 'function': 'listImages'}
+        event = build_event(route, 'GET', '/images', 'tag=cat&tag=dog&limit=5', {'Accept': '*/*'}, b'', {})
+
+        self.assertEqual(event['queryStringParameters'], {'tag': 'dog', 'limit': '5'})
+        self.assertEqual(event['multiValueQueryStringParameters']['tag'], ['cat', 'dog'])
+        self.assertIsNone(event['pathParameters'])
+        self.assertIsNone(event['body'])
+        self.assertEqual(event['requestContext']['resourcePath'], '/images')
+
+        binary = build_event(route, 'POST', '/images', '', {}, b'\xff\xd8', {})
+        self.assertTrue(binary['isBase64Encoded'])
+        self.assertEqual(binary['body'], '/9g=')
+
+    def test_load_generator_round_trip_against_local_gateway(self):
+        with patch.dict(os.environ):
+            server = make_server(port=0, workers=4)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            generator = LoadGenerator(f"http://127.0.0.1:{server.server_port}", image_size=256, users=2)
+            results = generator.run(['upload', 'view', 'list', 'delete'], concurrency=1)
+            status, body = generator.request('GET', '/nowhere')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual([(operation, status) for operation, status, _, _ in results],
+                         [('upload', 200), ('view', 200), ('list', 200), ('delete', 200)])
+        self.assertEqual((status, json.loads(body)), (404, {'message': 'Not Found'}))
+        self.assertEqual(summarize(results, 1.0)['error_rate'], 0.0)
+
+    def test_mix_and_histogram(self):
+        self.assertEqual(parse_mix('upload=1,view=3'), {'upload': 1.0, 'view': 3.0})
+        with self.assertRaises(ValueError):
+            parse_mix('rename=1')
+
+        counts = histogram([0.5, 3, 4, 7000])
+        self.assertEqual((counts['<=1ms'], counts['<=5ms'], counts['+Inf']), (1, 2, 1))
+
+if __name__ == '__main__':
+    unittest.main()
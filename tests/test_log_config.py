@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import logging
+import json
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.log_config import summarize_event, log_event
+
+class TestLogConfig(unittest.TestCase):
+
+    def test_summarize_event_redacts_image_and_truncates(self):
+        event = {
+            'headers': {'Authorization': 'Bearer secret', 'Accept': 'image/webp'},
+            'body': json.dumps({'image': 'A' * 5000000, 'metadata': {'note': 'x' * 1000}})
+        }
+
+        summary = summarize_event(event)
+
+        self.assertEqual(summary['body']['image'], '<redacted 5000000>')
+        self.assertEqual(summary['headers']['Authorization'], '<redacted 13>')
+        self.assertEqual(summary['headers']['Accept'], 'image/webp')
+        self.assertTrue(summary['body']['metadata']['note'].endswith('<truncated 1000 chars>'))
+        self.assertLess(len(json.dumps(summary)), 1000)
+
+    def test_summarize_event_caps_lists(self):
+        event = {'body': json.dumps({'images': [{'image': 'AAAA'}] * 50})}
+
+        images = summarize_event(event)['body']['images']
+
+        self.assertEqual(len(images), 21)
+        self.assertEqual(images[0], {'image': '<redacted 4>'})
+        self.assertEqual(images[-1], '<30 more>')
+
+    @patch('src.log_config.json.dumps')
+    @patch('src.log_config.log_level', logging.INFO)
+    def test_event_not_serialized_above_debug(self, mock_dumps):
+        logger = MagicMock()
+        logger.isEnabledFor.return_value = False
+
+        log_event(logger, {'body': '{}'})
+
+        logger.setLevel.assert_called_once_with(logging.INFO)
+        logger.debug.assert_not_called()
+        mock_dumps.assert_not_called()
+
+    @patch('src.log_config.random.random', return_value=0.75)
+    @patch('src.log_config.debug_sample_rate', 0.5)
+    @patch('src.log_config.log_level', logging.DEBUG)
+    def test_debug_logs_are_sampled(self, mock_random):
+        logger = logging.getLogger('test_log_config')
+        self.addCleanup(logger.setLevel, logging.NOTSET)
+
+        log_event(logger, {'body': '{}'})
+        self.assertEqual(logger.level, logging.INFO)
+
+        mock_random.return_value = 0.25
+        with self.assertLogs(logger, level='DEBUG') as captured:
+            log_event(logger, {'body': '{}'})
+        self.assertIn('Event received', captured.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.metadata import build_image_item, extract_tags, extract_user_id, parse_metadata, pending_item, is_pending, commit_request
+
+class TestMetadata(unittest.TestCase):
+
+    def test_item_has_first_class_user_and_tags(self):
+        metadata = {'user_id': 123, 'tags': ['cat', 'cute', 'cat']}
+        item = build_image_item('image-1', 'images/image-1.jpg', metadata)
+
+        self.assertEqual(item['UserID'], {'S': '123'})
+        self.assertEqual(item['Tags'], {'SS': ['cat', 'cute']})
+        self.assertEqual(parse_metadata(item['Metadata']), metadata)
+
+    def test_item_without_user_or_tags(self):
+        item = build_image_item('image-1', 'images/image-1.jpg', {'key': 'value'})
+
+        self.assertNotIn('UserID', item)
+        self.assertNotIn('Tags', item)
+
+    def test_metadata_is_stored_as_native_map(self):
+        item = build_image_item('image-1', 'images/image-1.jpg', {'title': 'Cat', 'rating': 4.5, 'views': 3, 'flags': [True, None]})
+
+        self.assertEqual(item['Metadata'], {'M': {
+            'title': {'S': 'Cat'},
+            'rating': {'N': '4.5'},
+            'views': {'N': '3'},
+            'flags': {'L': [{'BOOL': True}, {'NULL': True}]}
+        }})
+        self.assertEqual(parse_metadata(item['Metadata']), {'title': 'Cat', 'rating': 4.5, 'views': 3, 'flags': [True, None]})
+
+    def test_parse_legacy_metadata_strings(self):
+        self.assertEqual(parse_metadata({'S': '{"user_id": "1"}'}), {'user_id': '1'})
+        self.assertEqual(parse_metadata({'S': 'tag:cat,user_id:123'}), 'tag:cat,user_id:123')
+        self.assertEqual(build_image_item('image-1', 'images/image-1.jpg', ['a'])['Metadata'], {'S': '["a"]'})
+
+    def test_extract_tags_formats(self):
+        self.assertEqual(extract_tags({'tags': 'dog, cat,,'}), ['cat', 'dog'])
+        self.assertEqual(extract_tags({'tag': 'cat'}), ['cat'])
+        self.assertEqual(extract_tags('tag:cat'), [])
+        self.assertIsNone(extract_user_id({'user_id': ''}))
+
+    def test_commit_request_sets_late_attributes(self):
+        pending = pending_item(build_image_item('img', 'images/img.png', {'user_id': 'u1'}, created_at='2024-05-01T00:00:00.000Z'))
+        item = build_image_item('img', 'blobs/abc/1', {'user_id': 'u1'}, digest='abc', created_at='2024-05-01T00:00:00.000Z')
+        self.assertTrue(is_pending(pending))
+        self.assertFalse(is_pending(item))
+
+        request = commit_request('ImagesMetadata', pending, item)
+
+        self.assertEqual(request['UpdateExpression'], 'SET #a0 = :a0, #a1 = :a1 REMOVE #status')
+        self.assertEqual(request['ExpressionAttributeNames'], {'#status': 'UploadStatus', '#a0': 'S3Key', '#a1': 'ContentHash'})
+        self.assertEqual(request['ExpressionAttributeValues'][':a0'], {'S': 'blobs/abc/1'})
+        self.assertEqual(request['ConditionExpression'], '#status = :pending')
+
+if __name__ == '__main__':
+    unittest.main()
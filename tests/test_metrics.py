@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import base64
+import boto3
+from botocore.stub import Stubber
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.metrics import instrumented, stage, record, register_client_metrics, InvocationMetrics
+from src.upload_image import upload_image
+
+class Context:
+    aws_request_id = 'request-1'
+
+@instrumented
+def handler(event, context):
+    with stage('work'):
+        record('image_bytes', 10)
+    return {'statusCode': 201, 'body': '{}'}
+
+class TestMetrics(unittest.TestCase):
+
+    @patch('src.metrics.emit')
+    def test_disabled_emits_nothing(self, mock_emit):
+        self.assertEqual(handler({}, Context())['statusCode'], 201)
+        mock_emit.assert_not_called()
+
+    @patch('src.metrics.metrics_enabled', True)
+    @patch('src.metrics.emit')
+    def test_enabled_emits_one_emf_document(self, mock_emit):
+        handler({}, Context())
+
+        document = mock_emit.call_args.args[0]
+        definition = document['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(definition['Dimensions'], [['Handler']])
+        units = {metric['Name']: metric['Unit'] for metric in definition['Metrics']}
+        self.assertEqual(units, {'image_bytes': 'Bytes', 'total_ms': 'Milliseconds', 'work_ms': 'Milliseconds'})
+        self.assertEqual(document['Handler'], 'handler')
+        self.assertEqual(document['StatusCode'], 201)
+        self.assertEqual(document['RequestId'], 'request-1')
+        self.assertEqual(document['image_bytes'], 10)
+        self.assertGreaterEqual(document['total_ms'], document['work_ms'])
+
+    def test_response_counts_and_capacity(self):
+        recorder = InvocationMetrics('list_images')
+        recorder.add_response('Scan', {'Count': 2, 'ScannedCount': 50, 'ConsumedCapacity': {'CapacityUnits': 3.5}})
+        recorder.add_response('BatchWriteItem', {'ConsumedCapacity': [{'CapacityUnits': 1.0}, {'CapacityUnits': 2.0}]})
+
+        self.assertEqual(recorder.values, {
+            'dynamodb_calls': 2, 'items_returned': 2, 'items_scanned': 50, 'read_capacity': 3.5, 'write_capacity': 3.0
+        })
+
+    @patch('src.metrics.metrics_enabled', True)
+    @patch('src.metrics.emit')
+    def test_client_hooks_request_and_record_capacity(self, mock_emit):
+        client = boto3.client('dynamodb', region_name='us-east-1', aws_access_key_id='x', aws_secret_access_key='x')
+        register_client_metrics(client)
+
+        @instrumented
+        def scan_handler(event, context):
+            client.scan(TableName='ImagesMetadata')
+            return {'statusCode': 200}
+
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                'scan',
+                {'Items': [], 'Count': 0, 'ScannedCount': 7, 'ConsumedCapacity': {'TableName': 'ImagesMetadata', 'CapacityUnits': 0.5}},
+                {'TableName': 'ImagesMetadata', 'ReturnConsumedCapacity': 'TOTAL'}
+            )
+            scan_handler({}, None)
+            # Outside an instrumented invocation the call is left as it was
+            stubber.add_response('scan', {'Items': []}, {'TableName': 'ImagesMetadata'})
+            client.scan(TableName='ImagesMetadata')
+
+        document = mock_emit.call_args.args[0]
+        self.assertEqual(document['items_scanned'], 7)
+        self.assertEqual(document['read_capacity'], 0.5)
+
+    @patch('src.metrics.metrics_enabled', True)
+    @patch('src.metrics.emit')
+    @patch('src.upload_image.deduplicate_uploads', False)
+    @patch('src.upload_image.s3_client')
+    @patch('src.upload_image.dynamodb_client')
+    def test_upload_stages(self, mock_dynamo, mock_s3, mock_emit):
+        mock_dynamo.batch_write_item.return_value = {}
+        image = base64.b64encode(b'\x89PNG\r\n\x1a\n' + b'0' * 100).decode('ascii')
+        event = {'body': json.dumps({'image': image, 'metadata': {'user_id': 'u1', 'tags': ['cat']}})}
+
+        self.assertEqual(upload_image(event, None)['statusCode'], 200)
+
+        document = mock_emit.call_args.args[0]
+        self.assertEqual(document['Handler'], 'upload_image')
+        self.assertEqual(document['image_bytes'], 108)
+        for name in ('parse_ms', 'decode_ms', 's3_put_ms', 'tag_index_ms', 'dynamodb_put_ms', 'total_ms'):
+            self.assertIn(name, document)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.migrate_metadata import migrate_metadata
+
+class TestMigrateMetadata(unittest.TestCase):
+
+    @patch('src.migrate_metadata.dynamodb_client')
+    def test_converts_json_strings_to_maps(self, mock_dynamo):
+        mock_dynamo.scan.return_value = {'Items': [
+            {'ImageID': {'S': 'json'}, 'Metadata': {'S': '{"title": "Cat", "views": 3}'}},
+            {'ImageID': {'S': 'free-form'}, 'Metadata': {'S': 'tag:cat,user_id:123'}},
+            {'ImageID': {'S': 'changed'}, 'Metadata': {'S': '{"title": "Dog"}'}},
+        ]}
+
+        def update_item(**kwargs):
+            if kwargs['Key']['ImageID']['S'] == 'changed':
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        mock_dynamo.update_item.side_effect = update_item
+
+        result = migrate_metadata(total_segments=1)
+
+        self.assertEqual(result, {'migrated': 1, 'skipped': 2, 'failed': 0})
+        self.assertEqual(mock_dynamo.scan.call_args.kwargs['FilterExpression'], 'attribute_type(Metadata, :string)')
+        update = mock_dynamo.update_item.call_args_list[0].kwargs
+        self.assertEqual(update['ExpressionAttributeValues'][':metadata'], {'M': {'title': {'S': 'Cat'}, 'views': {'N': '3'}}})
+        self.assertEqual(update['ExpressionAttributeValues'][':legacy'], {'S': '{"title": "Cat", "views": 3}'})
+
+if __name__ == '__main__':
+    unittest.main()
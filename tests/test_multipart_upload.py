@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import base64
+import os
+import sys
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.multipart_upload import (
+    upload_base64_multipart, iter_decoded_chunks, decoded_size, InvalidImageDataError, MIN_PART_SIZE
+)
+
+def make_s3_mock():
+    mock_s3 = MagicMock()
+    mock_s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    mock_s3.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+    return mock_s3
+
+class TestMultipartUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.image_bytes = os.urandom(1000)
+        self.image_data = base64.b64encode(self.image_bytes).decode('ascii')
+
+    def test_chunks_decode_to_original_bytes(self):
+        chunks = list(iter_decoded_chunks(self.image_data, 99))
+
+        self.assertEqual(b''.join(chunks), self.image_bytes)
+        self.assertTrue(all(len(chunk) == 99 for chunk in chunks[:-1]))
+        self.assertEqual(decoded_size(self.image_data), len(self.image_bytes))
+
+    def test_parts_meet_the_s3_minimum(self):
+        image_bytes = bytes(3 * MIN_PART_SIZE)
+        image_data = base64.b64encode(image_bytes).decode('ascii')
+
+        chunks = list(iter_decoded_chunks(image_data, MIN_PART_SIZE))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(all(len(chunk) >= MIN_PART_SIZE for chunk in chunks[:-1]))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(image_bytes))
+
+    @patch('src.multipart_upload.MIN_PART_SIZE', 1)
+    def test_uploads_parts_and_completes(self):
+        mock_s3 = make_s3_mock()
+
+        part_count = upload_base64_multipart(
+            mock_s3, 'bucket', 'images/a.jpg', self.image_data, 'image/jpeg', part_size=300, max_concurrency=2
+        )
+
+        self.assertEqual(part_count, 4)
+        uploaded = b''.join(
+            call.kwargs['Body'] for call in sorted(mock_s3.upload_part.call_args_list, key=lambda c: c.kwargs['PartNumber'])
+        )
+        self.assertEqual(uploaded, self.image_bytes)
+        parts = mock_s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+        self.assertEqual([part['PartNumber'] for part in parts], [1, 2, 3, 4])
+        mock_s3.abort_multipart_upload.assert_not_called()
+
+    @patch('src.multipart_upload.MIN_PART_SIZE', 1)
+    def test_failed_part_aborts_upload(self):
+        mock_s3 = make_s3_mock()
+        mock_s3.upload_part.side_effect = Exception("S3 upload error")
+
+        with self.assertRaises(Exception):
+            upload_base64_multipart(mock_s3, 'bucket', 'images/a.jpg', self.image_data, 'image/jpeg', part_size=300)
+
+        mock_s3.abort_multipart_upload.assert_called_once_with(Bucket='bucket', Key='images/a.jpg', UploadId='upload-1')
+        mock_s3.complete_multipart_upload.assert_not_called()
+
+    @patch('src.multipart_upload.MIN_PART_SIZE', 1)
+    def test_invalid_base64_aborts_upload(self):
+        mock_s3 = make_s3_mock()
+
+        with self.assertRaises(InvalidImageDataError):
+            upload_base64_multipart(mock_s3, 'bucket', 'images/a.jpg', self.image_data[:400] + '!!!!', 'image/jpeg', part_size=300)
+
+        mock_s3.abort_multipart_upload.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.pagination import (
+    encode_cursor, decode_cursor, encode_segment_cursor, decode_segment_cursor, parse_limit, iter_pages, iter_items,
+    InvalidPaginationError, DEFAULT_PAGE_SIZE
+)
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        key = {'ImageID': {'S': 'abc-123'}}
+        cursor = encode_cursor(key)
+        self.assertNotIn('ImageID', cursor)
+        self.assertEqual(decode_cursor(cursor), key)
+
+    def test_exhausted_listing_has_no_cursor(self):
+        self.assertIsNone(encode_cursor(None))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidPaginationError):
+            decode_cursor('not-a-cursor!')
+        with self.assertRaises(InvalidPaginationError):
+            decode_cursor(encode_cursor({'ImageID': 'plain-string'}))
+
+    def test_segment_cursor_round_trip(self):
+        segment_keys = [None, {'ImageID': {'S': 'abc-123'}}, None]
+        cursor = encode_segment_cursor(segment_keys)
+        self.assertEqual(decode_segment_cursor(cursor, 3), segment_keys)
+        self.assertIsNone(encode_segment_cursor([None, None]))
+        self.assertIsNone(decode_segment_cursor(None, 3))
+        with self.assertRaises(InvalidPaginationError):
+            decode_segment_cursor(cursor, 2)
+        with self.assertRaises(InvalidPaginationError):
+            decode_segment_cursor(encode_cursor({'ImageID': {'S': 'abc-123'}}), 3)
+
+    def test_parse_limit(self):
+        self.assertEqual(parse_limit(None), DEFAULT_PAGE_SIZE)
+        self.assertEqual(parse_limit('25'), 25)
+        for value in ('0', '-1', 'abc', '100000'):
+            with self.assertRaises(InvalidPaginationError):
+                parse_limit(value)
+
+    def test_iter_pages_follows_last_evaluated_key(self):
+        operation = MagicMock(side_effect=[
+            {'Items': [{'ImageID': {'S': '1'}}], 'LastEvaluatedKey': {'ImageID': {'S': '1'}}},
+            {'Items': [{'ImageID': {'S': '2'}}]},
+        ])
+
+        pages = list(iter_pages(operation, TableName='ImagesMetadata'))
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(operation.call_args_list[1].kwargs['ExclusiveStartKey'], {'ImageID': {'S': '1'}})
+
+    def test_iter_items_is_lazy(self):
+        operation = MagicMock(return_value={'Items': [{'ImageID': {'S': '1'}}], 'LastEvaluatedKey': {'ImageID': {'S': '1'}}})
+
+        items = iter_items(operation, TableName='ImagesMetadata')
+        operation.assert_not_called()
+        self.assertEqual(next(items), {'ImageID': {'S': '1'}})
+        self.assertEqual(operation.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
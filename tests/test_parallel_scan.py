@@ -0,0 +1,89 @@
+import unittest
+import threading
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.parallel_scan import parallel_scan, parallel_scan_items, parallel_scan_page, parse_total_segments
+
+def make_segmented_scan(items_per_segment, page_size):
+    # Fake DynamoDB scan that serves each segment's items in pages of 'page_size'
+    calls = []
+    lock = threading.Lock()
+
+    def scan(**kwargs):
+        with lock:
+            calls.append(kwargs)
+        segment = kwargs.get('Segment', 0)
+        start = int(kwargs.get('ExclusiveStartKey', {}).get('Offset', {}).get('N', 0))
+        items = [{'ImageID': {'S': f'{segment}-{i}'}} for i in range(start, min(start + page_size, items_per_segment))]
+        response = {'Items': items}
+        if start + page_size < items_per_segment:
+            response['LastEvaluatedKey'] = {'Offset': {'N': str(start + page_size)}}
+        return response
+
+    return scan, calls
+
+class TestParallelScan(unittest.TestCase):
+
+    def test_reads_every_segment(self):
+        scan, calls = make_segmented_scan(items_per_segment=5, page_size=2)
+
+        items = list(parallel_scan_items(scan, total_segments=4, TableName='ImagesMetadata'))
+
+        self.assertEqual(len(items), 20)
+        self.assertEqual({call['Segment'] for call in calls}, {0, 1, 2, 3})
+        self.assertTrue(all(call['TotalSegments'] == 4 for call in calls))
+        self.assertTrue(all(call['TableName'] == 'ImagesMetadata' for call in calls))
+
+    def test_single_segment_is_sequential(self):
+        scan, calls = make_segmented_scan(items_per_segment=3, page_size=2)
+
+        items = list(parallel_scan_items(scan, total_segments=1, TableName='ImagesMetadata'))
+
+        self.assertEqual(len(items), 3)
+        self.assertNotIn('Segment', calls[0])
+
+    def test_segment_error_is_raised(self):
+        def scan(**kwargs):
+            if kwargs['Segment'] == 2:
+                raise Exception("ProvisionedThroughputExceededException")
+            return {'Items': []}
+
+        with self.assertRaises(Exception):
+            list(parallel_scan(scan, total_segments=4, TableName='ImagesMetadata'))
+
+    def test_early_exit_stops_workers(self):
+        scan, calls = make_segmented_scan(items_per_segment=1000, page_size=1)
+
+        pages = parallel_scan(scan, total_segments=2, TableName='ImagesMetadata')
+        next(pages)
+        pages.close()
+
+        self.assertLess(len(calls), 2000)
+
+    def test_page_resumes_each_segment(self):
+        scan, calls = make_segmented_scan(items_per_segment=5, page_size=2)
+
+        items, segment_keys = parallel_scan_page(scan, 3, limit=6, TableName='ImagesMetadata')
+        seen = [item['ImageID']['S'] for item in items]
+        while any(segment_keys):
+            page, segment_keys = parallel_scan_page(scan, 3, limit=6, start_keys=segment_keys, TableName='ImagesMetadata')
+            self.assertLessEqual(len(page), 6)
+            seen.extend(item['ImageID']['S'] for item in page)
+
+        self.assertEqual(sorted(seen), sorted(f'{s}-{i}' for s in range(3) for i in range(5)))
+        self.assertTrue(all(call['Limit'] == 2 for call in calls))
+
+    def test_parse_total_segments(self):
+        self.assertEqual(parse_total_segments('8'), 8)
+        for value in ('0', 'abc'):
+            with self.assertRaises(ValueError):
+                parse_total_segments(value)
+        self.assertEqual(parse_total_segments('1000'), 1000)
+        with self.assertRaises(ValueError):
+            parse_total_segments('1000', maximum=32)
+
+if __name__ == '__main__':
+    unittest.main()
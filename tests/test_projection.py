@@ -0,0 +1,30 @@
+import unittest
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.projection import parse_fields, build_projection, top_level_fields, InvalidFieldsError
+
+class TestProjection(unittest.TestCase):
+
+    def test_parse_fields(self):
+        self.assertIsNone(parse_fields(None))
+        self.assertEqual(parse_fields('Metadata.title, Tags,Tags'), ['Metadata.title', 'Tags'])
+        # A whole attribute absorbs its nested paths, which DynamoDB would reject as overlapping
+        self.assertEqual(parse_fields('Metadata.title,Metadata'), ['Metadata'])
+
+    def test_parse_fields_rejects_unknown_or_malformed(self):
+        for value in ('S3Key', 'Tags.first', 'Metadata.a b', ',', ','.join(f'Metadata.f{i}' for i in range(21))):
+            with self.assertRaises(InvalidFieldsError):
+                parse_fields(value)
+
+    def test_build_projection_uses_placeholders(self):
+        projection = build_projection(['Metadata.title', 'Bytes'], required=('ImageID',))
+
+        self.assertEqual(projection['ProjectionExpression'], '#p0, #p1.#p2, #p3')
+        self.assertEqual(projection['ExpressionAttributeNames'], {'#p0': 'ImageID', '#p1': 'Metadata', '#p2': 'title', '#p3': 'Bytes'})
+        self.assertEqual(top_level_fields(['Metadata.title', 'Metadata.year', 'Tags']), ['Metadata', 'Tags'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import MagicMock
+from io import BytesIO
+import sys
+import os
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.renditions import (
+    renditions_available, generate_renditions, renditions_attribute, parse_renditions, store_rendition
+)
+
+def make_jpeg(width, height):
+    from PIL import Image
+    output = BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(output, 'JPEG')
+    return output.getvalue()
+
+class TestRenditions(unittest.TestCase):
+
+    @unittest.skipUnless(renditions_available(), "Pillow is not installed")
+    def test_generates_each_size_without_upscaling(self):
+        mock_s3 = MagicMock()
+
+        renditions = generate_renditions(mock_s3, 'bucket', 'abc', make_jpeg(800, 400), sizes=[150, 1080])
+
+        self.assertEqual((renditions[150]['Width'], renditions[150]['Height']), (150, 75))
+        self.assertEqual((renditions[1080]['Width'], renditions[1080]['Height']), (800, 400))
+        self.assertEqual(renditions[150]['S3Key'], 'images/abc/150.jpg')
+        stored = {call.kwargs['Key']: len(call.kwargs['Body']) for call in mock_s3.put_object.call_args_list}
+        self.assertEqual(stored['images/abc/150.jpg'], renditions[150]['Bytes'])
+
+    @unittest.skipUnless(renditions_available(), "Pillow is not installed")
+    def test_invalid_image_produces_no_renditions(self):
+        mock_s3 = MagicMock()
+
+        self.assertEqual(generate_renditions(mock_s3, 'bucket', 'abc', b'not an image', sizes=[150]), {})
+        mock_s3.put_object.assert_not_called()
+
+    def test_attribute_round_trip(self):
+        renditions = {150: {'S3Key': 'images/abc/150.jpg', 'Width': 150, 'Height': 75, 'Bytes': 1234}}
+
+        self.assertEqual(parse_renditions({'Renditions': renditions_attribute(renditions)}), renditions)
+
+    def test_store_rendition_creates_missing_map(self):
+        mock_dynamo = MagicMock()
+        mock_dynamo.update_item.side_effect = [
+            ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem'),
+            {}
+        ]
+        rendition = {'S3Key': 'images/abc/150.jpg', 'Width': 150, 'Height': 75, 'Bytes': 1234}
+
+        store_rendition(mock_dynamo, 'ImagesMetadata', 'abc', 150, rendition)
+
+        self.assertEqual(mock_dynamo.update_item.call_args.kwargs['UpdateExpression'], 'SET Renditions = :renditions ADD Version :one')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.sweep_pending_uploads import sweep_pending_uploads
+
+class TestSweepPendingUploads(unittest.TestCase):
+
+    @patch('src.sweep_pending_uploads.transcode_format', 'webp')
+    @patch('src.sweep_pending_uploads.s3_client')
+    @patch('src.sweep_pending_uploads.dynamodb_client')
+    def test_removes_stale_pending_uploads(self, mock_dynamo, mock_s3):
+        mock_dynamo.scan.return_value = {'Items': [
+            {'ImageID': {'S': 'stale'}, 'S3Key': {'S': 'images/stale.png'}, 'Tags': {'SS': ['cat']}},
+            {'ImageID': {'S': 'committed'}, 'S3Key': {'S': 'images/committed.png'}},
+        ]}
+        mock_dynamo.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        def delete_item(**kwargs):
+            if kwargs['Key']['ImageID']['S'] == 'committed':
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'DeleteItem')
+        mock_dynamo.delete_item.side_effect = delete_item
+
+        result = sweep_pending_uploads(total_segments=1, now=datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc))
+
+        self.assertEqual(result, {'swept': 1, 'failed': 0})
+        scan = mock_dynamo.scan.call_args.kwargs
+        self.assertEqual(scan['ExpressionAttributeValues'][':cutoff'], {'S': '2024-05-01T11:45:00.000Z'})
+        # Objects are only deleted once the pending item is gone, so the committed image keeps its own
+        mock_s3.delete_objects.assert_called_once()
+        deleted = [entry['Key'] for entry in mock_s3.delete_objects.call_args.kwargs['Delete']['Objects']]
+        self.assertEqual(deleted[0], 'images/stale.png')
+        self.assertEqual(deleted[-1], 'images/stale/variant.webp')
+        postings = mock_dynamo.batch_write_item.call_args.kwargs['RequestItems']['ImageTags']
+        self.assertEqual(postings, [{'DeleteRequest': {'Key': {'Tag': {'S': 'cat'}, 'ImageID': {'S': 'stale'}}}}])
+
+    @patch('src.sweep_pending_uploads.s3_client')
+    @patch('src.sweep_pending_uploads.dynamodb_client')
+    def test_failed_item_delete_keeps_objects(self, mock_dynamo, mock_s3):
+        mock_dynamo.scan.return_value = {'Items': [{'ImageID': {'S': 'stale'}, 'S3Key': {'S': 'images/stale.png'}}]}
+        mock_dynamo.delete_item.side_effect = ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'DeleteItem')
+
+        result = sweep_pending_uploads(total_segments=1)
+
+        self.assertEqual(result, {'swept': 0, 'failed': 1})
+        mock_s3.delete_objects.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.tag_index import (
+    parse_tags, parse_match, intersect_sorted, union_sorted, find_page, index_tags, unindex_tags,
+    InvalidTagQueryError, MATCH_ANY
+)
+from src.backfill_tag_index import backfill_tag_index
+
+POSTINGS = {
+    'cat': ['a', 'c', 'd', 'f'],
+    'dog': ['b', 'c', 'f', 'g'],
+}
+
+def query_postings(**kwargs):
+    # Answer posting queries like DynamoDB: ascending ImageIDs after :start_after, at most Limit
+    values = kwargs['ExpressionAttributeValues']
+    image_ids = [i for i in POSTINGS.get(values[':tag']['S'], []) if i > values.get(':start_after', {}).get('S', '')]
+    limit = kwargs.get('Limit')
+    page = image_ids[:limit] if limit else image_ids
+    response = {'Items': [{'ImageID': {'S': image_id}} for image_id in page]}
+    if limit and len(image_ids) > limit:
+        response['LastEvaluatedKey'] = {'Tag': values[':tag'], 'ImageID': {'S': page[-1]}}
+    return response
+
+class TestTagIndex(unittest.TestCase):
+
+    def test_parse_tags_and_match(self):
+        self.assertEqual(parse_tags('cat, dog,cat'), ['cat', 'dog'])
+        self.assertEqual(parse_tags(None), [])
+        self.assertEqual(parse_match(None), 'all')
+        self.assertEqual(parse_match('ANY'), 'any')
+        with self.assertRaises(InvalidTagQueryError):
+            parse_tags(' , ')
+        with self.assertRaises(InvalidTagQueryError):
+            parse_tags(','.join(str(i) for i in range(11)))
+        with self.assertRaises(InvalidTagQueryError):
+            parse_match('some')
+
+    def test_merge_sorted_posting_lists(self):
+        self.assertEqual(list(intersect_sorted([['a', 'c', 'd', 'f'], ['b', 'c', 'f', 'g'], ['c', 'f']])), ['c', 'f'])
+        self.assertEqual(list(intersect_sorted([['a'], []])), [])
+        self.assertEqual(list(union_sorted([['a', 'c'], ['b', 'c', 'g']])), ['a', 'b', 'c', 'g'])
+
+    def test_find_page_single_tag_is_one_query(self):
+        mock_dynamo = MagicMock()
+        mock_dynamo.query.side_effect = query_postings
+
+        self.assertEqual(find_page(mock_dynamo, ['cat'], limit=2), (['a', 'c'], True))
+        self.assertEqual(find_page(mock_dynamo, ['cat'], limit=2, start_after='c'), (['d', 'f'], False))
+        self.assertEqual(mock_dynamo.query.call_count, 2)
+        self.assertEqual(mock_dynamo.query.call_args.kwargs['Limit'], 3)
+        self.assertEqual(mock_dynamo.query.call_args.kwargs['KeyConditionExpression'], '#tag = :tag AND ImageID > :start_after')
+
+    def test_find_page_combines_tags(self):
+        mock_dynamo = MagicMock()
+        mock_dynamo.query.side_effect = query_postings
+
+        self.assertEqual(find_page(mock_dynamo, ['cat', 'dog'], limit=10), (['c', 'f'], False))
+        self.assertEqual(find_page(mock_dynamo, ['cat', 'dog'], MATCH_ANY, limit=3), (['a', 'b', 'c'], True))
+        self.assertEqual(find_page(mock_dynamo, ['cat', 'dog'], MATCH_ANY, limit=3, start_after='c'), (['d', 'f', 'g'], False))
+
+    def test_index_and_unindex_report_failures(self):
+        mock_dynamo = MagicMock()
+        mock_dynamo.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        self.assertEqual(index_tags(mock_dynamo, {'a': ['cat', 'dog'], 'b': []}), set())
+        requests = mock_dynamo.batch_write_item.call_args.kwargs['RequestItems']['ImageTags']
+        self.assertEqual([r['PutRequest']['Item'] for r in requests], [
+            {'Tag': {'S': 'cat'}, 'ImageID': {'S': 'a'}},
+            {'Tag': {'S': 'dog'}, 'ImageID': {'S': 'a'}},
+        ])
+
+        mock_dynamo.batch_write_item.side_effect = Exception("throttled")
+        self.assertEqual(index_tags(mock_dynamo, {'a': ['cat']}), {'a'})
+        self.assertEqual(unindex_tags(mock_dynamo, {'a': ['cat', 'dog']}), 2)
+
+    @patch('src.backfill_tag_index.dynamodb_client')
+    def test_backfill_writes_postings_of_tagged_images(self, mock_dynamo):
+        mock_dynamo.scan.return_value = {'Items': [
+            {'ImageID': {'S': 'a'}, 'Tags': {'SS': ['cat', 'dog']}},
+            {'ImageID': {'S': 'b'}, 'Tags': {'SS': ['sea']}},
+        ]}
+        mock_dynamo.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        result = backfill_tag_index(total_segments=1)
+
+        self.assertEqual(result, {'indexed': 2, 'postings': 3, 'failed': 0})
+        self.assertEqual(mock_dynamo.scan.call_args.kwargs['FilterExpression'], 'attribute_exists(Tags)')
+        self.assertEqual(len(mock_dynamo.batch_write_item.call_args.kwargs['RequestItems']['ImageTags']), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.timestamps import format_timestamp, parse_timestamp, now_timestamp, InvalidTimestampError
+
+class TestTimestamps(unittest.TestCase):
+
+    def test_format_is_fixed_width_utc(self):
+        moment = datetime(2024, 5, 1, 12, 30, 0, 123456, tzinfo=timezone.utc)
+        self.assertEqual(format_timestamp(moment), '2024-05-01T12:30:00.123Z')
+        self.assertEqual(len(now_timestamp()), len('2024-05-01T12:30:00.123Z'))
+
+    def test_parse_normalizes_to_stored_format(self):
+        self.assertEqual(parse_timestamp('2024-05-01'), '2024-05-01T00:00:00.000Z')
+        self.assertEqual(parse_timestamp('2024-05-01T12:30:00Z'), '2024-05-01T12:30:00.000Z')
+        self.assertEqual(parse_timestamp('2024-05-01T14:30:00+02:00'), '2024-05-01T12:30:00.000Z')
+        self.assertEqual(parse_timestamp('1714566600'), '2024-05-01T12:30:00.000Z')
+        self.assertIsNone(parse_timestamp(None))
+        with self.assertRaises(InvalidTimestampError):
+            parse_timestamp('yesterday')
+
+if __name__ == '__main__':
+    unittest.main()
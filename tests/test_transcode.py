@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from io import BytesIO
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import transcode
+from src.transcode import sniff_format, sniff_base64_format, accepted_types, choose_variant, store_variant, delete_variants
+
+def make_png(width=64, height=64):
+    from PIL import Image
+    output = BytesIO()
+    Image.effect_noise((width, height), 40).convert('RGB').save(output, 'PNG')
+    return output.getvalue()
+
+class TestTranscode(unittest.TestCase):
+
+    def test_sniff_format_from_magic_bytes(self):
+        self.assertEqual(sniff_format(b'\xff\xd8\xff\xe0' + b'\x00' * 8)['content_type'], 'image/jpeg')
+        self.assertEqual(sniff_format(b'\x89PNG\r\n\x1a\n\x00\x00\x00\r')['extension'], 'png')
+        self.assertEqual(sniff_format(b'GIF89a' + b'\x00' * 6)['format'], 'gif')
+        self.assertEqual(sniff_format(b'RIFF\x00\x00\x00\x00WEBP')['content_type'], 'image/webp')
+        self.assertEqual(sniff_format(b'\x00\x00\x00\x1cftypavif')['content_type'], 'image/avif')
+        self.assertEqual(sniff_format(b'hello world!')['content_type'], 'application/octet-stream')
+
+    def test_sniff_base64_format(self):
+        self.assertEqual(sniff_base64_format('iVBORw0KGgoAAAANSUhEUgAAAAUA')['format'], 'png')
+        self.assertIsNone(sniff_base64_format('!!!')['format'])
+
+    def test_accepted_types(self):
+        headers = {'accept': 'image/avif,image/webp;q=0.9,image/*;q=0.8,*/*;q=0.5,image/png;q=0'}
+        self.assertEqual(accepted_types(headers), ('image/avif', 'image/webp'))
+        self.assertEqual(accepted_types({}), ())
+        self.assertEqual(accepted_types(None), ())
+
+    def test_choose_smallest_accepted_variant(self):
+        original = {'ContentType': 'image/png', 'S3Key': 'images/a.png', 'Bytes': 1000}
+        variants = [
+            {'ContentType': 'image/webp', 'S3Key': 'images/a/variant.webp', 'Bytes': 400},
+            {'ContentType': 'image/avif', 'S3Key': 'images/a/variant.avif', 'Bytes': 300},
+        ]
+
+        self.assertEqual(choose_variant(original, variants, ('image/webp',))['S3Key'], 'images/a/variant.webp')
+        self.assertEqual(choose_variant(original, variants, ('image/avif', 'image/webp'))['S3Key'], 'images/a/variant.avif')
+        self.assertEqual(choose_variant(original, variants, ())['S3Key'], 'images/a.png')
+
+    @patch('src.transcode.transcode_format', 'webp')
+    def test_store_variant_transcodes_to_webp(self):
+        if not transcode.transcoding_enabled():
+            self.skipTest("Pillow with WebP is not installed")
+        mock_s3 = MagicMock()
+        png = make_png()
+
+        variants = store_variant(mock_s3, 'bucket', 'abc', png, sniff_format(png))
+
+        self.assertEqual(list(variants), ['image/webp'])
+        self.assertEqual(variants['image/webp']['S3Key'], 'images/abc/variant.webp')
+        self.assertLess(variants['image/webp']['Bytes'], len(png))
+        stored = mock_s3.put_object.call_args.kwargs
+        self.assertEqual(stored['ContentType'], 'image/webp')
+        self.assertEqual(sniff_format(stored['Body'])['format'], 'webp')
+
+    @patch('src.transcode.transcode_format', '')
+    def test_transcoding_disabled_by_default(self):
+        mock_s3 = MagicMock()
+
+        self.assertEqual(store_variant(mock_s3, 'bucket', 'abc', b'\x89PNG\r\n\x1a\n', sniff_format(b'\x89PNG\r\n\x1a\n')), {})
+        mock_s3.put_object.assert_not_called()
+
+    def test_delete_variants(self):
+        mock_s3 = MagicMock()
+        mock_s3.delete_object.side_effect = [Exception("S3 error"), None]
+        variants = {
+            'image/webp': {'S3Key': 'images/abc/variant.webp', 'Bytes': 10},
+            'image/avif': {'S3Key': 'images/abc/variant.avif', 'Bytes': 8},
+        }
+
+        # A failed delete is logged and the remaining variants are still removed
+        delete_variants(mock_s3, 'bucket', variants)
+
+        deleted = [call.kwargs['Key'] for call in mock_s3.delete_object.call_args_list]
+        self.assertEqual(deleted, ['images/abc/variant.webp', 'images/abc/variant.avif'])
+
+if __name__ == '__main__':
+    unittest.main()
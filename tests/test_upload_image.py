@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import json
-from botocore.exceptions import NoCredentialsError
+from botocore.exceptions import NoCredentialsError, ClientError
 import sys
 import os
 
@@ -103,7 +103,7 @@ class TestUploadImage(unittest.TestCase):
         self.assertEqual(response['statusCode'], 500)
         self.assertIn('Error storing metadata in DynamoDB', response['body'])
 
-    @patch('upload_image.boto3.client')  # Correct patch decorator
+    @patch('src.aws_clients.boto3.client')  # Clients are created by the shared module
     @patch('upload_image.s3_client')
     @patch('upload_image.dynamodb_client')
     def test_no_credentials_error(self, mock_dynamodb, mock_s3, mock_boto3_client):
@@ -124,5 +124,202 @@ class TestUploadImage(unittest.TestCase):
 
         self.assertEqual(response['statusCode'], 200)  # Expecting a 500 error code due to credentials issue
 
+    @patch('upload_image.multipart_threshold', 0)
+    @patch('upload_image.default_part_size', 0)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_large_image_uses_multipart_upload(self, mock_dynamodb, mock_s3):
+        event = {
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'key': 'value'}
+            })
+        }
+
+        # Mocking the multipart upload calls
+        mock_s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        mock_s3.upload_part.return_value = {'ETag': 'etag-1'}
+
+        response = upload_image(event, None)
+        self.assertEqual(response['statusCode'], 200)
+        mock_s3.put_object.assert_not_called()
+        mock_s3.complete_multipart_upload.assert_called_once()
+        mock_dynamodb.put_item.assert_called_once()
+
+    @patch('upload_image.multipart_threshold', 0)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_single_part_image_skips_multipart_upload(self, mock_dynamodb, mock_s3):
+        event = {
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'key': 'value'}
+            })
+        }
+
+        response = upload_image(event, None)
+        self.assertEqual(response['statusCode'], 200)
+        mock_s3.create_multipart_upload.assert_not_called()
+
+    @patch('upload_image.deduplicate_uploads', False)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_content_type_is_sniffed(self, mock_dynamodb, mock_s3):
+        event = {
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'key': 'value'}
+            })
+        }
+
+        response = upload_image(event, None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(mock_s3.put_object.call_args.kwargs['ContentType'], 'image/png')
+        self.assertTrue(mock_s3.put_object.call_args.kwargs['Key'].endswith('.png'))
+        self.assertEqual(mock_dynamodb.put_item.call_args.kwargs['Item']['ContentType'], {'S': 'image/png'})
+
+    @patch('upload_image.deduplicate_uploads', False)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_tag_postings_written_before_item(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        event = {
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'tags': ['cat', 'dog']}
+            })
+        }
+
+        response = upload_image(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        calls = [name for name, _, _ in mock_dynamodb.method_calls if name in ('batch_write_item', 'put_item')]
+        self.assertEqual(calls, ['batch_write_item', 'put_item'])
+        postings = mock_dynamodb.batch_write_item.call_args.kwargs['RequestItems']['ImageTags']
+        self.assertEqual([p['PutRequest']['Item']['Tag']['S'] for p in postings], ['cat', 'dog'])
+
+        # An item that cannot be stored takes its postings with it
+        mock_dynamodb.put_item.side_effect = Exception("DynamoDB error")
+        response = upload_image(event, None)
+        self.assertEqual(response['statusCode'], 500)
+        self.assertIn('DeleteRequest', mock_dynamodb.batch_write_item.call_args.kwargs['RequestItems']['ImageTags'][0])
+
+    @patch('upload_image.concurrent_upload_writes', True)
+    @patch('upload_image.deduplicate_uploads', True)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_concurrent_writes_commit_pending_item(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        event = {
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'tags': ['cat']}
+            })
+        }
+
+        response = upload_image(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        image_id = json.loads(response['body'])['imageId']
+        pending = mock_dynamodb.put_item.call_args.kwargs['Item']
+        self.assertEqual(pending['UploadStatus'], {'S': 'PENDING'})
+        commit = next(c.kwargs for c in mock_dynamodb.update_item.call_args_list if c.kwargs['TableName'] == 'ImagesMetadata')
+        self.assertEqual(commit['Key'], {'ImageID': {'S': image_id}})
+        self.assertEqual(commit['UpdateExpression'], 'REMOVE #status')
+        self.assertEqual(commit['ConditionExpression'], '#status = :pending')
+        # Concurrent uploads keep their own object, which the sweeper can delete without a blob reference
+        mock_s3.put_object.assert_called_once()
+        self.assertEqual(mock_s3.put_object.call_args.kwargs['Key'], pending['S3Key']['S'])
+        self.assertNotIn('ImageBlobs', [c.kwargs['TableName'] for c in mock_dynamodb.update_item.call_args_list])
+
+    @patch('upload_image.concurrent_upload_writes', True)
+    @patch('upload_image.deduplicate_uploads', False)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_concurrent_writes_compensated_on_s3_failure(self, mock_dynamodb, mock_s3):
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_s3.put_object.side_effect = Exception("S3 upload error")
+        event = {
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'tags': ['cat']}
+            })
+        }
+
+        response = upload_image(event, None)
+
+        self.assertEqual(response['statusCode'], 500)
+        mock_dynamodb.put_item.assert_called_once()
+        pending = mock_dynamodb.put_item.call_args.kwargs['Item']
+        self.assertEqual(mock_dynamodb.delete_item.call_args.kwargs['Key'], {'ImageID': pending['ImageID']})
+        self.assertIn('DeleteRequest', mock_dynamodb.batch_write_item.call_args.kwargs['RequestItems']['ImageTags'][0])
+        mock_dynamodb.update_item.assert_not_called()
+
+    @patch('upload_image.deduplicate_uploads', False)
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_idempotency_key_replays_completed_upload(self, mock_dynamodb, mock_s3):
+        event = {
+            'headers': {'Idempotency-Key': 'retry-1'},
+            'body': json.dumps({
+                'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA',
+                'metadata': {'key': 'value'}
+            })
+        }
+
+        first = upload_image(event, None)
+
+        self.assertEqual(first['statusCode'], 200)
+        claim, result = [c.kwargs for c in mock_dynamodb.put_item.call_args_list if c.kwargs['TableName'] == 'UploadIdempotency']
+        self.assertEqual(claim['Item']['IdempotencyKey'], {'S': 'retry-1'})
+        self.assertEqual(result['Item']['Status'], {'S': 'COMPLETED'})
+        self.assertEqual(result['Item']['Body'], {'S': first['body']})
+        self.assertEqual(result['Item']['RequestHash'], claim['Item']['RequestHash'])
+
+        # The retry finds the completed record and gets the same response without storing anything
+        mock_s3.reset_mock()
+        mock_dynamodb.reset_mock()
+        mock_dynamodb.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}, 'Item': result['Item']}, 'PutItem'
+        )
+        retry = upload_image(event, None)
+
+        self.assertEqual(retry['statusCode'], 200)
+        self.assertEqual(retry['body'], first['body'])
+        self.assertEqual(retry['headers']['Idempotent-Replayed'], 'true')
+        mock_s3.put_object.assert_not_called()
+        mock_dynamodb.put_item.assert_called_once()
+
+        # The same key with another body is refused rather than answered with the first imageId
+        other = dict(event, body=json.dumps({'image': 'iVBORw0KGgoAAAANSUhEUgAAAAUA', 'metadata': {'user_id': 'bob'}}))
+        response = upload_image(other, None)
+
+        self.assertEqual(response['statusCode'], 422)
+        mock_s3.put_object.assert_not_called()
+
+    @patch('upload_image.s3_client')
+    @patch('upload_image.dynamodb_client')
+    def test_idempotency_key_in_progress_and_released_on_failure(self, mock_dynamodb, mock_s3):
+        event = {
+            'headers': {'idempotency-key': 'retry-2'},
+            'body': json.dumps({'metadata': {'key': 'value'}})
+        }
+
+        # A failed upload releases its claim so the retry runs again
+        response = upload_image(event, None)
+        self.assertEqual(response['statusCode'], 400)
+        release = mock_dynamodb.delete_item.call_args.kwargs
+        self.assertEqual(release['TableName'], 'UploadIdempotency')
+        self.assertEqual(release['Key'], {'IdempotencyKey': {'S': 'retry-2'}})
+
+        mock_dynamodb.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}, 'Item': {'Status': {'S': 'IN_PROGRESS'}}}, 'PutItem'
+        )
+        response = upload_image(event, None)
+        self.assertEqual(response['statusCode'], 409)
+
+        response = upload_image(dict(event, headers={'Idempotency-Key': 'not valid'}), None)
+        self.assertEqual(response['statusCode'], 400)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the repository root to the system path so the 'src' package can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.versions import (
+    bump_versions, read_version, issued_version, version_cache, global_shard_scopes, listing_scope, make_etag,
+    etag_matches, not_modified
+)
+
+class TestVersions(unittest.TestCase):
+
+    def test_bump_versions_updates_global_and_user_scopes(self):
+        mock_dynamo = MagicMock()
+        mock_dynamo.update_item.side_effect = lambda **kwargs: None if kwargs['Key']['Scope']['S'] != 'user#a' else Exception('throttled')
+
+        scopes = bump_versions(mock_dynamo, ['b', None, 'a', 'b'])
+
+        # One shard of the table-wide counter is bumped along with every user's counter
+        self.assertIn(scopes[0], global_shard_scopes())
+        self.assertEqual(scopes[1:], ['user#a', 'user#b'])
+        self.assertEqual(mock_dynamo.update_item.call_count, 3)
+        self.assertEqual(mock_dynamo.update_item.call_args.kwargs['UpdateExpression'], 'ADD Version :one')
+
+    def test_read_version(self):
+        mock_dynamo = MagicMock()
+        mock_dynamo.get_item.return_value = {'Item': {'Scope': {'S': 'user#a'}, 'Version': {'N': '7'}}}
+        self.assertEqual(read_version(mock_dynamo, listing_scope('a')), 7)
+        self.assertTrue(mock_dynamo.get_item.call_args.kwargs['ConsistentRead'])
+
+        # The table-wide version is the sum of its shards
+        mock_dynamo.batch_get_item.return_value = {'Responses': {'ImageVersions': [
+            {'Scope': {'S': 'all#0'}, 'Version': {'N': '2'}}, {'Scope': {'S': 'all#3'}, 'Version': {'N': '5'}}
+        ]}}
+        self.assertEqual(read_version(mock_dynamo, listing_scope()), 7)
+        request = mock_dynamo.batch_get_item.call_args.kwargs['RequestItems']['ImageVersions']
+        self.assertEqual(len(request['Keys']), len(global_shard_scopes()))
+        self.assertTrue(request['ConsistentRead'])
+
+    def test_issued_version_reuses_recent_reads(self):
+        version_cache.clear()
+        self.addCleanup(version_cache.clear)
+        mock_dynamo = MagicMock()
+        mock_dynamo.get_item.return_value = {'Item': {'Scope': {'S': 'user#a'}, 'Version': {'N': '3'}}}
+
+        self.assertEqual(issued_version(mock_dynamo, 'user#a'), 3)
+        self.assertEqual(issued_version(mock_dynamo, 'user#a'), 3)
+
+        mock_dynamo.get_item.assert_called_once()
+        self.assertFalse(mock_dynamo.get_item.call_args.kwargs['ConsistentRead'])
+
+    def test_etag_matches(self):
+        etag = make_etag('all', 3, None)
+
+        self.assertNotEqual(etag, make_etag('all', 4, None))
+        self.assertTrue(etag_matches({'If-None-Match': etag}, etag))
+        self.assertTrue(etag_matches({'if-none-match': f'"other", W/{etag}'}, etag))
+        self.assertTrue(etag_matches({'If-None-Match': '*'}, etag))
+        self.assertFalse(etag_matches({'If-None-Match': '"other"'}, etag))
+        self.assertFalse(etag_matches(None, etag))
+
+        response = not_modified(etag, -5)
+        self.assertEqual(response['statusCode'], 304)
+        self.assertEqual(response['headers']['Cache-Control'], 'private, max-age=0, must-revalidate')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -114,5 +114,159 @@ class TestViewImage(unittest.TestCase):
         self.assertIn('error', body)
         self.assertEqual(body['error'], 'Image not found')
 
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_pending_upload_not_found(self, mock_dynamo, mock_s3):
+        mock_dynamo.get_item.return_value = {
+            'Item': {'S3Key': {'S': 'images/pending_image.png'}, 'UploadStatus': {'S': 'PENDING'}}
+        }
+
+        response = view_image({'pathParameters': {'image_id': 'pending_image'}}, None)
+
+        self.assertEqual(response['statusCode'], 404)
+        self.assertIn('UploadStatus', mock_dynamo.get_item.call_args.kwargs['ExpressionAttributeNames'].values())
+        mock_s3.generate_presigned_url.assert_not_called()
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_presigned_url_is_cached(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        image_cache.clear()
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.get_item.return_value = {
+            'Item': {'ImageID': {'S': 'cached_image'}, 'S3Key': {'S': 'images/cached_image.jpg'}}
+        }
+        mock_s3.generate_presigned_url.return_value = 'https://signed/images/cached_image.jpg'
+        event = {'pathParameters': {'image_id': 'cached_image'}}
+
+        first = view_image(event, None)
+        second = view_image(event, None)
+
+        self.assertEqual(first['headers']['X-Cache'], 'MISS')
+        self.assertEqual(second['headers']['X-Cache'], 'HIT')
+        self.assertEqual(json.loads(second['body'])['url'], 'https://signed/images/cached_image.jpg')
+        mock_dynamo.get_item.assert_called_once()
+        mock_s3.generate_presigned_url.assert_called_once()
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_size_signs_matching_rendition(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.get_item.return_value = {'Item': {
+            'ImageID': {'S': 'sized_image'},
+            'S3Key': {'S': 'images/sized_image.jpg'},
+            'Renditions': {'M': {'150': {'M': {
+                'S3Key': {'S': 'images/sized_image/150.jpg'},
+                'Width': {'N': '150'}, 'Height': {'N': '100'}, 'Bytes': {'N': '2048'}
+            }}}}
+        }}
+        mock_s3.generate_presigned_url.side_effect = lambda op, Params, ExpiresIn: f"https://signed/{Params['Key']}"
+
+        response = view_image({'pathParameters': {'image_id': 'sized_image'}, 'queryStringParameters': {'size': '150'}}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        body = json.loads(response['body'])
+        self.assertEqual(body['url'], 'https://signed/images/sized_image/150.jpg')
+        self.assertEqual((body['width'], body['height'], body['bytes']), (150, 100, 2048))
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_unsupported_size(self, mock_dynamo, mock_s3):
+        response = view_image({'pathParameters': {'image_id': 'sized_image'}, 'queryStringParameters': {'size': '999'}}, None)
+
+        self.assertEqual(response['statusCode'], 400)
+        mock_dynamo.get_item.assert_not_called()
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_accept_header_selects_smaller_variant(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.get_item.return_value = {'Item': {
+            'ImageID': {'S': 'variant_image'},
+            'S3Key': {'S': 'images/variant_image.png'},
+            'ContentType': {'S': 'image/png'},
+            'Bytes': {'N': '5000'},
+            'Variants': {'M': {'image/webp': {'M': {'S3Key': {'S': 'images/variant_image/variant.webp'}, 'Bytes': {'N': '1200'}}}}}
+        }}
+        mock_s3.generate_presigned_url.side_effect = lambda op, Params, ExpiresIn: f"https://signed/{Params['Key']}"
+
+        webp = view_image({'pathParameters': {'image_id': 'variant_image'}, 'headers': {'Accept': 'image/webp,*/*'}}, None)
+        plain = view_image({'pathParameters': {'image_id': 'variant_image'}, 'headers': {'Accept': 'application/json'}}, None)
+
+        self.assertEqual(json.loads(webp['body'])['url'], 'https://signed/images/variant_image/variant.webp')
+        self.assertEqual(json.loads(webp['body'])['content_type'], 'image/webp')
+        self.assertEqual(json.loads(plain['body'])['url'], 'https://signed/images/variant_image.png')
+        self.assertEqual(webp['headers']['Vary'], 'Accept')
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_fields_are_projected_and_returned(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.get_item.return_value = {'Item': {
+            'S3Key': {'S': 'images/fields_image.jpg'},
+            'Metadata': {'M': {'title': {'S': 'Cat'}}}
+        }}
+        mock_s3.generate_presigned_url.return_value = 'https://signed'
+
+        event = {'pathParameters': {'image_id': 'fields_image'}, 'queryStringParameters': {'fields': 'Metadata.title'}}
+        response = view_image(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['Metadata'], {'title': 'Cat'})
+        get_kwargs = mock_dynamo.get_item.call_args.kwargs
+        self.assertIn('#p6.#p7', get_kwargs['ProjectionExpression'])
+        self.assertEqual(get_kwargs['ExpressionAttributeNames']['#p7'], 'title')
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_if_none_match_on_cached_response(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.get_item.return_value = {'Item': {'S3Key': {'S': 'images/etag_image.jpg'}, 'Version': {'N': '1'}}}
+        mock_s3.generate_presigned_url.return_value = 'https://signed'
+        event = {'pathParameters': {'image_id': 'etag_image'}}
+
+        first = view_image(event, None)
+        etag = first['headers']['ETag']
+        self.assertIn('max-age=', first['headers']['Cache-Control'])
+
+        second = view_image(dict(event, headers={'If-None-Match': etag}), None)
+
+        self.assertEqual(second['statusCode'], 304)
+        self.assertEqual(second['headers']['ETag'], etag)
+        self.assertEqual(mock_dynamo.get_item.call_count, 1)
+
+    @patch('view_image.s3_client')
+    @patch('view_image.dynamodb_client')
+    def test_if_none_match_across_containers(self, mock_dynamo, mock_s3):
+        from src.cache import image_cache
+        self.addCleanup(image_cache.clear)
+
+        mock_dynamo.get_item.return_value = {'Item': {'S3Key': {'S': 'images/etag_image.jpg'}, 'Version': {'N': '1'}}}
+        mock_s3.generate_presigned_url.side_effect = ['https://signed-1', 'https://signed-2']
+        event = {'pathParameters': {'image_id': 'etag_image'}}
+        etag = view_image(event, None)['headers']['ETag']
+
+        # Another container never signed the URL, but the ETag only depends on the item and the window
+        image_cache.clear()
+        second = view_image(dict(event, headers={'If-None-Match': etag}), None)
+        self.assertEqual(second['statusCode'], 304)
+        self.assertEqual(mock_s3.generate_presigned_url.call_count, 1)
+
+        # A new rendition or variant advances the item's Version, which changes the ETag
+        image_cache.clear()
+        mock_dynamo.get_item.return_value = {'Item': {'S3Key': {'S': 'images/etag_image.jpg'}, 'Version': {'N': '2'}}}
+        third = view_image(dict(event, headers={'If-None-Match': etag}), None)
+        self.assertEqual(third['statusCode'], 200)
+        self.assertNotEqual(third['headers']['ETag'], etag)
+
 if __name__ == '__main__':
     unittest.main()